@@ -0,0 +1,194 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Parallel test battery
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from time import perf_counter
+from os import cpu_count
+from inspect import signature
+from sample import Samples
+from ranks import PooledRanks, RowRanks, ranking_key
+
+
+_worker_data = {} # dataset installed once per worker process
+
+
+def _pair(test, params):
+    return [(PooledRanks, (test.P, test.Q))]
+
+
+def _singles(test, params):
+    return [(PooledRanks, (test.P,)), (PooledRanks, (test.Q,))]
+
+
+# rankings read by the rank-based test methods, as (ranking class, samples) of a test instance
+_rankings = {
+    'mann_whitney_utest': _pair,
+    'siegel_tukey_test': _pair,
+    'ansari_bradley_test': _pair,
+    'brunner_munzel_test': lambda test, params: _pair(test, params) + _singles(test, params),
+    'randomization_test': lambda test, params: _pair(test, params) if params.get('statistic') == 'U' else [],
+    'spearmans_correlation_coefficient': _singles,
+    'kruskal_wallis_oneway_analysis_variance': lambda test, params: [(PooledRanks, (test.groups.values,))],
+    'fligner_killeen_test': lambda test, params: [
+        (PooledRanks, (test._deviations(params.get('center', 'median')).values,))],
+    'friedman_twoway_analysis_variance': lambda test, params: [
+        (RowRanks, (test.matrix.reshape(-1, test.matrix.shape[-1]),))],
+}
+
+
+def _init_worker(data, specs=(), alpha=0.05):
+    ''' Install the dataset in a worker process and warm the rankings of the battery once '''
+    global _worker_data
+    _worker_data = data
+    TestBattery(data, list(specs), alpha, executor='serial').precompute()
+
+
+def _run_spec(spec, alpha, seed=None, data=None):
+    ''' Run a single test spec and return its result row 
+    
+    The seed (a child SeedSequence of the battery seed) is passed to the test methods 
+    accepting a seed (resampling tests), unless the spec sets one explicitly. '''
+    data = _worker_data if data is None else data
+    start = perf_counter()
+    row = {'label': spec.label, 'test': spec.test_class.__name__, 'method': spec.method,
+           'samples': spec.samples, 'statistic': None, 'p_value': None, 'dof': None,
+           'reject': None, 'elapsed': None, 'error': None}
+    try:
+        test = spec.test_class(*[data[name] for name in spec.samples], alpha=alpha, **spec.params)
+        method = getattr(test, spec.method)
+        kwargs = dict(spec.method_params)
+        if seed is not None and 'seed' not in kwargs and 'seed' in signature(method).parameters:
+            kwargs['seed'] = seed
+        result = method(**kwargs)
+        row.update(statistic=result.statistic, p_value=result.p_value, dof=result.dof,
+                   reject=result.reject)
+    except Exception as e:
+        row['error'] = repr(e)
+    row['elapsed'] = perf_counter() - start
+    return row
+
+
+class TestSpec:
+    ''' Specification of one test of a battery
+
+    Parameters
+    ----------
+    test_class : statsHypo test class (e.g. InfOneSamp, InfTwoIndepSamp, Correlation)
+    method : name of the test method (e.g. 't_test')
+    samples : names of the datasets passed (in order) to the test class
+    params : keyword arguments of the test class (e.g. inf_parameters)
+    method_params : keyword arguments of the test method
+    label : label of the test in the result table
+    '''
+
+    def __init__(self, test_class, method, samples, params=None, method_params=None, label=None):
+        self.test_class = test_class
+        self.method = method
+        self.samples = tuple([samples] if isinstance(samples, str) else samples)
+        self.params = {} if params is None else params
+        self.method_params = {} if method_params is None else method_params
+        self.label = label if label is not None else method+'('+', '.join(self.samples)+')'
+
+
+class TestBattery:
+    ''' Battery of statistical tests run over a pool of workers
+
+    The dataset is shared by all tests: with threads it is shared in memory
+    (including the memoized rankings read by the rank-based tests, which are
+    computed once before the tests are scheduled), and with
+    processes it is sent once to every worker rather than once per test, every
+    worker computing the rankings once when it starts.
+
+    Parameters
+    ----------
+    data : dictionary mapping sample names to arrays
+    specs : list of TestSpec, or of tuples (test_class, method, samples[, params])
+    alpha : significance level
+    executor : 'thread', 'process' or 'serial'
+    max_workers : number of workers (defaults to the number of cores)
+    seed : None, int, SeedSequence or numpy.random.Generator; every test is given its own
+        child seed spawned from it (SeedSequence.spawn), so that the resampling tests are
+        reproducible and statistically independent whatever the executor and scheduling
+    '''
+
+    def __init__(self, data, specs, alpha=0.05, executor='thread', max_workers=None, seed=None):
+        if executor not in ('thread', 'process', 'serial'):
+            raise ValueError('Unknown executor: '+str(executor))
+        self.data = data
+        self.specs = [s if isinstance(s, TestSpec) else TestSpec(*s) for s in specs]
+        self.alpha = alpha
+        self.executor = executor
+        self.max_workers = cpu_count() if max_workers is None else max_workers
+        self.seed = seed
+        self.results = []
+
+    def add(self, test_class, method, samples, params=None, method_params=None, label=None):
+        ''' Add a test to the battery '''
+        self.specs.append(TestSpec(test_class, method, samples, params, method_params, label))
+        return self
+
+    def precompute(self, mapper=map):
+        ''' Compute the shared per-sample quantities once, before the tests run
+
+        Only the rankings read by the rank-based tests of the battery are computed, each
+        with the ranking class its test reads (e.g. RowRanks for the Friedman test), and
+        only when they all fit in the rank cache (PooledRanks.cache_size); otherwise the
+        tests rank their samples on demand.
+
+        Parameters
+        ----------
+        mapper : map function computing the rankings (e.g. the map of a pool of workers)
+        '''
+        names = set(name for spec in self.specs for name in spec.samples)
+        if Samples.verbose:
+            for name in names:
+                Samples.describe_sample(self.data[name])
+        rankings = {}
+        for spec in self.specs:
+            if spec.method not in _rankings:
+                continue
+            try:
+                test = spec.test_class(*[self.data[name] for name in spec.samples],
+                                       alpha=self.alpha, **spec.params)
+                for ranking, samples in _rankings[spec.method](test, spec.method_params):
+                    rankings[ranking_key(ranking, samples)] = (ranking, samples)
+            except Exception: # reported by the test itself when the battery runs
+                continue
+        if 0 < len(rankings) <= PooledRanks.cache_size:
+            list(mapper(lambda entry: entry[0].get(*entry[1]), rankings.values()))
+
+    def run(self):
+        ''' Run all tests of the battery
+
+        Returns
+        -------
+        result table as a list of rows (one dictionary per test, in the order of the specs)
+        '''
+        n = len(self.specs)
+        seeds = [None]*n if self.seed is None else Samples.spawn_seeds(self.seed, n)
+        if self.executor == 'serial':
+            self.precompute()
+            self.results = [_run_spec(spec, self.alpha, seed, self.data)
+                            for spec, seed in zip(self.specs, seeds)]
+        elif self.executor == 'thread':
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                self.precompute(pool.map)
+                self.results = list(pool.map(lambda spec, seed: _run_spec(spec, self.alpha, seed, self.data),
+                                             self.specs, seeds))
+        else:
+            chunksize = max(n // (4*self.max_workers), 1)
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(self.data, self.specs, self.alpha)) as pool:
+                self.results = list(pool.map(_run_spec, self.specs, [self.alpha]*n, seeds,
+                                             chunksize=chunksize))
+        return self.results
+
+    def to_frame(self):
+        ''' Result table as a pandas DataFrame (requires pandas) '''
+        from pandas import DataFrame
+        return DataFrame(self.results)
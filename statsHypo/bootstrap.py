@@ -0,0 +1,188 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Bootstrap confidence intervals
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from scipy.stats import norm
+from numpy import asarray, empty, quantile, sqrt, std, isfinite
+from sample import Samples
+from jackknife import Jackknife
+
+
+class BootstrapCI:
+    ''' Bootstrap confidence intervals of one or more statistics of a sample
+
+    One pool of B resample index vectors (a (B,n) index matrix) is shared by
+    every statistic of the sample: the bootstrap distributions of several
+    statistics are computed in the same pass over the pool (each chunk of
+    resampled data is gathered once and all the statistics are evaluated on it),
+    and are memoized for the different interval methods. The pool is never held
+    in memory: one child seed is kept per chunk of rows, and every pass
+    regenerates the same chunks from their seeds.
+
+    Interval methods
+    ----------------
+    'percentile' : quantiles of the bootstrap distribution
+    'basic' : reflection of the percentile interval about the estimate
+    'bca' : bias-corrected and accelerated percentile interval (the acceleration
+        is estimated with the jackknife)
+    'studentized' : bootstrap-t interval; the standard error of each resample is
+        analytic for the mean and estimated by an inner bootstrap otherwise
+
+    Parameters
+    ----------
+    _sample : data of size (n,), or tuple of arrays of size (n,) resampled jointly
+    size : number of bootstrap resamples B (defaults to Samples.bootstrap_size)
+    confidence : confidence level of the intervals
+    inner_size : number of inner resamples of the studentized intervals
+    seed : None, int, SeedSequence or numpy.random.Generator of the resamples
+    '''
+
+    methods = ('percentile', 'basic', 'bca', 'studentized')
+    jackknife_statistics = {'mean': 'mean', 'var': 'var', 'std': 'std'}
+
+    def __init__(self, _sample, size=None, confidence=0.95, inner_size=50, seed=None):
+        self.paired = isinstance(_sample, tuple)
+        self.samples = tuple(asarray(s, dtype=float) for s in (_sample if self.paired else (_sample,)))
+        self.n = self.samples[0].shape[0]
+        self.size = Samples.bootstrap_size if size is None else int(size)
+        self.confidence = confidence
+        self.inner_size = inner_size
+        self.rng = Samples.rng(seed)
+        self.rows = max(Samples.bootstrap_chunk_elements // self.n, 1) # resamples per chunk
+        self._seeds = None
+        self._inner_seeds = None
+        self._distributions = {}
+        self._estimates = {}
+
+    def chunks(self):
+        ''' Chunks of the resample index matrix, as (first row, indices of size (b,n))
+
+        The seeds of the chunks (and of their inner resamples, see _standard_errors) are
+        spawned on first use; the same chunks are regenerated from them on every call.
+        '''
+        if self._seeds is None:
+            chunks = -(-self.size // self.rows)
+            seeds = Samples.spawn_seeds(self.rng, 2*chunks)
+            self._seeds, self._inner_seeds = seeds[:chunks], seeds[chunks:]
+        for c, seed in enumerate(self._seeds):
+            start = c*self.rows
+            yield (start, Samples.rng(seed).integers(0, self.n, size=(min(self.rows, self.size-start), self.n)))
+
+    @staticmethod
+    def _function(statistic):
+        return Samples._bootstrap_statistics[statistic] if isinstance(statistic, str) else statistic
+
+    def estimate(self, statistic):
+        ''' Statistic of the original sample '''
+        if statistic not in self._estimates:
+            f = BootstrapCI._function(statistic)
+            self._estimates[statistic] = f(*[s[None, :] for s in self.samples])[0]
+        return self._estimates[statistic]
+
+    def distributions(self, statistics):
+        ''' Bootstrap distributions (of size (B,)) of the statistics, computed in one pass
+
+        Parameters
+        ----------
+        statistics : list of 'mean', 'median', 'std', 'var' or vectorized callables mapping
+            (b,n) resampled array(s) to a statistic of size (b,)
+
+        Returns
+        -------
+        list of bootstrap distributions, in the order of the statistics
+        '''
+        missing = [s for s in dict.fromkeys(statistics) if s not in self._distributions]
+        if missing:
+            functions = [BootstrapCI._function(s) for s in missing]
+            dists = [empty(self.size) for _ in missing]
+            for start, idx in self.chunks():
+                resampled = [s[idx] for s in self.samples]
+                for f, dist in zip(functions, dists):
+                    dist[start:start+idx.shape[0]] = f(*resampled)
+            self._distributions.update(zip(missing, dists))
+        return [self._distributions[s] for s in statistics]
+
+    def _acceleration(self, statistic):
+        ''' Acceleration of the BCa interval from the jackknife replicates '''
+        if statistic in BootstrapCI.jackknife_statistics and not self.paired:
+            jack = Jackknife(self.samples[0], BootstrapCI.jackknife_statistics[statistic])
+        else:
+            f = BootstrapCI._function(statistic)
+            one = lambda *s: f(*[x[None, :] for x in s])[0]
+            jack = Jackknife(self.samples if self.paired else self.samples[0], one)
+        reps = jack.replicates(jack.deletions())
+        d = reps.mean() - reps
+        den = 6. * (d**2).sum()**1.5
+        return (d**3).sum() / den if den > 0 else 0.
+
+    def _standard_errors(self, statistic):
+        ''' Standard error of the statistic within each bootstrap resample '''
+        if statistic == 'mean' and not self.paired:
+            dist_std, = self.distributions(['std'])
+            return dist_std / sqrt(self.n)
+        f = BootstrapCI._function(statistic)
+        se = empty(self.size)
+        rows = max(Samples.bootstrap_chunk_elements // (self.n*self.inner_size), 1)
+        for first, chunk in self.chunks():
+            rng = Samples.rng(self._inner_seeds[first // self.rows]) # same inner resamples on every call
+            for start in range(0, chunk.shape[0], rows):
+                outer = chunk[start:start+rows]
+                b = outer.shape[0]
+                inner = rng.integers(0, self.n, size=(b, self.inner_size, self.n))
+                idx = outer[asarray(range(b))[:, None, None], inner].reshape(b*self.inner_size, self.n)
+                values = f(*[s[idx] for s in self.samples]).reshape(b, self.inner_size)
+                se[first+start:first+start+b] = std(values, axis=1, ddof=1)
+        return se
+
+    def interval(self, statistic='mean', method='percentile', confidence=None):
+        ''' Bootstrap confidence interval of a statistic
+
+        Parameters
+        ----------
+        statistic : 'mean', 'median', 'std', 'var' or vectorized callable
+        method : 'percentile', 'basic', 'bca' or 'studentized'
+        confidence : confidence level (defaults to the level of the object)
+
+        Returns
+        -------
+        (low, high) : confidence interval
+        '''
+        if method not in BootstrapCI.methods:
+            raise ValueError('Unknown interval method: '+str(method))
+        confidence = self.confidence if confidence is None else confidence
+        alpha = 1. - confidence
+        theta = self.estimate(statistic)
+        dist, = self.distributions([statistic])
+
+        if method == 'percentile':
+            low, high = quantile(dist, [alpha/2., 1.-alpha/2.])
+        elif method == 'basic':
+            qlow, qhigh = quantile(dist, [alpha/2., 1.-alpha/2.])
+            low, high = 2.*theta - qhigh, 2.*theta - qlow
+        elif method == 'bca':
+            z0 = norm.ppf(((dist < theta).sum() + 0.5*(dist == theta).sum()) / float(self.size))
+            a = self._acceleration(statistic)
+            z = norm.ppf([alpha/2., 1.-alpha/2.])
+            levels = norm.cdf(z0 + (z0 + z) / (1. - a*(z0 + z)))
+            low, high = quantile(dist, levels)
+        else:
+            se = std(dist, ddof=1)
+            t = (dist - theta) / self._standard_errors(statistic)
+            t = t[isfinite(t)]
+            tlow, thigh = quantile(t, [alpha/2., 1.-alpha/2.])
+            low, high = theta - thigh*se, theta - tlow*se
+        return (low, high)
+
+    def intervals(self, statistics=('mean', 'median', 'std'), methods=('percentile',), confidence=None):
+        ''' Confidence intervals of several statistics, sharing one resampling pass
+
+        Returns
+        -------
+        dictionary mapping each statistic to a dictionary {method: (low, high)}
+        '''
+        self.distributions(list(statistics))
+        return {s: {m: self.interval(s, m, confidence) for m in methods} for s in statistics}
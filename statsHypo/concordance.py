@@ -0,0 +1,215 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Rank association by merge-sort inversion counting
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from functools import lru_cache
+from scipy.stats import norm, chi2
+from numpy import asarray, argsort, lexsort, take_along_axis, broadcast_to, full, inf, zeros
+from numpy import where, cumsum, r_, flatnonzero, diff, bincount, ones, sqrt, abs
+from numpy import minimum, maximum, errstate, int64, count_nonzero, sort
+from ranks import RowRanks
+
+
+def inversions(Y, base=8):
+    ''' Number of inversions (pairs i < j with y_i > y_j) of every row, by merge sort
+
+    Bottom-up merge sort applied to all rows and all blocks of a level at once. The
+    rows are padded with +inf (no inversions) up to 2^L blocks of base to 2 base
+    values, whose inversions are counted by direct comparisons before sorting.
+    Then, at every level, the two sorted halves of every block are merged
+    with a stable argsort (linear on two sorted runs): an element of the right half
+    moving from index i to position p of the merged block passes over i - p larger
+    elements of the left half, so the inversions of a level are the sum of the
+    indices of the right halves minus the sum of their merged positions.
+
+    Parameters
+    ----------
+    Y : data of size (B,n)
+    base : size of the blocks counted by direct comparisons
+
+    Returns
+    -------
+    (counts, sorted) : inversions of size (B,) and rows sorted, of size (B,n)
+    '''
+    Y = asarray(Y, dtype=float)
+    B, n = Y.shape
+    levels = max(n // base, 1).bit_length() - 1
+    w = -(-n // (1 << levels))  # base blocks of w (base to 2 base) values, doubled at every level
+    size = w << levels
+    Z = full((B, size), inf)
+    Z[:, :n] = Y
+    blocks = Z.reshape(B, size//w, w)
+    counts = zeros(B, dtype=int64)
+    for i in range(w-1):
+        counts += count_nonzero(blocks[:, :, i:i+1] > blocks[:, :, i+1:], axis=(1, 2))
+    Z = sort(blocks, axis=-1).reshape(B, size)
+    while w < size:
+        m = size//(2*w) # blocks per row
+        blocks = Z.reshape(B, m, 2*w)
+        order = argsort(blocks, axis=-1, kind='stable')
+        right = flatnonzero(order >= w).reshape(B, -1) % size # merged positions, w per block
+        counts += m*(w*(3*w-1)//2) - (right.sum(axis=1) - 2*w*w*(m*(m-1)//2))
+        Z = take_along_axis(blocks, order, axis=-1).reshape(B, size)
+        w *= 2
+    return (counts, Z[:, :n])
+
+
+def _tie_terms(starts):
+    ''' Sums over the runs of every row of t(t-1)/2, t(t-1)(t-2) and t(t-1)(2t+5)
+
+    starts : boolean array of size (B,n), True where a run of tied values starts
+    '''
+    B, n = starts.shape
+    first = starts.copy()
+    first[:, 0] = True
+    if first.all(): # no ties
+        return (zeros(B),)*3
+    begin = flatnonzero(first)
+    t = diff(r_[begin, B*n]).astype(float)
+    row = begin // n
+    return tuple(bincount(row, weights=x, minlength=B)
+                 for x in (t*(t-1)/2., t*(t-1)*(t-2), t*(t-1)*(2*t+5)))
+
+
+def _runs(s):
+    ''' Starts of the runs of equal values along the rows of s '''
+    starts = ones(s.shape, dtype=bool)
+    starts[:, 1:] = s[:, 1:] != s[:, :-1]
+    return starts
+
+
+@lru_cache(maxsize=64)
+def kendall_null_distribution(n):
+    ''' Exact null distribution of the number of discordant pairs of n untied pairs
+
+    The number of inversions of a random permutation of n elements is the sum of
+    independent uniform variables on {0, ..., j-1}, j = 1, ..., n; its distribution is
+    built by successive convolutions (running sums), cached per n.
+
+    Returns
+    -------
+    probabilities of 0, ..., n(n-1)/2 discordant pairs
+    '''
+    p = ones(1)
+    for j in range(2, n+1):
+        c = r_[zeros(j), cumsum(p), full(j-1, p.sum())]
+        p = (c[j:] - c[:-j]) / j
+    return p
+
+
+def rank_association(x, Y):
+    ''' Pair counts of the association of x with every column of Y
+
+    x is sorted once; every column of Y is permuted to the order of x (and sorted
+    within the ties of x), and its discordant pairs are counted by merge sort in
+    one batch over the columns.
+
+    Parameters
+    ----------
+    x : data of size (n,)
+    Y : data of size (n,) or (n,B)
+
+    Returns
+    -------
+    dictionary of arrays of size (B,): 'n', 'pairs' n(n-1)/2, 'discordant', 'concordant',
+    'x_ties', 'y_ties' (pairs tied on x, on y), 'joint_ties' (tied on both), and the
+    tie sums 'x_terms', 'y_terms' (sums of t(t-1)(t-2) and t(t-1)(2t+5)) of the variance
+    '''
+    x = asarray(x, dtype=float)
+    n = x.shape[0]
+    Y = asarray(Y, dtype=float).reshape(n, -1).T                 # (B, n)
+    order = argsort(x, kind='stable')
+    xs = x[order]
+    x_starts = _runs(xs[None, :])
+    Ys = Y[:, order]
+    if not x_starts.all():  # order the ties of x by y
+        group = broadcast_to(cumsum(x_starts[0]), Ys.shape)
+        Ys = take_along_axis(Ys, lexsort((Ys, group), axis=-1), axis=-1)
+    discordant, Ysorted = inversions(Ys)
+    x_ties, x0, x1 = _tie_terms(x_starts)
+    y_ties, y0, y1 = _tie_terms(_runs(Ysorted))
+    joint_ties = _tie_terms(x_starts | _runs(Ys))[0]
+    pairs = n*(n-1)//2
+    concordant = pairs - x_ties - y_ties + joint_ties - discordant
+    return {'n': n, 'pairs': pairs, 'discordant': discordant.astype(float),
+            'concordant': concordant, 'x_ties': x_ties, 'y_ties': y_ties,
+            'joint_ties': joint_ties, 'x_terms': (x0, x1), 'y_terms': (y0, y1)}
+
+
+def kendall_tau_b(x, Y, exact_threshold=33):
+    ''' Kendall's tau-b of x with every column of Y
+
+    The p-values are exact (null distribution of the discordant pairs) for untied data
+    of size at most exact_threshold, and from the normal approximation of C - D with
+    the tie-corrected variance otherwise.
+
+    Returns
+    -------
+    (tau, p) : coefficients and two-sided p-values of size (B,) (scalars when Y is (n,))
+    '''
+    a = rank_association(x, Y)
+    n, pairs = a['n'], a['pairs']
+    S = a['concordant'] - a['discordant']
+    with errstate(invalid='ignore', divide='ignore'):
+        tau = minimum(maximum(S / sqrt((pairs - a['x_ties'])*(pairs - a['y_ties'])), -1.), 1.)
+        m = n*(n - 1.)
+        (x0, x1), (y0, y1) = a['x_terms'], a['y_terms']
+        var = ((m*(2*n + 5) - x1 - y1) / 18. + 2.*a['x_ties']*a['y_ties'] / m
+               + x0*y0 / (9.*m*(n - 2)))
+        p = 2.*norm.sf(abs(S) / sqrt(var))
+    untied = (a['x_ties'] == 0) & (a['y_ties'] == 0)
+    if n <= exact_threshold and untied.any():
+        cdf = cumsum(kendall_null_distribution(n))
+        c = minimum(a['discordant'], pairs - a['discordant']).astype(int)
+        p = where(untied, minimum(2.*cdf[c], 1.), p)
+    return _single(asarray(Y).ndim, tau, p)
+
+
+def goodman_kruskal_gamma(x, Y):
+    ''' Goodman and Kruskal's gamma of x with every column of Y
+
+    gamma = (C - D) / (C + D) over the pairs untied on both variables, tested with
+    z = gamma sqrt((C + D) / (n (1 - gamma^2))).
+
+    Returns
+    -------
+    (gamma, p) : coefficients and two-sided p-values of size (B,) (scalars when Y is (n,))
+    '''
+    a = rank_association(x, Y)
+    C, D = a['concordant'], a['discordant']
+    with errstate(invalid='ignore', divide='ignore'):
+        gamma = (C - D) / (C + D)
+        z = gamma * sqrt((C + D) / (a['n'] * (1. - gamma*gamma)))
+    return _single(asarray(Y).ndim, gamma, 2.*norm.sf(abs(z)))
+
+
+def kendall_w(X):
+    ''' Kendall's coefficient of concordance W of m judges ranking n objects
+
+    W = 12 S / (m^2 (n^3 - n) - m sum T), S the sum of squared deviations of the rank
+    totals of the objects and T = sum(t^3 - t) the tie correction of every judge; tested
+    with chi2 = m (n-1) W on n-1 degrees-of-freedom.
+
+    Parameters
+    ----------
+    X : scores of size (n,m) (n objects x m judges)
+
+    Returns
+    -------
+    (W, chi2, p)
+    '''
+    ranks = RowRanks.get(asarray(X, dtype=float).T)              # (m, n)
+    m, n = ranks.ranks.shape
+    totals = ranks.ranks.sum(axis=0)
+    S = ((totals - totals.mean())**2).sum()
+    W = 12.*S / (m*m*(n**3 - n) - m*ranks.tie_terms.sum())
+    statistic = m*(n - 1.)*W
+    return (W, statistic, chi2.sf(statistic, n - 1))
+
+
+def _single(ndim, *arrays):
+    return tuple(x[0] for x in arrays) if ndim == 1 else arrays
@@ -0,0 +1,152 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Contingency tables and measures of association
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from scipy.stats import chi2, norm
+from numpy import asarray, unique, bincount, sqrt, log, exp, minimum, abs, sign, errstate, where
+from numpy import stack
+
+
+class ContingencyTable:
+    ''' Contingency table of two categorical variables, or a stack of tables
+
+    The table is held either dense, as counts of size (r,c) (or (m,r,c) for m
+    tables evaluated at once), or sparse, as the nonzero cells only, when built
+    from high-cardinality codes. The chi-square statistic only requires the
+    margins and the nonzero cells,
+        chi2 = N (sum over the nonzero cells of O^2 / (R_i C_j) - 1),
+    so that every measure of association derives from the one table.
+
+    Parameters
+    ----------
+    table : counts of size (r,c) or (m,r,c)
+    '''
+
+    dense_cells = 2**22 # largest number of cells of a dense table built from codes (class variable)
+
+    def __init__(self, table=None):
+        self.table = None if table is None else asarray(table, dtype=float)
+        self.cells = None
+        if self.table is not None:
+            self.rows, self.cols = self.table.sum(axis=-1), self.table.sum(axis=-2)
+            self.N = self.table.sum(axis=(-2, -1))
+            self.shape = self.table.shape[-2:]
+
+    @staticmethod
+    def from_codes(x, y, sparse=None):
+        ''' Contingency table of raw categorical observations
+
+        Parameters
+        ----------
+        x, y : categories (codes or labels) of every observation, of size (N,)
+        sparse : keep the nonzero cells only (defaults to tables of more than dense_cells cells)
+        '''
+        _, cx = unique(asarray(x), return_inverse=True)
+        _, cy = unique(asarray(y), return_inverse=True)
+        cx, cy = cx.ravel(), cy.ravel()
+        r, c = int(cx.max()) + 1, int(cy.max()) + 1
+        code = cx.astype('int64')*c + cy
+        if sparse is None:
+            sparse = r*c > ContingencyTable.dense_cells
+        if not sparse:
+            return ContingencyTable(bincount(code, minlength=r*c).reshape(r, c))
+        table = ContingencyTable()
+        cells, counts = unique(code, return_counts=True)
+        table.cells = (cells // c, cells % c, counts.astype(float))
+        table.rows = bincount(cx, minlength=r).astype(float)
+        table.cols = bincount(cy, minlength=c).astype(float)
+        table.N = float(cx.shape[0])
+        table.shape = (r, c)
+        return table
+
+    def dof(self):
+        r, c = self.shape
+        return (r - 1)*(c - 1)
+
+    def expected(self):
+        ''' Expected counts under independence (dense tables) '''
+        return self.rows[..., :, None] * self.cols[..., None, :] / self.N[..., None, None]
+
+    def chi_square(self, correction=False):
+        ''' Chi-square test of independence (homogeneity)
+
+        Parameters
+        ----------
+        correction : Yates' continuity correction of tables with one degree-of-freedom
+
+        Returns
+        -------
+        (chi2, p) : statistics and p-values (of size (m,) for a stack of tables)
+        '''
+        dof = self.dof()
+        with errstate(invalid='ignore', divide='ignore'):
+            if self.table is None:
+                i, j, O = self.cells
+                stat = self.N * ((O*O / (self.rows[i]*self.cols[j])).sum() - 1.)
+            elif correction and dof == 1:
+                E = self.expected()
+                d = E - self.table
+                O = self.table + sign(d)*minimum(0.5, abs(d))
+                stat = ((O - E)**2 / E).sum(axis=(-2, -1))
+            else:
+                margins = self.rows[..., :, None] * self.cols[..., None, :]
+                stat = self.N * ((self.table**2 / margins).sum(axis=(-2, -1)) - 1.)
+        return (stat, chi2.sf(stat, dof))
+
+    def contingency_coefficient(self):
+        ''' Test 16f: contingency coefficient C = sqrt(chi2 / (chi2 + N)) '''
+        stat = self.chi_square()[0]
+        return sqrt(stat / (stat + self.N))
+
+    def cramers_v(self):
+        ''' Test 16h: Cramér's phi (V) = sqrt(chi2 / (N (min(r,c) - 1))) '''
+        with errstate(invalid='ignore', divide='ignore'):
+            return sqrt(self.chi_square()[0] / (self.N * (min(self.shape) - 1)))
+
+    def _cells_2x2(self):
+        if self.shape != (2, 2) or self.table is None:
+            raise ValueError('The measure is defined for 2 x 2 tables')
+        t = self.table
+        return (t[..., 0, 0], t[..., 0, 1], t[..., 1, 0], t[..., 1, 1])
+
+    def phi(self):
+        ''' Test 16g: phi coefficient of 2 x 2 tables, (ad - bc) / sqrt(R1 R2 C1 C2) (signed) '''
+        a, b, c, d = self._cells_2x2()
+        with errstate(invalid='ignore', divide='ignore'):
+            return (a*d - b*c) / sqrt(self.rows.prod(axis=-1) * self.cols.prod(axis=-1))
+
+    def yules_q(self):
+        ''' Test 16i: Yule's Q of 2 x 2 tables, (ad - bc) / (ad + bc) '''
+        a, b, c, d = self._cells_2x2()
+        with errstate(invalid='ignore', divide='ignore'):
+            return (a*d - b*c) / (a*d + b*c)
+
+    def odds_ratio(self, confidence=0.95):
+        ''' Test 16j: odds ratio ad / bc of 2 x 2 tables, with a confidence interval
+
+        The interval is exp(log(OR) +/- z sqrt(1/a + 1/b + 1/c + 1/d)); 0.5 is added to
+        every cell of the tables having an empty cell.
+
+        Returns
+        -------
+        (odds ratio, low, high, p) : odds ratios, confidence limits and two-sided p-values
+            of the test of log(OR) = 0
+        '''
+        a, b, c, d = self._cells_2x2()
+        with errstate(invalid='ignore', divide='ignore'):
+            ratio = (a*d) / (b*c)
+            empty = (a*b*c*d) == 0
+            a, b, c, d = (where(empty, x + 0.5, x) for x in (a, b, c, d))
+            log_ratio = log(a*d / (b*c))
+            se = sqrt(1./a + 1./b + 1./c + 1./d)
+        z = norm.ppf(0.5 + confidence/2.)
+        return (ratio, exp(log_ratio - z*se), exp(log_ratio + z*se), 2.*norm.sf(abs(log_ratio/se)))
+
+    @staticmethod
+    def stack(tables):
+        ''' ContingencyTable of a list of tables of the same shape, evaluated in one batch '''
+        return ContingencyTable(stack([asarray(t, dtype=float) for t in tables]))
@@ -7,9 +7,15 @@
 
 
 from scipy.stats import pearsonr
-
-from scipy.stats import kendalltau
+from scipy.stats import t as t_dist
 from sample import Samples
+from ranks import PooledRanks
+from correlation_matrix import correlation_matrix
+from concordance import kendall_tau_b, goodman_kruskal_gamma, kendall_w
+from covariance import CovarianceMatrix
+from moments import CoMomentAccumulator
+from contingency import ContingencyTable
+from time import perf_counter
 import numpy as np
 
 
@@ -50,18 +56,24 @@ class Correlation(Samples):
         
         Test for assessing linear relationship between two samples
 
+        For series that do not fit in memory, P may be a CoMomentAccumulator fed chunk by 
+        chunk (Q is then not used); the coefficient and its t test come from the accumulated 
+        co-moments.
+
         Null hypothesis H0: the correlation (rho) between the two variables equals 0
         Alternative hypothesis H1: the correlation between the two variables equals some value other than 0.
         '''
         
         self.test_title = 'Pearson Product–Moment Correlation Coefficient'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
+
+        if isinstance(self.P, CoMomentAccumulator):
+            stat, t, p = self.P.test()
+            return self._result(stat, p, start, dof=self.P.n-2, details={'t': t},
+                                conclusions=('The correlation between the two variables equals 0. Samples probably independent',
+                                             'The correlation between the two variables equals some value other than 0. Samples probably dependent. '))
 
         stat, p = pearsonr(self.P, self.Q)
-        print('stat_true=%.3f, p=%.3f' % (stat, p))        
 
         #dist_stats = []
         #for _ in range(self.bootstrap_size):
@@ -77,13 +89,103 @@ class Correlation(Samples):
         #cutoff, p = Samples.compute_p_value(dist_stats, significance_level=self.alpha, type='one-tail')
         #print('stat=%.3f, p=%.3f' % (stat, p))
         
-        if p > self.alpha:
-            print('The correlation between the two variables equals 0. Samples probably independent')
-        else:
-            print('The correlation between the two variables equals some value other than 0. Samples probably dependent. ')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('The correlation between the two variables equals 0. Samples probably independent',
+                                         'The correlation between the two variables equals some value other than 0. Samples probably dependent. '))
+
+
+
+    def _covariance(self, *columns):
+        ''' Memoized CovarianceMatrix of P, Q and further columns '''
+        X = np.column_stack([self.P, self.Q] + [c for c in columns if c is not None])
+        return CovarianceMatrix.get(X)
+
+
+    def multiple_correlation_coefficient(self):
+        ''' Test 28k: Multiple Correlation Coefficient
+        
+        Correlation of the criterion P with its best linear prediction from the k predictors 
+        in the columns of Q (n,k): R^2 = 1 - 1/P_00, P the inverse of the correlation matrix 
+        (see CovarianceMatrix.multiple_correlations).
+        
+        H0 (null hypothesis): the multiple correlation equals 0
+        H1 (alternate hypothesis): the multiple correlation is greater than 0
+        
+        Return
+        ------
+        TestResult : multiple correlation R and p-value of the F test, dof = (k, n-k-1), 
+            F in details['F']
+        '''
+        
+        self.test_title='Multiple Correlation Coefficient'
+        start = perf_counter()
+        
+        cov = self._covariance()
+        R, F, p = cov.multiple_correlations()
+        k = cov.K - 1
+        return self._result(R[0], p[0], start, samples=(self.P,), dof=(k, cov.n-k-1),
+                            details={'F': F[0]},
+                            conclusions=('The multiple correlation equals 0',
+                                         'The multiple correlation is greater than 0'))
 
 
+    def partial_correlation_coefficient(self, controls=None):
+        ''' Test 28l: Partial Correlation Coefficient
+        
+        Correlation of P and Q after removing from both the linear effect of the control 
+        variables, from the inverse of the correlation matrix of (P, Q, controls) (see 
+        CovarianceMatrix.partial_correlations).
+        
+        H0 (null hypothesis): the partial correlation between the two variables equals 0
+        H1 (alternate hypothesis): the partial correlation equals some value other than 0
+        
+        Parameters
+        ----------
+        controls : control variables of size (n,) or (n,c)
+        
+        Return
+        ------
+        TestResult : partial correlation and p-value, dof = n-2-c
+        '''
+        
+        self.test_title='Partial Correlation Coefficient'
+        start = perf_counter()
+        
+        cov = self._covariance(controls)
+        stat, p = cov.partial_correlation(0, 1, range(2, cov.K))
+        return self._result(stat, p, start, samples=(self.P, self.Q), dof=cov.n-cov.K,
+                            conclusions=('The partial correlation between the two variables equals 0',
+                                         'The partial correlation between the two variables equals some value other than 0'))
+
+
+    def semipartial_correlation_coefficient(self, controls=None):
+        ''' Test 28m: Semipartial Correlation Coefficient
+        
+        Correlation of P with Q after removing the linear effect of the control variables 
+        from Q only, from the inverse of the correlation matrix of (P, Q, controls) (see 
+        CovarianceMatrix.semipartial_correlations).
+        
+        H0 (null hypothesis): the semipartial correlation equals 0
+        H1 (alternate hypothesis): the semipartial correlation equals some value other than 0
+        
+        Parameters
+        ----------
+        controls : control variables of size (n,) or (n,c)
+        
+        Return
+        ------
+        TestResult : semipartial correlation and p-value, dof = n-2-c
+        '''
+        
+        self.test_title='Semipartial Correlation Coefficient'
+        start = perf_counter()
+        
+        cov = self._covariance(controls)
+        sr, p = cov.semipartial_correlations(0)
+        return self._result(sr[1], p[1], start, samples=(self.P, self.Q), dof=cov.n-cov.K,
+                            conclusions=('The semipartial correlation equals 0',
+                                         'The semipartial correlation equals some value other than 0'))
+
     def spearmans_correlation_coefficient(self):
         ''' Test 29: Spearman’s Rank-Order Correlation Coefficient
 
@@ -94,20 +196,17 @@ class Correlation(Samples):
         '''
         
         self.test_title='Spearman’s Rank-Order Correlation Coefficient'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
-        from scipy.stats import spearmanr
-        stat, p = spearmanr(self.P, self.Q)
-        print('stat=%.3f, p=%.3f' % (stat, p))
-
-        if p > self.alpha:
-            print('The correlation between the two variables equals 0. Samples probably independent')
-        else:
-            print('The correlation between the two variables equals some value other than 0. Samples probably dependent. ')
-        return (stat, p, dist_stats)        
+        n = len(self.P)
+        rx, ry = PooledRanks.get(self.P).ranks, PooledRanks.get(self.Q).ranks
+        stat = np.corrcoef(rx, ry)[0, 1]
+        with np.errstate(divide='ignore'):
+            tstat = stat * np.sqrt((n-2) / ((1.-stat)*(1.+stat)))
+        p = 2.*t_dist.sf(np.abs(tstat), n-2)
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('The correlation between the two variables equals 0. Samples probably independent',
+                                         'The correlation between the two variables equals some value other than 0. Samples probably dependent. '))
 
 
     def kendall_tau(self):
@@ -115,24 +214,218 @@ class Correlation(Samples):
         
         Test for assessing correlation between two samples
         
+        Tau-b (corrected for ties), from the number of discordant pairs counted by merge sort 
+        in O(n log n). Q may hold several samples as columns (n,B): P is sorted once and the 
+        B coefficients are computed in one batch (see concordance.kendall_tau_b).
+        
         Null hypothesis H0: the correlation (rho) between the two variables equals 0
         Alternative hypothesis H1: the correlation between the two variables equals some value other than 0.          
         '''
         
         self.test_title='Kendall’s Tau'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        
+        stat, p = kendall_tau_b(self.P, self.Q)
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('The correlation between the two variables equals 0. Samples probably independent',
+                                         'The correlation between the two variables equals some value other than 0. Samples probably dependent. '))
+
+
+
+    def goodman_kruskals_gamma(self):
+        ''' Test 32: Goodman and Kruskal’s Gamma
         
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        Association of two ordinal variables, gamma = (C - D) / (C + D) over the pairs untied 
+        on both variables (concordant C, discordant D counted by merge sort). Q may hold 
+        several samples as columns (n,B), computed in one batch.
         
-        stat, p = kendalltau(self.P, self.Q)
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The correlation between the two variables equals 0. Samples probably independent')
-        else:
-            print('The correlation between the two variables equals some value other than 0. Samples probably dependent. ')
-        return (stat, p)          
+        H0 (null hypothesis): gamma between the two variables equals 0
+        H1 (alternate hypothesis): gamma between the two variables equals some value other than 0
+        '''
+        
+        self.test_title='Goodman and Kruskal’s Gamma'
+        start = perf_counter()
+        
+        stat, p = goodman_kruskal_gamma(self.P, self.Q)
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('The association between the two variables equals 0. Samples probably independent',
+                                         'The association between the two variables equals some value other than 0. Samples probably dependent. '))
 
- 
-    
+
+    def kendalls_coefficient_of_concordance(self):
+        ''' Test 31: Kendall’s Coefficient of Concordance
+        
+        Agreement of m judges ranking n objects: P holds the scores as a matrix of size (n,m) 
+        (n objects x m judges; Q is not used). W = 12 S / (m^2 (n^3 - n) - m sum T), with 
+        chi2 = m (n-1) W on n-1 dof.
+        
+        H0 (null hypothesis): there is no agreement among the judges (W equals 0)
+        H1 (alternate hypothesis): there is agreement among the judges (W is greater than 0)
+        
+        Return
+        ------
+        TestResult : chi-square statistic and p-value, W in details['W']
+        '''
+        
+        self.test_title='Kendall’s Coefficient of Concordance'
+        start = perf_counter()
+        
+        W, stat, p = kendall_w(self.P)
+        return self._result(stat, p, start, dof=np.shape(self.P)[0]-1, details={'W': W},
+                            conclusions=('No agreement among the judges',
+                                         'Agreement among the judges'))
+
+
+    def _contingency_table(self):
+        ''' ContingencyTable of the categories P and Q of every observation, or of the table(s) 
+        of counts P, of size (r,c) or (m,r,c), when Q is None '''
+        if self.Q is None:
+            return ContingencyTable(self.P)
+        return ContingencyTable.from_codes(self.P, self.Q)
+
+
+    def _association_result(self, stat, table, start, details=None):
+        p = table.chi_square()[1]
+        return self._result(stat, p, start, dof=table.dof(), details=details,
+                            conclusions=('Probably independent',
+                                         'Probably dependent'))
+
+
+    def contingency_coefficient(self):
+        ''' Test 16f: Contingency Coefficient
+        
+        C = sqrt(chi2 / (chi2 + N)), from the contingency table of the categorical variables 
+        P and Q (raw codes or labels), or of the counts P (Q None; (m,r,c) for m tables at once).
+        
+        H0 (null hypothesis): the two variables are independent
+        H1 (alternate hypothesis): the two variables are associated
+        
+        Return
+        ------
+        TestResult : coefficient and p-value of the chi-square test
+        '''
+        
+        self.test_title='Contingency Coefficient'
+        start = perf_counter()
+        
+        table = self._contingency_table()
+        return self._association_result(table.contingency_coefficient(), table, start)
+
+
+    def phi_coefficient(self):
+        ''' Test 16g: Phi Coefficient
+        
+        phi = (ad - bc) / sqrt(R1 R2 C1 C2) of a 2 x 2 table (see contingency_coefficient for 
+        the data).
+        
+        H0 (null hypothesis): the two variables are independent
+        H1 (alternate hypothesis): the two variables are associated
+        
+        Return
+        ------
+        TestResult : coefficient and p-value of the chi-square test
+        '''
+        
+        self.test_title='Phi Coefficient'
+        start = perf_counter()
+        
+        table = self._contingency_table()
+        return self._association_result(table.phi(), table, start)
+
+
+    def cramers_phi_coefficient(self):
+        ''' Test 16h: Cramér’s Phi Coefficient
+        
+        V = sqrt(chi2 / (N (min(r,c) - 1))) of an r x c table (see contingency_coefficient for 
+        the data).
+        
+        H0 (null hypothesis): the two variables are independent
+        H1 (alternate hypothesis): the two variables are associated
+        
+        Return
+        ------
+        TestResult : coefficient and p-value of the chi-square test
+        '''
+        
+        self.test_title='Cramér’s Phi Coefficient'
+        start = perf_counter()
+        
+        table = self._contingency_table()
+        return self._association_result(table.cramers_v(), table, start)
+
+
+    def yules_q(self):
+        ''' Test 16i: Yule’s Q
+        
+        Q = (ad - bc) / (ad + bc) of a 2 x 2 table (see contingency_coefficient for the data).
+        
+        H0 (null hypothesis): the two variables are independent
+        H1 (alternate hypothesis): the two variables are associated
+        
+        Return
+        ------
+        TestResult : Yule's Q and p-value of the chi-square test
+        '''
+        
+        self.test_title='Yule’s Q'
+        start = perf_counter()
+        
+        table = self._contingency_table()
+        return self._association_result(table.yules_q(), table, start)
+
+
+    def odds_ratio(self, confidence=0.95):
+        ''' Test 16j: Odds Ratio
+        
+        OR = ad / bc of a 2 x 2 table (see contingency_coefficient for the data), with the 
+        confidence interval of log(OR) (see ContingencyTable.odds_ratio).
+        
+        H0 (null hypothesis): the odds ratio equals 1
+        H1 (alternate hypothesis): the odds ratio equals some value other than 1
+        
+        Return
+        ------
+        TestResult : odds ratio and p-value of the test of log(OR) = 0, confidence interval 
+            in details['interval']
+        '''
+        
+        self.test_title='Odds Ratio'
+        start = perf_counter()
+        
+        ratio, low, high, p = self._contingency_table().odds_ratio(confidence)
+        return self._result(ratio, p, start, details={'interval': (low, high)},
+                            conclusions=('The odds ratio equals 1. Probably independent',
+                                         'The odds ratio equals some value other than 1. Probably dependent'))
+
+    def correlation_matrix(self, method='pearson', size=None):
+        ''' Matrix mode: all pairwise correlations of the columns of P (and Q)
+        
+        P is a data matrix of size (N,K) (Q, if given, is appended as further columns). 
+        The K x K coefficients and p-values are computed at once (see 
+        correlation_matrix.correlation_matrix) instead of one test object per pair.
+        
+        H0 (null hypothesis), for every pair: correlation between the two variables equals 0
+        H1 (alternate hypothesis): the correlation between the two variables equals some value other than 0
+        
+        Parameters
+        ----------
+        method : 'pearson' (Test 28), 'spearman' (Test 29), 'kendall' (Test 30) or 'partial' 
+            (Test 28l, every pair controlling for all the other variables)
+        size : number of variables per tile of the matrix product
+        
+        Return
+        ------
+        TestResult : coefficient and p-value matrices of size (K,K)
+        '''
+        
+        self.test_title = 'Correlation Matrix (' + method + ')'
+        start = perf_counter()
+        
+        X = np.asarray(self.P, dtype=float)
+        if X.ndim == 1:
+            X = X[:, None]
+        if self.Q is not None:
+            X = np.column_stack((X, self.Q))
+        R, p = correlation_matrix(X, method, size)
+        return self._result(R, p, start, details={'method': method})
 
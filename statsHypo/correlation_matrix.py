@@ -0,0 +1,98 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Correlation matrices of many variables
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from scipy.stats import t as t_dist
+from numpy import asarray, sqrt, abs, clip, empty, errstate, fill_diagonal
+from ranks import RowRanks
+from concordance import kendall_tau_b
+from covariance import CovarianceMatrix
+
+
+block_size = 1024 # number of variables per tile of the correlation matrices
+
+
+def _standardized(X):
+    ''' Columns centred and scaled to unit norm, so that Z^T Z is the correlation matrix '''
+    Z = X - X.mean(axis=0)
+    with errstate(invalid='ignore', divide='ignore'):
+        Z /= sqrt((Z*Z).sum(axis=0))
+    return Z
+
+
+def _product_tiles(Z, size):
+    ''' Correlation matrix Z^T Z of standardized columns, computed tile by tile
+
+    Only the tiles on and above the diagonal are multiplied (the lower tiles are
+    their transposes), so the temporaries never exceed one (size, size) tile.
+    '''
+    K = Z.shape[1]
+    R = empty((K, K))
+    for i in range(0, K, size):
+        Zi = Z[:, i:i+size]
+        for j in range(i, K, size):
+            tile = Zi.T @ Z[:, j:j+size]
+            R[i:i+size, j:j+size] = tile
+            R[j:j+size, i:i+size] = tile.T
+    return clip(R, -1., 1.)
+
+
+def _kendall(X, size):
+    ''' Kendall tau-b and p-value matrices: every column is sorted once and compared with
+    all the following columns at once (in batches of size columns) '''
+    K = X.shape[1]
+    R, P = empty((K, K)), empty((K, K))
+    for i in range(K):
+        for j in range(i+1, K, size):
+            tau, p = kendall_tau_b(X[:, i], X[:, j:j+size])
+            R[i, j:j+size], P[i, j:j+size] = tau, p
+            R[j:j+size, i], P[j:j+size, i] = tau, p
+    fill_diagonal(R, 1.)
+    fill_diagonal(P, 0.)
+    return (R, P)
+
+
+def correlation_matrix(X, method='pearson', size=None):
+    ''' All pairwise correlations of the K columns of an (N,K) data matrix
+
+    'pearson' : one product of the standardized data matrix
+    'spearman' : Pearson correlations of the column ranks (one sort of every column)
+    'kendall' : tau-b of every column with the following ones, by merge-sort
+        inversion counting (see concordance.kendall_tau_b)
+    'partial' : partial correlations of every pair controlling for all the other
+        variables, from one inversion of the correlation matrix (see CovarianceMatrix)
+
+    The p-values of the Pearson and Spearman coefficients come from the t statistic
+    r sqrt((N-2)/(1-r^2)) with N-2 degrees-of-freedom.
+
+    Parameters
+    ----------
+    X : data of size (N,K) (N observations of K variables)
+    method : 'pearson', 'spearman', 'kendall' or 'partial'
+    size : number of variables per tile (defaults to block_size)
+
+    Returns
+    -------
+    (R, P) : coefficients and two-sided p-values, matrices of size (K,K)
+    '''
+    X = asarray(X, dtype=float)
+    N = X.shape[0]
+    size = block_size if size is None else int(size)
+    if method == 'kendall':
+        return _kendall(X, size)
+    if method == 'partial':
+        return CovarianceMatrix.get(X).partial_correlations()
+    if method == 'spearman':
+        X = RowRanks(X.T).ranks.T
+    elif method != 'pearson':
+        raise ValueError('Unknown correlation method: '+str(method))
+    R = _product_tiles(_standardized(X), size)
+    with errstate(invalid='ignore', divide='ignore'):
+        t = R * sqrt((N - 2.) / ((1. - R)*(1. + R)))
+    P = 2.*t_dist.sf(abs(t), N - 2)
+    fill_diagonal(P, 0.)
+    return (R, P)
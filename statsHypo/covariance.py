@@ -0,0 +1,186 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Covariance and precision matrices (partial, semipartial and multiple correlation)
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from collections import OrderedDict
+from threading import Lock
+from scipy.linalg import cho_factor, cho_solve
+from scipy.stats import t as t_dist
+from scipy.stats import f
+from numpy import asarray, outer, sqrt, diag, eye, abs, clip, errstate, fill_diagonal, ix_, sign
+from sample import Samples
+
+
+class CovarianceMatrix:
+    ''' Covariance matrix of K variables and its inverse
+
+    The sample size, means and co-moment matrix (sums of products of deviations
+    from the means) are accumulated once; rows appended later are merged with the
+    pairwise update of Chan et al., without revisiting the previous rows, into a
+    new instance (memoized instances are shared and never modified). The
+    precision matrix (inverse of the correlation matrix) is computed once by
+    Cholesky factorization and cached until rows are appended, so that all
+    partial, semipartial and multiple correlations of the K variables follow from
+    a single K x K inversion. Instances are memoized per data content (see
+    CovarianceMatrix.get).
+
+    Parameters
+    ----------
+    X : data of size (n,K) (n observations of K variables)
+    '''
+
+    cache_size = 16 # number of memoized covariance matrices (class variable)
+    _cache = OrderedDict()
+    _lock = Lock()
+
+    def __init__(self, X):
+        X = asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[:, None]
+        self.n = X.shape[0]
+        self.K = X.shape[1]
+        self.mean = X.mean(axis=0)
+        D = X - self.mean
+        self.M = D.T @ D
+        self._precision = None
+
+    @staticmethod
+    def get(X):
+        ''' Memoized CovarianceMatrix of the data (shared by all callers, see append) '''
+        key = Samples.sample_key(X)
+        cache = CovarianceMatrix._cache
+        with CovarianceMatrix._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        cov = CovarianceMatrix(X)
+        with CovarianceMatrix._lock:
+            cache[key] = cov
+            if len(cache) > CovarianceMatrix.cache_size:
+                cache.popitem(last=False)
+        return cov
+
+    def append(self, rows):
+        ''' CovarianceMatrix of the accumulated rows and the rows of size (m,K)
+
+        The moments are merged into a new instance; this instance (possibly memoized
+        and shared) is left unchanged.
+        '''
+        other = CovarianceMatrix(rows)
+        merged = CovarianceMatrix.__new__(CovarianceMatrix)
+        merged.n, merged.K = self.n + other.n, self.K
+        delta = other.mean - self.mean
+        merged.M = self.M + other.M + outer(delta, delta) * (self.n*other.n/merged.n)
+        merged.mean = self.mean + delta*(other.n/merged.n)
+        merged._precision = None
+        return merged
+
+    def covariance(self, ddof=1):
+        ''' Covariance matrix of size (K,K) '''
+        return self.M / (self.n - ddof)
+
+    def correlation(self):
+        ''' Correlation matrix of size (K,K) '''
+        with errstate(invalid='ignore', divide='ignore'):
+            s = 1. / sqrt(diag(self.M))
+        return clip(self.M * outer(s, s), -1., 1.)
+
+    def precision(self):
+        ''' Inverse of the correlation matrix, by Cholesky factorization (cached) '''
+        if self._precision is None:
+            self._precision = cho_solve(cho_factor(self.correlation()), eye(self.K))
+        return self._precision
+
+    def _subset(self, columns):
+        ''' CovarianceMatrix restricted to the given variables (sharing no state) '''
+        sub = CovarianceMatrix.__new__(CovarianceMatrix)
+        sub.n, sub.K = self.n, len(columns)
+        sub.mean, sub.M = self.mean[columns], self.M[ix_(columns, columns)]
+        sub._precision = None
+        return sub
+
+    def _t_test(self, r, controls):
+        ''' Two-sided t test of (semi)partial correlations with the given number of controls '''
+        df = self.n - 2 - controls
+        with errstate(invalid='ignore', divide='ignore'):
+            t = r * sqrt(df / ((1. - r)*(1. + r)))
+        return 2.*t_dist.sf(abs(t), df)
+
+    def partial_correlations(self):
+        ''' Partial correlations of every pair of variables controlling for all the others
+
+        r_ij.rest = -P_ij / sqrt(P_ii P_jj), P the precision matrix.
+
+        Returns
+        -------
+        (R, p) : partial correlations and two-sided p-values (n-K dof), of size (K,K)
+        '''
+        P = self.precision()
+        s = 1. / sqrt(diag(P))
+        R = clip(-P * outer(s, s), -1., 1.)
+        fill_diagonal(R, 1.)
+        p = self._t_test(R, self.K - 2)
+        fill_diagonal(p, 0.)
+        return (R, p)
+
+    def partial_correlation(self, i, j, controls=()):
+        ''' Partial correlation of variables i and j controlling for the variables in controls
+
+        When the controls are all the other variables, the correlation is read from the
+        cached precision matrix; otherwise the subset of the variables is inverted.
+
+        Returns
+        -------
+        (r, p) : partial correlation and two-sided p-value
+        '''
+        controls = [c for c in controls if c not in (i, j)]
+        if len(set(controls)) == self.K - 2:
+            P = self.precision()
+            r = clip(-P[i, j] / sqrt(P[i, i]*P[j, j]), -1., 1.)
+            return (r, self._t_test(r, self.K - 2))
+        R, p = self._subset([i, j] + controls).partial_correlations()
+        return (R[0, 1], p[0, 1])
+
+    def semipartial_correlations(self, y=0):
+        ''' Semipartial correlations of variable y with every other variable
+
+        The semipartial correlation of y with x_i removes the other variables from x_i
+        only; its square is the increase of the squared multiple correlation of y when
+        x_i enters the model:
+            sr_i = pr_i sqrt((1 - R2) / (1 - pr_i^2))
+        with pr_i the partial correlation and R2 the squared multiple correlation of y
+        on all the other variables. The t test is the test of the partial correlation.
+
+        Returns
+        -------
+        (sr, p) : semipartial correlations and two-sided p-values of size (K,) (NaN at y)
+        '''
+        R, p = self.partial_correlations()
+        pr = R[y].copy()
+        pr[y] = float('nan')
+        R2 = 1. - 1./self.precision()[y, y]
+        with errstate(invalid='ignore', divide='ignore'):
+            sr = sign(pr) * sqrt(pr*pr * (1. - R2) / (1. - pr*pr))
+        q = p[y].copy()
+        q[y] = float('nan')
+        return (sr, q)
+
+    def multiple_correlations(self):
+        ''' Multiple correlation of every variable with all the other variables
+
+        R_i^2 = 1 - 1/P_ii, P the precision matrix, tested with
+        F = (R^2 / (K-1)) / ((1 - R^2) / (n-K)).
+
+        Returns
+        -------
+        (R, F, p) : multiple correlations, F statistics (K-1, n-K dof) and p-values of size (K,)
+        '''
+        R2 = clip(1. - 1./diag(self.precision()), 0., 1.)
+        k = self.K - 1
+        with errstate(invalid='ignore', divide='ignore'):
+            F = (R2 / k) / ((1. - R2) / (self.n - k - 1))
+        return (sqrt(R2), F, f.sf(F, k, self.n - k - 1))
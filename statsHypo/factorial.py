@@ -0,0 +1,309 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Factorial analysis of variance engine
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from itertools import combinations
+from scipy.stats import f
+from numpy import asarray, unique, bincount, ravel_multi_index, unravel_index, prod, eye, ones
+from numpy import vstack, column_stack, flatnonzero, sqrt, empty, kron
+from numpy.linalg import lstsq
+from repeated import contrasts
+
+
+class FactorialCells:
+    ''' Cell statistics of a factorial design
+
+    The observations are reduced once to the counts, sums and sums of squares of
+    the cells (the combinations of factor levels), with np.bincount over the
+    combined cell codes. Every sum of squares of the design follows from these
+    cell statistics, so the cost in the number of observations is a single pass.
+
+    Parameters
+    ----------
+    values : observations of size (N,)
+    factors : factor codes (labels) of every observation, of size (N,f), or list of f
+        arrays of size (N,)
+    names : names of the factors (defaults to 'A', 'B', 'C', ...)
+    '''
+
+    def __init__(self, values, factors, names=None):
+        values = asarray(values, dtype=float)
+        factors = asarray(factors)
+        if factors.ndim == 1:
+            factors = factors[:, None]
+        elif factors.shape[0] != values.shape[0]:
+            factors = factors.T
+        self.N = values.shape[0]
+        self.nfactors = factors.shape[1]
+        self.names = [chr(ord('A')+i) for i in range(self.nfactors)] if names is None else list(names)
+        self.levels, codes = [], []
+        for i in range(self.nfactors):
+            lev, code = unique(factors[:, i], return_inverse=True)
+            self.levels.append(lev)
+            codes.append(code.ravel())
+        self.shape = tuple(len(lev) for lev in self.levels)
+        self.cell_codes = ravel_multi_index(codes, self.shape)
+        size = int(prod(self.shape))
+        self.grand_mean = values.mean()
+        y = values - self.grand_mean # centred, for accurate sums of squares
+        self.counts = bincount(self.cell_codes, minlength=size).reshape(self.shape)
+        self.sums = bincount(self.cell_codes, weights=y, minlength=size).reshape(self.shape)
+        sumsq = bincount(self.cell_codes, weights=y*y, minlength=size).reshape(self.shape)
+        full = self.counts > 0
+        self.ss_within = sumsq.sum() - (self.sums[full]**2 / self.counts[full]).sum()
+        self.ss_total = sumsq.sum()
+        self.nonempty = int(full.sum())
+        self.df_within = self.N - self.nonempty
+
+    def effects(self):
+        ''' All main effects and interactions, as tuples of factor indices '''
+        return [e for r in range(1, self.nfactors+1) for e in combinations(range(self.nfactors), r)]
+
+    def effect_name(self, effect):
+        return ':'.join(self.names[i] for i in effect)
+
+    def balanced(self):
+        ''' True when all cells hold the same (nonzero) number of observations '''
+        return bool((self.counts == self.counts.flat[0]).all() and self.counts.flat[0] > 0)
+
+    def marginal_q(self, subset):
+        ''' Sum over the margins of subset of (marginal sum)^2 / marginal count (centred data) '''
+        axes = tuple(i for i in range(self.nfactors) if i not in subset)
+        s, n = self.sums.sum(axis=axes), self.counts.sum(axis=axes)
+        return (s[n > 0]**2 / n[n > 0]).sum()
+
+    def _balanced_ss(self, effect):
+        ''' Sum of squares of an effect by inclusion-exclusion of the marginal Q terms '''
+        return sum((-1)**(len(effect)-r) * self.marginal_q(sub)
+                   for r in range(len(effect)+1) for sub in combinations(effect, r))
+
+    def _term_columns(self, effect, cells):
+        ''' Sum-to-zero coded columns of an effect at the given cells '''
+        idx = unravel_index(cells, self.shape)
+        X = ones((cells.shape[0], 1))
+        for i in effect:
+            L = self.shape[i]
+            coding = vstack((eye(L-1), -ones((1, L-1))))[idx[i]]
+            X = (X[:, :, None] * coding[:, None, :]).reshape(cells.shape[0], -1)
+        return X
+
+    def _rss(self, effects, columns, weights, means, intercept=True):
+        ''' Weighted residual sum of squares of the cell means for a model with the given effects '''
+        X = column_stack(([ones(means.shape[0])] if intercept else []) + [columns[e] for e in effects])
+        coef, _, rank, _ = lstsq(X * weights[:, None], means * weights, rcond=None)
+        r = means - X @ coef
+        return (weights**2 * r * r).sum(), rank
+
+    def anova(self, ss_type=2):
+        ''' Between-subjects factorial ANOVA table
+
+        For balanced designs the sums of squares of all effects come from the marginal
+        sums of the cells. For unbalanced designs, the model fits only depend on the
+        cell means and counts: every model is fitted by least squares on the nonempty
+        cells, weighted by the cell counts, and Type II (each effect adjusted for all
+        effects not containing it) or Type III (each effect adjusted for all others,
+        sum-to-zero coding) sums of squares are the differences of residual sums.
+
+        Parameters
+        ----------
+        ss_type : 2 or 3 (types coincide for balanced designs)
+
+        Returns
+        -------
+        dictionary with 'effects' (names), and arrays 'ss', 'dof', 'F', 'p' of the effects,
+        'ss_within' and 'df_within'
+        '''
+        if ss_type not in (2, 3):
+            raise ValueError('Unknown type of sums of squares: '+str(ss_type))
+        effects = self.effects()
+        ss, dof = empty(len(effects)), empty(len(effects))
+        if self.balanced():
+            for e_idx, effect in enumerate(effects):
+                ss[e_idx] = self._balanced_ss(effect)
+                dof[e_idx] = prod([self.shape[i]-1 for i in effect])
+        else:
+            cells = flatnonzero(self.counts > 0)
+            n = self.counts.ravel()[cells].astype(float)
+            means = self.sums.ravel()[cells] / n
+            weights = sqrt(n)
+            columns = {e: self._term_columns(e, cells) for e in effects}
+            full, full_rank = self._rss(effects, columns, weights, means)
+            for e_idx, effect in enumerate(effects):
+                if ss_type == 3:
+                    others = [e for e in effects if e != effect]
+                    reduced, rank = self._rss(others, columns, weights, means)
+                    ss[e_idx], dof[e_idx] = reduced - full, full_rank - rank
+                else:
+                    others = [e for e in effects if not set(effect) <= set(e)]
+                    reduced, rank = self._rss(others, columns, weights, means)
+                    fitted, fitted_rank = self._rss(others + [effect], columns, weights, means)
+                    ss[e_idx], dof[e_idx] = reduced - fitted, fitted_rank - rank
+        ms_within = self.ss_within / self.df_within
+        F = (ss/dof) / ms_within
+        return {'effects': [self.effect_name(e) for e in effects], 'ss': ss, 'dof': dof,
+                'F': F, 'p': f.sf(F, dof, self.df_within),
+                'ss_within': self.ss_within, 'df_within': self.df_within}
+
+
+    def intercept_ss(self, ss_type=2):
+        ''' Sum of squares of the hypothesis of a null grand mean
+
+        Type II: N times the squared grand mean; Type III: the intercept of the sum-to-zero
+        coded model (the unweighted mean of the cell means), adjusted for all effects.
+        '''
+        if ss_type == 2 or self.balanced():
+            return self.N * self.grand_mean**2
+        effects = self.effects()
+        cells = flatnonzero(self.counts > 0)
+        n = self.counts.ravel()[cells].astype(float)
+        means = self.sums.ravel()[cells] / n + self.grand_mean
+        columns = {e: self._term_columns(e, cells) for e in effects}
+        full = self._rss(effects, columns, sqrt(n), means)[0]
+        return self._rss(effects, columns, sqrt(n), means, intercept=False)[0] - full
+
+
+def factor_columns(factors, N):
+    ''' List of the factor code arrays of (N,f) or (f,N) codes, a list of arrays or None '''
+    if factors is None:
+        return []
+    factors = asarray(factors)
+    if factors.ndim == 1:
+        return [factors]
+    return list(factors.T if factors.shape[0] == N else factors)
+
+
+class RepeatedMeasuresCells:
+    ''' Cell statistics of a mixed (between x within subjects) or within-subjects factorial design
+
+    Every subject is observed once in every cell of the within-subjects factors and
+    belongs to one level combination of the between-subjects factors. Subjects are
+    never expanded into dummy variables: the subject terms of the sums of squares
+    are marginal sums over (subject, within-factor levels), obtained by
+    np.bincount over the combined subject and level codes, so that the memory and
+    time are linear in the number of observations.
+
+    When the groups of the between-subjects factors hold equal numbers of subjects,
+    the sums of squares follow from the marginal terms
+        Q(T) = sum over the margins of T of (marginal sum)^2 / (marginal count)
+    (centred data) by inclusion-exclusion. Otherwise, every subject is reduced to
+    the orthonormal contrasts of the within-subjects part W of the effects (its
+    mean for W empty), and the between-subjects part is tested on these scores
+    with the Type II or III sums of squares of FactorialCells (summed over the
+    contrasts). The error term of an effect with within-subjects part W is the
+    interaction W x Subjects (within the groups of the between-subjects factors).
+
+    Parameters
+    ----------
+    values : observations of size (N,)
+    subjects : subject of every observation, of size (N,)
+    between : between-subjects factor codes, of size (N,b) (or list of b arrays); None if b=0
+    within : within-subjects factor codes, of size (N,w) (or list of w arrays)
+    names : names of the between then within factors (defaults to 'A', 'B', ...)
+    '''
+
+    def __init__(self, values, subjects, within, between=None, names=None):
+        values = asarray(values, dtype=float)
+        between, within = factor_columns(between, values.shape[0]), factor_columns(within, values.shape[0])
+        self.nbetween, self.nwithin = len(between), len(within)
+        self.cells = FactorialCells(values, between + within, names)
+        self.names = self.cells.names
+        _, subject_codes = unique(asarray(subjects), return_inverse=True)
+        self.subject_codes = subject_codes.ravel()
+        self.nsubjects = int(self.subject_codes.max()) + 1
+        idx = unravel_index(self.cells.cell_codes, self.cells.shape)
+        self._idx = idx
+        within_shape = self.cells.shape[self.nbetween:]
+        size = int(prod(within_shape))
+        full = bincount(self.subject_codes * size + ravel_multi_index(idx[self.nbetween:], within_shape),
+                        minlength=self.nsubjects * size)
+        if not (full == 1).all():
+            raise ValueError('Every subject must be observed exactly once in every within-subjects cell')
+        between_cells = self.cells.counts.sum(axis=tuple(range(self.nbetween, self.cells.nfactors)))
+        self.nbetween_cells = int((between_cells > 0).sum())
+        self.balanced = bool((between_cells == between_cells.flat[0]).all())
+        if self.nbetween:
+            pairs = unique(self.subject_codes * between_cells.size
+                           + ravel_multi_index(idx[:self.nbetween], self.cells.shape[:self.nbetween]))
+            if pairs.shape[0] != self.nsubjects:
+                raise ValueError('The between-subjects factors must be constant within every subject')
+        self._y = values - self.cells.grand_mean
+
+    def subject_q(self, subset):
+        ''' Q of the margins (subject x within factors in subset) '''
+        shape = [self.nsubjects] + [self.cells.shape[i] for i in subset]
+        code = ravel_multi_index([self.subject_codes] + [self._idx[i] for i in subset], shape)
+        size = int(prod(shape))
+        s = bincount(code, weights=self._y, minlength=size)
+        n = bincount(code, minlength=size)
+        return (s[n > 0]**2 / n[n > 0]).sum()
+
+    def _contrast_ss(self, ss_type):
+        ''' Sums of squares of the effects (dictionary by effect) from the contrast scores of
+        the subjects, for groups of unequal sizes '''
+        cells = self.cells
+        within_shape = cells.shape[self.nbetween:]
+        size = int(prod(within_shape))
+        Y = empty(self.nsubjects*size)
+        Y[self.subject_codes*size + ravel_multi_index(self._idx[self.nbetween:], within_shape)] = self._y
+        Y = Y.reshape(self.nsubjects, size)
+        groups = empty((self.nsubjects, self.nbetween), dtype=int)
+        groups[self.subject_codes] = column_stack(self._idx[:self.nbetween])
+        between_effects = [e for e in cells.effects() if e[-1] < self.nbetween]
+        within = tuple(range(self.nbetween, cells.nfactors))
+        ss = {}
+        for w in [()] + [e for e in cells.effects() if e[0] >= self.nbetween]:
+            C = ones((1, 1))
+            for i in within:
+                L = cells.shape[i]
+                C = kron(C, contrasts(L) if i in w else ones((L, 1))/sqrt(L))
+            for e in [()] + between_effects:
+                ss[e + w] = 0.
+            for scores in (Y @ C).T:
+                sub = FactorialCells(scores, groups)
+                if w:
+                    ss[w] += sub.intercept_ss(ss_type)
+                res = sub.anova(ss_type)
+                for e, s in zip(between_effects, res['ss']):
+                    ss[e + w] += s
+        return ss
+
+    def anova(self, ss_type=2):
+        ''' Factorial ANOVA table of the design, with the error term of every effect
+
+        Parameters
+        ----------
+        ss_type : 2 or 3, type of sums of squares when the groups of the between-subjects
+            factors hold unequal numbers of subjects (types coincide otherwise)
+
+        Returns
+        -------
+        dictionary with 'effects' and 'errors' (names), and arrays 'ss', 'dof', 'F', 'p',
+        'ss_error', 'df_error' of the effects
+        '''
+        cells = self.cells
+        between = tuple(range(self.nbetween))
+        effects = cells.effects()
+        if ss_type not in (2, 3):
+            raise ValueError('Unknown type of sums of squares: '+str(ss_type))
+        unbalanced = None if self.balanced else self._contrast_ss(ss_type)
+        ss, dof, ss_error, df_error, errors = [], [], [], [], []
+        for effect in effects:
+            ss.append(cells._balanced_ss(effect) if unbalanced is None else unbalanced[effect])
+            dof.append(prod([cells.shape[i]-1 for i in effect]))
+            w = tuple(i for i in effect if i >= self.nbetween)
+            # error: (within part) x subjects within the between-subjects groups
+            err = sum((-1)**(len(w)-r) * (self.subject_q(sub) - cells.marginal_q(between + sub))
+                      for r in range(len(w)+1) for sub in combinations(w, r))
+            ss_error.append(err)
+            df_error.append((self.nsubjects - self.nbetween_cells) * prod([cells.shape[i]-1 for i in w]))
+            subjects = 'S' if not between else 'S/' + cells.effect_name(between)
+            errors.append(subjects if not w else cells.effect_name(w) + ':' + subjects)
+        ss, dof, ss_error, df_error = (asarray(x, dtype=float) for x in (ss, dof, ss_error, df_error))
+        F = (ss/dof) / (ss_error/df_error)
+        return {'effects': [cells.effect_name(e) for e in effects], 'errors': errors, 'ss': ss,
+                'dof': dof, 'F': F, 'p': f.sf(F, dof, df_error), 'ss_error': ss_error,
+                'df_error': df_error}
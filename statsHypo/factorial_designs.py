@@ -7,6 +7,8 @@
 
 
 from sample import Samples
+from factorial import FactorialCells, RepeatedMeasuresCells, factor_columns
+from time import perf_counter
 
 
 class InferenceFactorialDesigns(Samples):
@@ -21,6 +23,9 @@ class InferenceFactorialDesigns(Samples):
     Test 27f: Dunnett Test
     Test 27i: Factorial Analysis of Variance for a Mixed Design
     Test 27j: Within-Subjects Factorial Analysis of Variance
+    
+    Data are in long format: P holds the observations (N,) and Q the integer codes (or 
+    labels) of the factors of every observation, of size (N,f) or a list of f arrays.
     '''
     def __init__(self, P, Q, alpha, inf_parameters=[], test_title=''):
         super().__init__(P, test_title)
@@ -29,5 +34,117 @@ class InferenceFactorialDesigns(Samples):
         self.inf_parameters=inf_parameters
 
 
-   
+    def between_subjects_factorial_anova(self, ss_type=2, names=None):
+        ''' Test 27: Between-Subjects Factorial Analysis of Variance 
+        
+        All main effects and interactions of the factors in Q, computed from the cell counts 
+        and sums (see FactorialCells); balanced and unbalanced (Type II or III sums of 
+        squares) designs.
+        
+        H0 (null hypothesis), for every effect: 
+        	-> the effect (main effect or interaction) is null
+        H1 (alternate hypothesis): 
+        	-> the effect is not null
+        
+        Parameters
+        ----------
+        ss_type : type of sums of squares of unbalanced designs, 2 or 3
+        names : names of the factors (defaults to 'A', 'B', ...)
+        
+        Return
+        ------
+        TestResult : F statistics and p-values of the effects (named in details['effects']), 
+            dof = (dof of the effects, within-groups dof)
+        '''
+        
+        self.test_title='Between-Subjects Factorial Analysis of Variance'
+        start = perf_counter()
+        
+        res = FactorialCells(self.P, self.Q, names).anova(ss_type)
+        
+        return self._result(res['F'], res['p'], start, samples=(self.P,),
+                            dof=(res['dof'], res['df_within']),
+                            details={'effects': res['effects'], 'ss': res['ss'],
+                                     'ss_within': res['ss_within']})
+
+
+
+    def _repeated_measures_result(self, subjects, between, names, ss_type=2):
+        ''' TestResult of the factorial ANOVA of Q, the factors of index in between varying 
+        between subjects and the others within subjects '''
+        start = perf_counter()
+        factors = factor_columns(self.Q, len(self.P))
+        between = [i for i in range(len(factors)) if i in between]
+        within = [i for i in range(len(factors)) if i not in between]
+        names = [chr(ord('A')+i) for i in range(len(factors))] if names is None else list(names)
+        res = RepeatedMeasuresCells(self.P, subjects, [factors[i] for i in within],
+                                    [factors[i] for i in between] or None,
+                                    [names[i] for i in between + within]).anova(ss_type)
+        
+        return self._result(res['F'], res['p'], start, samples=(self.P,),
+                            dof=(res['dof'], res['df_error']),
+                            details={'effects': res['effects'], 'ss': res['ss'],
+                                     'errors': res['errors'], 'ss_error': res['ss_error']})
+
+
+    def mixed_design_factorial_anova(self, subjects, between=(0,), ss_type=2, names=None):
+        ''' Test 27i: Factorial Analysis of Variance for a Mixed Design 
+        
+        The factors of Q listed in between vary between subjects, the others within 
+        subjects (every subject is observed once in every level combination of the 
+        within-subjects factors). The subject terms are computed by grouped reductions 
+        over the subject codes (see RepeatedMeasuresCells), without dummy variables.
+        The between-subjects effects are tested against the subjects within groups, 
+        and every effect involving within-subjects factors W against the W x subjects 
+        within groups interaction. With unequal numbers of subjects in the groups, the 
+        effects are Type II or III sums of squares of the subject means and contrasts.
+        
+        H0 (null hypothesis), for every effect: 
+        	-> the effect (main effect or interaction) is null
+        H1 (alternate hypothesis): 
+        	-> the effect is not null
+        
+        Parameters
+        ----------
+        subjects : subject of every observation, of size (N,)
+        between : indices of the between-subjects factors in Q
+        ss_type : type of sums of squares of unequal group sizes, 2 or 3
+        names : names of the factors of Q (defaults to 'A', 'B', ...)
+        
+        Return
+        ------
+        TestResult : F statistics and p-values of the effects (named in details['effects'], 
+            with their error terms in details['errors']), dof = (dof of the effects, 
+            dof of their error terms)
+        '''
+        
+        self.test_title='Factorial Analysis of Variance for a Mixed Design'
+        return self._repeated_measures_result(subjects, tuple(between), names, ss_type)
+
 
+    def within_subjects_factorial_anova(self, subjects, names=None):
+        ''' Test 27j: Within-Subjects Factorial Analysis of Variance 
+        
+        All factors of Q vary within subjects, every subject being observed once in 
+        every level combination. Every effect E is tested against the E x subjects 
+        interaction (see RepeatedMeasuresCells).
+        
+        H0 (null hypothesis), for every effect: 
+        	-> the effect (main effect or interaction) is null
+        H1 (alternate hypothesis): 
+        	-> the effect is not null
+        
+        Parameters
+        ----------
+        subjects : subject of every observation, of size (N,)
+        names : names of the factors of Q (defaults to 'A', 'B', ...)
+        
+        Return
+        ------
+        TestResult : F statistics and p-values of the effects (named in details['effects'], 
+            with their error terms in details['errors']), dof = (dof of the effects, 
+            dof of their error terms)
+        '''
+        
+        self.test_title='Within-Subjects Factorial Analysis of Variance'
+        return self._repeated_measures_result(subjects, (), names)
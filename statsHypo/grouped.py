@@ -0,0 +1,165 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Grouped samples and grouped reductions
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from numpy import asarray, concatenate, cumsum, diff, repeat, arange, bincount, argsort, unique
+from numpy import lexsort, floor, minimum, sqrt, errstate, nan, where
+from sample import DescriptiveSummary
+
+
+class GroupedSamples:
+    ''' k samples stored contiguously (values + offsets, as a CSR layout)
+
+    The values of all groups are held in one array, group i occupying
+    values[offsets[i]:offsets[i+1]]. Per-group statistics are computed with
+    grouped reductions over the whole array (bincount over the group codes,
+    one sort for the quantiles) rather than with a Python loop over the
+    groups, which scales to thousands of groups.
+
+    Build from a list of samples (GroupedSamples.from_groups) or from long-format
+    data, one value and one group label per observation (GroupedSamples.from_long).
+
+    Parameters
+    ----------
+    values : values of all groups, group after group, of size (N,)
+    offsets : start of every group and N, of size (k+1,)
+    labels : label of every group (defaults to 0, ..., k-1)
+    '''
+
+    def __init__(self, values, offsets, labels=None):
+        self.values = asarray(values, dtype=float)
+        self.offsets = asarray(offsets)
+        self.counts = diff(self.offsets)
+        self.k = self.counts.shape[0]
+        self.N = self.values.shape[0]
+        self.labels = arange(self.k) if labels is None else asarray(labels)
+        self.codes = repeat(arange(self.k), self.counts) # group of every value
+        self._moments = None
+        self._sorted = None
+
+    @staticmethod
+    def from_groups(groups):
+        ''' GroupedSamples of a list of samples '''
+        groups = [asarray(g, dtype=float).ravel() for g in groups]
+        offsets = concatenate(([0], cumsum([g.shape[0] for g in groups])))
+        return GroupedSamples(concatenate(groups), offsets)
+
+    @staticmethod
+    def from_long(values, labels, within=None):
+        ''' GroupedSamples of long-format data
+
+        Parameters
+        ----------
+        values : observations of size (N,)
+        labels : group label of every observation, of size (N,); the groups are
+            ordered by label
+        within : key ordering the values within every group, of size (N,) (e.g. the
+            subjects of repeated measures); by default the order of the values is kept
+        '''
+        values, labels = asarray(values, dtype=float), asarray(labels)
+        groups, codes = unique(labels, return_inverse=True)
+        codes = codes.ravel()
+        if within is None:
+            order = argsort(codes, kind='stable')
+        else:
+            order = lexsort((asarray(within), codes))
+        counts = bincount(codes, minlength=groups.shape[0])
+        return GroupedSamples(values[order], concatenate(([0], cumsum(counts))), groups)
+
+    def __len__(self):
+        return self.k
+
+    def __getitem__(self, i):
+        return self.group(i)
+
+    def __iter__(self):
+        return (self.group(i) for i in range(self.k))
+
+    def group(self, i):
+        ''' Values of the i-th group (a view) '''
+        return self.values[self.offsets[i]:self.offsets[i+1]]
+
+    def sums(self, x=None):
+        ''' Per-group sums of x (defaults to the values), x of size (N,) '''
+        return bincount(self.codes, weights=self.values if x is None else x, minlength=self.k)
+
+    def mean(self):
+        ''' Per-group means '''
+        return self.moments()[0]
+
+    def var(self, ddof=1):
+        ''' Per-group variances '''
+        with errstate(invalid='ignore', divide='ignore'):
+            return self.moments()[1] / (self.counts - ddof)
+
+    def std(self, ddof=1):
+        ''' Per-group standard deviations '''
+        return sqrt(self.var(ddof))
+
+    def moments(self):
+        ''' Per-group mean and sums of the 2nd, 3rd and 4th powers of the deviations from the mean '''
+        if self._moments is None:
+            with errstate(invalid='ignore', divide='ignore'):
+                mean = where(self.counts > 0, self.sums() / self.counts, nan)
+            d = self.values - mean[self.codes]
+            d2 = d*d
+            self._moments = (mean, self.sums(d2), self.sums(d2*d), self.sums(d2*d2))
+        return self._moments
+
+    def sorted_values(self):
+        ''' Values sorted within each group (one sort of the whole array) '''
+        if self._sorted is None:
+            self._sorted = self.values[lexsort((self.values, self.codes))]
+        return self._sorted
+
+    def quantiles(self, q):
+        ''' Per-group quantiles (linear interpolation, as numpy.quantile)
+
+        Parameters
+        ----------
+        q : quantile levels of size (m,)
+
+        Returns
+        -------
+        quantiles of size (k, m) (NaN for empty groups)
+        '''
+        s = self.sorted_values()
+        q = asarray(q, dtype=float)
+        pos = (self.counts[:, None] - 1) * q[None, :]
+        low = floor(pos).astype(int)
+        frac = pos - low
+        base = self.offsets[:-1, None]
+        empty = self.counts[:, None] == 0
+        i = where(empty, 0, base + low)
+        j = where(empty, 0, base + minimum(low+1, self.counts[:, None]-1))
+        return where(empty, nan, s[i] + frac*(s[j] - s[i]))
+
+    def min(self):
+        ''' Per-group minima '''
+        return self.quantiles([0.])[:, 0]
+
+    def max(self):
+        ''' Per-group maxima '''
+        return self.quantiles([1.])[:, 0]
+
+    def summaries(self):
+        ''' DescriptiveSummary of every group, from the grouped reductions
+
+        Skewness and kurtosis are the biased (Fisher) estimates, as reported by
+        scipy.stats.describe.
+        '''
+        mean, M2, M3, M4 = self.moments()
+        n = self.counts.astype(float)
+        with errstate(invalid='ignore', divide='ignore'):
+            m2, m3, m4 = M2/n, M3/n, M4/n
+            skewness = m3 / m2**1.5
+            kurtosis = m4 / m2**2 - 3.
+        variance = self.var()
+        qs = self.quantiles([0., .25, .5, .75, 1.])
+        return [DescriptiveSummary.from_fields(int(n[i]), qs[i, 0], qs[i, 4], mean[i], variance[i],
+                                               skewness[i], kurtosis[i], qs[i, 1], qs[i, 2], qs[i, 3])
+                for i in range(self.k)]
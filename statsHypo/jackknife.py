@@ -0,0 +1,182 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Jackknife (leave-one-out and delete-d)
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations, chain
+from math import comb
+from os import cpu_count
+from numpy import asarray, arange, fromiter, ones, zeros, empty, nonzero, sqrt, log, array
+from sample import Samples
+
+
+class Jackknife:
+    ''' Jackknife estimates of bias and standard error
+
+    The statistic is recomputed on the subsamples left after deleting d observations
+    (d=1: the n leave-one-out subsamples; d>1: all C(n,d) deletions, or max_subsets
+    random deletions when there are more).
+
+    The moment-based statistics are not recomputed on every subsample: the sums
+    (of the centred data, its squares and cross-products) of the full sample are
+    computed once and the sums of every subsample follow by subtracting the sums
+    of the deleted observations, so that all leave-one-out estimates are obtained
+    in O(n) rather than O(n^2). Other statistics are recomputed on each subsample,
+    in chunks evaluated in parallel by a pool of threads.
+
+    Parameters
+    ----------
+    sample : sample of size (n,), or tuple (x, y) of paired samples for 'corr'
+    statistic : 'mean', 'var' (unbiased variance), 'std', 'logvar' (log of the variance),
+        't' (one-sample t statistic of the mean against mu), 'corr' (Pearson correlation
+        of the paired samples), or callable computing a scalar from one sample (or from
+        the paired samples)
+    d : number of observations deleted from each subsample
+    mu : hypothesized mean of the 't' statistic
+    max_subsets : largest number of delete-d subsamples (random deletions beyond)
+    max_workers : number of threads of the generic statistics (defaults to the number of cores)
+    seed : None, int, SeedSequence or numpy.random.Generator of the random deletions
+    '''
+
+    moment_statistics = ('mean', 'var', 'std', 'logvar', 't', 'corr')
+    chunk_size = 256 # subsamples per chunk of the generic statistics (class variable)
+
+    def __init__(self, sample, statistic='mean', d=1, mu=0., max_subsets=10000, max_workers=None, seed=None):
+        self.paired = isinstance(sample, tuple)
+        self.samples = tuple(asarray(s, dtype=float) for s in (sample if self.paired else (sample,)))
+        self.n = self.samples[0].shape[0]
+        if statistic == 'corr' and len(self.samples) != 2:
+            raise ValueError('The correlation requires a tuple (x, y) of paired samples')
+        if not 1 <= d < self.n - (statistic in ('var', 'std', 'logvar', 't', 'corr')):
+            raise ValueError('Invalid number of deleted observations: '+str(d))
+        self.statistic = statistic
+        self.center = [s.mean() for s in self.samples] # the sums are taken over centred data
+        self.d = d
+        self.mu = mu
+        self.max_subsets = max_subsets
+        self.max_workers = cpu_count() if max_workers is None else max_workers
+        self.rng = Samples.rng(seed)
+
+    def deletions(self):
+        ''' Indices of the deleted observations, matrix of size (m,d) '''
+        n, d = self.n, self.d
+        if d == 1:
+            return arange(n)[:, None]
+        if comb(n, d) <= self.max_subsets:
+            m = comb(n, d)
+            return fromiter(chain.from_iterable(combinations(range(n), d)), dtype=int,
+                            count=m*d).reshape(m, d)
+        return self._random_deletions(self.max_subsets)
+
+    def _random_deletions(self, m):
+        ''' m random sets of d distinct deleted indices, matrix of size (m,d)
+
+        Indices are drawn with replacement and the repeated ones redrawn until the d
+        indices of every row are distinct, in chunks of at most
+        Samples.bootstrap_chunk_elements indices. When d > n/2, the n-d kept indices
+        are drawn instead and the deleted ones are their complement.
+        '''
+        n, d = self.n, self.d
+        k = min(d, n - d)
+        out = empty((m, d), dtype=int)
+        rows = max(Samples.bootstrap_chunk_elements // (n if k < d else k), 1)
+        for start in range(0, m, rows):
+            b = min(rows, m - start)
+            idx = self.rng.integers(0, n, size=(b, k))
+            while True:
+                idx.sort(axis=1)
+                repeated = zeros(idx.shape, dtype=bool)
+                repeated[:, 1:] = idx[:, 1:] == idx[:, :-1]
+                count = int(repeated.sum())
+                if not count:
+                    break
+                idx[repeated] = self.rng.integers(0, n, size=count)
+            if k < d:
+                keep = zeros((b, n), dtype=bool)
+                keep[arange(b)[:, None], idx] = True
+                idx = nonzero(~keep)[1].reshape(b, d)
+            out[start:start+b] = idx
+        return out
+
+    def _moments(self, sums, m):
+        ''' Statistic from the sums of the centred data of subsamples of size m '''
+        if self.statistic == 'corr':
+            sx, sy, sxx, syy, sxy = sums
+            return (sxy - sx*sy/m) / sqrt((sxx - sx**2/m) * (syy - sy**2/m))
+        s, ss = sums
+        mean = s/m + self.center[0]
+        if self.statistic == 'mean':
+            return mean
+        var = (ss - s**2/m) / (m - 1.)
+        if self.statistic == 'var':
+            return var
+        if self.statistic == 'std':
+            return sqrt(var)
+        if self.statistic == 'logvar':
+            return log(var)
+        return (mean - self.mu) / sqrt(var/m)
+
+    def _sums(self, x):
+        ''' Sums (over the last axis) of the sufficient statistics of the centred data x '''
+        if self.statistic == 'corr':
+            u, v = x
+            return (u.sum(axis=-1), v.sum(axis=-1), (u*u).sum(axis=-1), (v*v).sum(axis=-1),
+                    (u*v).sum(axis=-1))
+        return (x[0].sum(axis=-1), (x[0]*x[0]).sum(axis=-1))
+
+    def full_statistic(self):
+        ''' Statistic of the full sample '''
+        if self.statistic in Jackknife.moment_statistics:
+            centred = [s - c for s, c in zip(self.samples, self.center)]
+            return self._moments(self._sums(centred), self.n)
+        return self.statistic(*self.samples)
+
+    def replicates(self, drop):
+        ''' Statistic of every subsample (one per row of deleted indices drop) '''
+        if self.statistic in Jackknife.moment_statistics:
+            centred = [s - c for s, c in zip(self.samples, self.center)]
+            totals = self._sums(centred)
+            deleted = self._sums([s[drop] for s in centred])
+            return self._moments([t - r for t, r in zip(totals, deleted)], self.n - self.d)
+
+        def chunk(rows):
+            out = []
+            for row in rows:
+                keep = ones(self.n, dtype=bool)
+                keep[row] = False
+                out.append(self.statistic(*[s[keep] for s in self.samples]))
+            return out
+
+        chunks = [drop[i:i+Jackknife.chunk_size] for i in range(0, drop.shape[0], Jackknife.chunk_size)]
+        if self.max_workers <= 1 or len(chunks) == 1:
+            return array(list(chain.from_iterable(map(chunk, chunks))), dtype=float)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return array(list(chain.from_iterable(pool.map(chunk, chunks))), dtype=float)
+
+    def compute(self):
+        ''' Jackknife bias, bias-corrected estimate and standard error
+
+        With m subsamples of estimates theta_s and mean theta_bar:
+            bias     = (n-d)/d (theta_bar - theta)
+            estimate = theta - bias
+            se^2     = (n-d)/(d m) sum (theta_s - theta_bar)^2
+        which reduce to the usual leave-one-out formulas for d=1.
+
+        Returns
+        -------
+        dictionary with the statistic of the full sample ('statistic'), the subsample
+        estimates ('replicates'), 'bias', bias-corrected 'estimate' and standard error 'se'
+        '''
+        theta = self.full_statistic()
+        reps = self.replicates(self.deletions())
+        m = reps.shape[0]
+        factor = (self.n - self.d) / float(self.d)
+        theta_bar = reps.mean()
+        bias = factor * (theta_bar - theta)
+        se = sqrt(factor / m * ((reps - theta_bar)**2).sum())
+        return {'statistic': theta, 'replicates': reps, 'bias': bias,
+                'estimate': theta - bias, 'se': se}
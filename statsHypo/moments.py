@@ -0,0 +1,231 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Streaming sample moments
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from scipy.stats import t as t_dist
+from numpy import ma, nan, isnan, nansum, count_nonzero, where, errstate, sqrt
+from numpy import asarray, empty, arange, clip, abs
+
+
+class MomentAccumulator:
+    ''' Mergeable accumulator of sample moments (up to the 4th central moment)
+
+    Holds the sample size, mean and sums of central powers M2, M3, M4 of a
+    sample fed chunk by chunk (e.g. from a generator or a memory-mapped file).
+    Accumulators built on different chunks (or by different workers) are
+    combined with the pairwise update formulas of Chan et al. and Pébay, which
+    are numerically stable and never require the full sample in memory.
+
+    Chunks of size (n,) accumulate one sample; chunks of size (n,K) accumulate
+    K samples column-wise. NaN and masked entries are ignored. '''
+
+    def __init__(self):
+        self.n = 0      # sample size
+        self.mean = 0.  # sample mean
+        self.M2 = 0.    # sum of squared deviations from the mean
+        self.M3 = 0.    # sum of cubed deviations from the mean
+        self.M4 = 0.    # sum of deviations from the mean to the 4th power
+
+    def __repr__(self):
+        return 'MomentAccumulator(n=%r, mean=%r)' % (self.n, self.mean)
+
+    @staticmethod
+    def from_chunks(chunks):
+        ''' Accumulate moments over an iterable of chunks '''
+        acc = MomentAccumulator()
+        for chunk in chunks:
+            acc.update(chunk)
+        return acc
+
+    def update(self, chunk):
+        ''' Add a chunk of observations (of size (n,) or (n,K)) '''
+        chunk = ma.filled(ma.asarray(chunk, dtype=float), nan)
+        other = MomentAccumulator()
+        other.n = count_nonzero(~isnan(chunk), axis=0)
+        with errstate(invalid='ignore', divide='ignore'):
+            other.mean = where(other.n > 0, nansum(chunk, axis=0)/other.n, 0.)
+        d = chunk - other.mean
+        d2 = d*d
+        other.M2 = nansum(d2, axis=0)
+        other.M3 = nansum(d2*d, axis=0)
+        other.M4 = nansum(d2*d2, axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        ''' Merge the moments of another accumulator into this one (in place) '''
+        na, nb = self.n, other.n
+        n = na + nb
+        with errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            wa, wb = where(n > 0, na/n, 0.), where(n > 0, nb/n, 0.)
+            mean = self.mean + delta*wb
+            M2 = self.M2 + other.M2 + delta**2*na*wb
+            M3 = (self.M3 + other.M3 + delta**3*na*wb*(wa-wb)
+                  + 3*delta*(wa*other.M2 - wb*self.M2))
+            M4 = (self.M4 + other.M4 + delta**4*na*wb*(wa**2 - wa*wb + wb**2)
+                  + 6*delta**2*(wa**2*other.M2 + wb**2*self.M2)
+                  + 4*delta*(wa*other.M3 - wb*self.M3))
+        self.n, self.mean, self.M2, self.M3, self.M4 = n, mean, M2, M3, M4
+        return self
+
+    def moments(self, order=4):
+        ''' (n, mean, M2, ..., M_order), with M_k the sum of k-th powers of deviations from the mean '''
+        return (self.n, self.mean, self.M2, self.M3, self.M4)[:order+1]
+
+    def variance(self, ddof=1):
+        ''' Sample variance '''
+        return self.M2 / (self.n - ddof)
+
+    def std(self, ddof=1):
+        ''' Sample standard deviation '''
+        return sqrt(self.variance(ddof))
+
+
+class CoMomentAccumulator:
+    ''' Mergeable accumulator of the co-moments of paired samples (x, y)
+
+    Holds the number of pairs, the means of x and y, their sums of squared
+    deviations and the sum of cross-products of deviations (co-moment). Chunks
+    are merged with the pairwise update of Chan et al., so that series that do
+    not fit in memory are correlated chunk by chunk, and accumulators of different
+    chunks (or workers) are combined with merge. Chunks of size (n,K) accumulate
+    K pairs of samples column-wise; pairs with a NaN or masked entry are ignored.
+
+    With a window, only the last window pairs (of a single series) are kept: the
+    pairs leaving the window are removed with the inverse update, in O(1) per pair.
+    The co-moments are recomputed from the window buffer after every window removed
+    pairs, which bounds the round-off of the removals at an amortized O(1) cost.
+
+    Parameters
+    ----------
+    window : number of most recent pairs held (None to accumulate all pairs)
+    '''
+
+    def __init__(self, window=None):
+        self.n = 0      # number of pairs
+        self.mean_x = 0.
+        self.mean_y = 0.
+        self.Mx = 0.    # sum of squared deviations of x
+        self.My = 0.    # sum of squared deviations of y
+        self.C = 0.     # sum of cross-products of the deviations of x and y
+        self.window = window
+        if window is not None:
+            self._x, self._y = empty(window), empty(window)  # ring buffer of the window
+            self._start, self._filled, self._removed = 0, 0, 0
+
+    def __repr__(self):
+        return 'CoMomentAccumulator(n=%r, mean_x=%r, mean_y=%r)' % (self.n, self.mean_x, self.mean_y)
+
+    @staticmethod
+    def from_chunks(chunks, window=None):
+        ''' Accumulate co-moments over an iterable of (x, y) chunks '''
+        acc = CoMomentAccumulator(window)
+        for x, y in chunks:
+            acc.update(x, y)
+        return acc
+
+    @staticmethod
+    def _chunk(x, y):
+        ''' CoMomentAccumulator of one chunk (pairs with a missing value excluded) '''
+        x = ma.filled(ma.asarray(x, dtype=float), nan)
+        y = ma.filled(ma.asarray(y, dtype=float), nan)
+        missing = isnan(x) | isnan(y)
+        x, y = where(missing, nan, x), where(missing, nan, y)
+        acc = CoMomentAccumulator()
+        acc.n = count_nonzero(~missing, axis=0)
+        with errstate(invalid='ignore', divide='ignore'):
+            acc.mean_x = where(acc.n > 0, nansum(x, axis=0)/acc.n, 0.)
+            acc.mean_y = where(acc.n > 0, nansum(y, axis=0)/acc.n, 0.)
+        dx, dy = x - acc.mean_x, y - acc.mean_y
+        acc.Mx, acc.My, acc.C = nansum(dx*dx, axis=0), nansum(dy*dy, axis=0), nansum(dx*dy, axis=0)
+        return acc
+
+    def update(self, x, y):
+        ''' Add a chunk of pairs (x, y), each of size (n,) or (n,K) '''
+        if self.window is None:
+            return self.merge(CoMomentAccumulator._chunk(x, y))
+        x, y = asarray(x, dtype=float).ravel(), asarray(y, dtype=float).ravel()
+        if x.shape[0] >= self.window:  # the chunk fills the window
+            x, y = x[-self.window:], y[-self.window:]
+            self._x[:], self._y[:] = x, y
+            self._start, self._filled, self._removed = 0, self.window, 0
+            return self._reset(CoMomentAccumulator._chunk(x, y))
+        drop = max(self._filled + x.shape[0] - self.window, 0)
+        if drop:
+            old = (self._start + arange(drop)) % self.window
+            self._remove(CoMomentAccumulator._chunk(self._x[old], self._y[old]))
+            self._start = (self._start + drop) % self.window
+            self._filled -= drop
+            self._removed += drop
+        new = (self._start + self._filled + arange(x.shape[0])) % self.window
+        self._x[new], self._y[new] = x, y
+        self._filled += x.shape[0]
+        self.merge(CoMomentAccumulator._chunk(x, y))
+        if self._removed >= self.window:  # refresh from the buffer
+            self._removed = 0
+            self._reset(CoMomentAccumulator._chunk(self._x[:self._filled], self._y[:self._filled]))
+        return self
+
+    def push(self, x, y):
+        ''' Add one pair (x, y) '''
+        return self.update([x], [y])
+
+    def _reset(self, other):
+        self.n, self.mean_x, self.mean_y = other.n, other.mean_x, other.mean_y
+        self.Mx, self.My, self.C = other.Mx, other.My, other.C
+        return self
+
+    def merge(self, other):
+        ''' Merge the co-moments of another accumulator into this one (in place) '''
+        na, nb = self.n, other.n
+        n = na + nb
+        with errstate(invalid='ignore', divide='ignore'):
+            wb = where(n > 0, nb/n, 0.)
+            dx, dy = other.mean_x - self.mean_x, other.mean_y - self.mean_y
+            self.Mx = self.Mx + other.Mx + dx*dx*na*wb
+            self.My = self.My + other.My + dy*dy*na*wb
+            self.C = self.C + other.C + dx*dy*na*wb
+            self.mean_x, self.mean_y = self.mean_x + dx*wb, self.mean_y + dy*wb
+        self.n = n
+        return self
+
+    def _remove(self, other):
+        ''' Remove the co-moments of a subset of the pairs (inverse of merge) '''
+        n = self.n
+        na = n - other.n
+        with errstate(invalid='ignore', divide='ignore'):
+            mean_x = where(na > 0, (n*self.mean_x - other.n*other.mean_x)/na, 0.)
+            mean_y = where(na > 0, (n*self.mean_y - other.n*other.mean_y)/na, 0.)
+            w = where(n > 0, na*other.n/n, 0.)
+        dx, dy = other.mean_x - mean_x, other.mean_y - mean_y
+        self.Mx = self.Mx - other.Mx - dx*dx*w
+        self.My = self.My - other.My - dy*dy*w
+        self.C = self.C - other.C - dx*dy*w
+        self.n, self.mean_x, self.mean_y = na, mean_x, mean_y
+        return self
+
+    def covariance(self, ddof=1):
+        ''' Sample covariance of x and y '''
+        return self.C / (self.n - ddof)
+
+    def correlation(self):
+        ''' Pearson correlation coefficient of x and y '''
+        with errstate(invalid='ignore', divide='ignore'):
+            return clip(self.C / sqrt(self.Mx*self.My), -1., 1.)
+
+    def test(self):
+        ''' Pearson correlation and its t test (n-2 dof)
+
+        Returns
+        -------
+        (r, t, p) : correlation, t statistic r sqrt((n-2)/(1-r^2)) and two-sided p-value
+        '''
+        r = self.correlation()
+        df = self.n - 2
+        with errstate(invalid='ignore', divide='ignore'):
+            t = r * sqrt(df / ((1. - r)*(1. + r)))
+        return (r, t, 2.*t_dist.sf(abs(t), df))
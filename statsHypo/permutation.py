@@ -0,0 +1,178 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Permutation (randomization) tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from itertools import combinations, islice, chain
+from math import comb
+from scipy.stats import norm
+from numpy import asarray, concatenate, fromiter, zeros, arange, argsort, median, sqrt, abs, tile
+from sample import Samples
+from ranks import PooledRanks
+
+
+class PermutationTest:
+    ''' Randomization test engine for two independent samples
+
+    Relabellings of the pooled data are generated in vectorized batches and the
+    statistic is evaluated over a whole batch in one NumPy pass. When the number
+    of distinct relabellings C(N, n1) is small the null distribution is
+    enumerated exactly; otherwise relabellings are drawn at random, batch after
+    batch, until the p-value is resolved to the requested precision.
+
+    Statistics that only depend on the sum of the first group ('mean', 'U')
+    are computed from the indices of the smaller group alone, the other group
+    following from the pooled total. Every batch holds at most batch_elements
+    indices, so that memory stays bounded for large samples.
+
+    Parameters
+    ----------
+    P, Q : samples of size (n1,) and (n2,)
+    statistic : 'mean' (difference of means), 'median' (difference of medians),
+        'U' (Mann–Whitney U, centred at n1*n2/2), or callable mapping the (b,n1)
+        and (b,n2) relabelled groups to a statistic of size (b,), centred at 0 under H0
+    seed : None, int, SeedSequence or numpy.random.Generator of the random relabellings
+    '''
+
+    max_exact = 20000 # largest number of relabellings enumerated exactly (class variable)
+    batch_size = 2000 # relabellings evaluated per batch (class variable)
+    batch_elements = 2**22 # max relabelling indices held in memory at once (class variable)
+
+    def __init__(self, P, Q, statistic='mean', seed=None):
+        self.P = asarray(P, dtype=float)
+        self.Q = asarray(Q, dtype=float)
+        self.n1, self.n2 = self.P.shape[0], self.Q.shape[0]
+        self.N = self.n1 + self.n2
+        self.statistic = statistic
+        self.rng = Samples.rng(seed)
+        if statistic == 'U':
+            self.pooled = PooledRanks.get(self.P, self.Q).ranks
+        else:
+            self.pooled = concatenate((self.P, self.Q))
+        self.total = self.pooled.sum()
+
+    def evaluate(self, perm):
+        ''' Statistic of a batch of relabellings
+
+        Parameters
+        ----------
+        perm : index matrix of size (b,N), the first n1 columns indexing the first group;
+            for the sum-based statistics, (b,n1) indices of the first group or (b,n2)
+            indices of the second group also suffice
+
+        Returns
+        -------
+        statistic of size (b,)
+        '''
+        if self.statistic in ('mean', 'U'):
+            if perm.shape[1] == self.n2 and self.n2 != self.n1:
+                sum1 = self.total - self.pooled[perm].sum(axis=1)
+            else:
+                sum1 = self.pooled[perm[:, :self.n1]].sum(axis=1)
+            if self.statistic == 'U':
+                return sum1 - self.n1*(self.n1+1)/2. - self.n1*self.n2/2.
+            return sum1/self.n1 - (self.total-sum1)/self.n2
+        x = self.pooled[perm]
+        if self.statistic == 'median':
+            return median(x[:, :self.n1], axis=1) - median(x[:, self.n1:], axis=1)
+        return self.statistic(x[:, :self.n1], x[:, self.n1:])
+
+    def observed(self):
+        ''' Statistic of the observed labelling '''
+        return self.evaluate(arange(self.N)[None, :])[0]
+
+    def _complete(self, idx1):
+        ''' Full relabellings (b,N) from the group-1 indices (b,n1) '''
+        if self.statistic in ('mean', 'U'):
+            return idx1
+        mask = zeros((idx1.shape[0], self.N), dtype=bool)
+        mask[arange(idx1.shape[0])[:, None], idx1] = True
+        return argsort(~mask, axis=1, kind='stable')
+
+    def _rows(self, width):
+        ''' Relabellings per batch for index rows of the given width '''
+        return max(min(PermutationTest.batch_size, PermutationTest.batch_elements // width), 1)
+
+    def exact_batches(self):
+        ''' All C(N, n1) relabellings, in batches '''
+        groups = combinations(range(self.N), self.n1)
+        rows = self._rows(self.n1 if self.statistic in ('mean', 'U') else self.N)
+        while True:
+            chunk = list(islice(groups, rows))
+            if not chunk:
+                return
+            idx1 = fromiter(chain.from_iterable(chunk), dtype=int, count=len(chunk)*self.n1)
+            yield self._complete(idx1.reshape(len(chunk), self.n1))
+
+    def random_subsets(self, b, m):
+        ''' b independent random subsets of m of the N indices, of size (b,m)
+
+        Indices are drawn with replacement and the repeated ones redrawn until every
+        row is distinct, so that only the m drawn indices are held (m <= N/2 keeps the
+        number of redraws small). The procedure is invariant under relabelling of the
+        indices, hence every subset is equally likely.
+        '''
+        idx = self.rng.integers(0, self.N, size=(b, m))
+        while True:
+            idx.sort(axis=1)
+            repeated = zeros(idx.shape, dtype=bool)
+            repeated[:, 1:] = idx[:, 1:] == idx[:, :-1]
+            count = int(repeated.sum())
+            if not count:
+                return idx
+            idx[repeated] = self.rng.integers(0, self.N, size=count)
+
+    def random_batches(self):
+        ''' Random relabellings, in batches (endless)
+
+        The sum-based statistics only draw the indices of the smaller group; the other
+        statistics shuffle full (b,N) rows, each row an independent shuffle.
+        '''
+        if self.statistic in ('mean', 'U'):
+            m = min(self.n1, self.n2)
+            rows = self._rows(m)
+            while True:
+                yield self.random_subsets(rows, m)
+        labels = tile(arange(self.N), (self._rows(self.N), 1))
+        while True:
+            yield self.rng.permuted(labels, axis=1)
+
+    def test(self, max_permutations=100000, precision=0.001, confidence=0.99):
+        ''' Two-sided randomization test
+
+        The p-value is the proportion of relabellings whose statistic is at least as extreme
+        (in absolute value) as the observed statistic; Monte Carlo p-values include the
+        observed labelling, (count+1)/(B+1).
+
+        Parameters
+        ----------
+        max_permutations : largest number of random relabellings (Monte Carlo)
+        precision : the Monte Carlo sampling stops once the half-width of the
+            confidence interval of the p-value is below precision
+        confidence : confidence level of the p-value interval used for stopping
+
+        Returns
+        -------
+        (statistic, p, permutations, exact) : observed statistic, two-sided p-value,
+            number of relabellings evaluated and whether the enumeration was exact
+        '''
+        observed = self.observed()
+        cutoff = abs(observed) * (1. - 1e-12)
+        count, total = 0, 0
+        if comb(self.N, self.n1) <= PermutationTest.max_exact:
+            for perm in self.exact_batches():
+                count += (abs(self.evaluate(perm)) >= cutoff).sum()
+                total += perm.shape[0]
+            return (observed, count/total, total, True)
+
+        z = norm.ppf(0.5 + confidence/2.)
+        for perm in self.random_batches():
+            count += (abs(self.evaluate(perm)) >= cutoff).sum()
+            total += perm.shape[0]
+            p = (count + 1.) / (total + 1.)
+            if total >= max_permutations or z*sqrt(p*(1.-p)/total) < precision:
+                break
+        return (observed, p, total, False)
@@ -0,0 +1,249 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Post-hoc pairwise comparisons
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from functools import lru_cache
+from scipy.stats import t as t_dist
+from scipy.stats import f, norm, chi2
+from scipy.interpolate import CubicSpline
+from scipy.special import ndtr
+from numpy import asarray, triu_indices, sqrt, abs, minimum, maximum, argsort, empty, zeros, ones
+from numpy import linspace, exp, log, isinf, logical_and, arange, clip, delete, unique
+from numpy import bincount, tensordot, r_, rint, geomspace, searchsorted
+
+
+_z_grid = linspace(-8., 8., 61) # integration grid of the standard normal variable
+_q_grid = linspace(0., 8., 129)**2 # grid of the studentized range statistic (denser near 0)
+_lambda_nodes = 128 # largest number of distinct correlation factors of the Dunnett integrand
+_u_nodes = 129 # grid of the products |t| s tabulating the Dunnett integrand
+_range_nodes = 64 # largest number of distinct numbers of means r tabulated exactly
+
+
+def _scale_nodes(df, n=32):
+    ''' Quadrature nodes and weights of the error scale s = sqrt(chi2(df)/df)
+
+    Trapezoidal rule over log(s), spanning the quantiles 1e-10 to 1-1e-10 of s.
+    '''
+    if isinf(df):
+        return ones(1), ones(1)
+    low, high = log(sqrt(chi2.ppf([1e-10, 1.-1e-10], df) / df))
+    s = exp(linspace(low, high, n))
+    w = chi2.pdf(df*s*s, df) * 2.*df*s*s
+    return s, w/w.sum()
+
+
+def _binned_factors(lam, weights, nodes):
+    ''' Factors lam of weights spread by linear interpolation over nodes evenly spaced values
+
+    A sum over the factors of weights times a smooth function of the factor is then
+    approximated by the sum over the nodes only.
+    '''
+    if lam.shape[0] <= nodes:
+        return lam, weights
+    grid = linspace(lam[0], lam[-1], nodes)
+    position = (lam - lam[0]) / (grid[1] - grid[0])
+    low = minimum(position.astype(int), nodes - 2)
+    frac = position - low
+    return grid, bincount(low, weights*(1. - frac), nodes) + bincount(low + 1, weights*frac, nodes)
+
+
+@lru_cache(maxsize=64)
+def studentized_range_sf(ranges, df):
+    ''' Survival function of the studentized range, tabulated on _q_grid
+
+    P(Q > q) for the range of r standard normal variables divided by an independent
+    sqrt(chi2(df)/df), computed as
+        1 - E_s[ r int phi(z) (Phi(z + q s) - Phi(z))^(r-1) dz ]
+    by numerical integration, for all grid values q at once (cached per (ranges, df)).
+
+    Parameters
+    ----------
+    ranges : tuple of numbers of means r
+    df : degrees-of-freedom of the error variance
+
+    Returns
+    -------
+    table of size (len(ranges), len(_q_grid))
+    '''
+    s, ws = _scale_nodes(df)
+    z = _z_grid
+    dz = z[1] - z[0]
+    phi = norm.pdf(z)
+    w = _q_grid[:, None, None] * s[None, None, :]                 # (q, 1, s)
+    d = norm.cdf(z[None, :, None] + w) - norm.cdf(z)[None, :, None]
+    table = empty((len(ranges), _q_grid.shape[0]))
+    power, previous = phi[None, :, None] * ones(d.shape), 1 # phi(z) d^(r-1), built up over sorted r
+    for row in argsort(ranges):
+        r = ranges[row]
+        power = power * d**(r - previous)
+        previous = r
+        inner = r * power.sum(axis=1) * dz                                 # (q, s)
+        table[row] = clip(1. - inner @ ws, 0., 1.)
+    return table
+
+
+def _range_p_values(q, r, df):
+    ''' P(Q > q) of studentized range statistics q with numbers of means r (arrays)
+
+    Beyond _range_nodes distinct r, the survival function is tabulated for every r up
+    to 16 and for 48 geometrically spaced r above, and interpolated by cubic splines in
+    log r (to about 1e-5; 500 groups take about 0.15 s instead of 0.6 s).
+    '''
+    q, r = asarray(q, dtype=float), asarray(r)
+    ranges, inverse = unique(r, return_inverse=True)
+    if ranges.shape[0] > _range_nodes:
+        nodes = unique(r_[ranges[ranges <= 16], rint(geomspace(max(ranges[0], 16), ranges[-1], 48))]).astype(int)
+        spline = CubicSpline(log(nodes), studentized_range_sf(tuple(int(x) for x in nodes), float(df)), axis=0)
+        table = clip(spline(log(ranges)), 0., 1.)
+    else:
+        table = studentized_range_sf(tuple(int(x) for x in ranges), float(df))
+    # cubic splines of the log survival function over q, of all r at once, evaluated
+    # at every q with the coefficients of its own r
+    c = CubicSpline(_q_grid, log(table.T + 1e-300), axis=0).c           # (4, intervals, r)
+    x = minimum(q.ravel(), _q_grid[-1])
+    interval = clip(searchsorted(_q_grid, x) - 1, 0, _q_grid.shape[0] - 2)
+    dx = x - _q_grid[interval]
+    row = inverse.ravel()
+    logp = ((c[0, interval, row]*dx + c[1, interval, row])*dx + c[2, interval, row])*dx + c[3, interval, row]
+    return minimum(exp(logp), 1.).reshape(q.shape)
+
+
+class PostHoc:
+    ''' Post-hoc pairwise comparisons of k group means
+
+    All procedures are computed from one set of summary statistics (group sizes,
+    means, error mean square and its degrees-of-freedom). The k(k-1)/2 pairwise
+    differences, standard errors and statistics are computed at once as
+    broadcast arrays over the upper-triangular pairs (i < j), returned in the
+    compact order of numpy.triu_indices(k, 1).
+
+    Parameters
+    ----------
+    counts : group sizes of size (k,)
+    means : group means of size (k,)
+    mse : error (within-groups) mean square
+    df : degrees-of-freedom of the error mean square
+    '''
+
+    def __init__(self, counts, means, mse, df):
+        self.counts = asarray(counts, dtype=float)
+        self.means = asarray(means, dtype=float)
+        self.k = self.means.shape[0]
+        self.mse = float(mse)
+        self.df = df
+        self.i, self.j = triu_indices(self.k, 1)
+        self.m = self.i.shape[0] # number of pairwise comparisons
+        self.difference = self.means[self.i] - self.means[self.j]
+        self.se = sqrt(self.mse * (1./self.counts[self.i] + 1./self.counts[self.j]))
+
+    @staticmethod
+    def from_groups(groups):
+        ''' PostHoc of a GroupedSamples (error mean square of the one-way ANOVA) '''
+        mean, ss_within = groups.moments()[:2]
+        df = groups.N - groups.k
+        return PostHoc(groups.counts, mean, ss_within.sum()/df, df)
+
+    def pairs(self):
+        ''' Group indices (i, j) of the pairwise comparisons '''
+        return (self.i, self.j)
+
+    def fishers_lsd(self):
+        ''' Test 21a: Fisher's LSD (multiple t tests with the pooled error term)
+
+        Returns
+        -------
+        (t, p) : t statistics and two-tailed p-values of the pairs
+        '''
+        t = self.difference / self.se
+        return (t, 2.*t_dist.sf(abs(t), self.df))
+
+    def bonferroni_dunn(self):
+        ''' Test 21b: Bonferroni-Dunn test (LSD p-values multiplied by the number of comparisons) '''
+        t, p = self.fishers_lsd()
+        return (t, minimum(p * self.m, 1.))
+
+    def tukey_hsd(self):
+        ''' Test 21c: Tukey's HSD test (Tukey-Kramer for unequal sizes)
+
+        Returns
+        -------
+        (q, p) : studentized range statistics and p-values of the pairs
+        '''
+        q = abs(self.difference) / (self.se / sqrt(2.))
+        return (q, _range_p_values(q, zeros(self.m, dtype=int) + self.k, self.df))
+
+    def newman_keuls(self, significance_level=0.05):
+        ''' Test 21d: Newman-Keuls test
+
+        The means are ordered; a pair spanning r ordered means is compared with the
+        studentized range of r means. As a step-down procedure, a pair is only
+        declared different when every pair enclosing it is.
+
+        Returns
+        -------
+        (q, p, reject) : studentized range statistics, p-values (of r means) and
+            step-down decisions of the pairs
+        '''
+        q = abs(self.difference) / (self.se / sqrt(2.))
+        rank = empty(self.k, dtype=int)
+        rank[argsort(self.means, kind='stable')] = range(self.k)
+        lo, hi = minimum(rank[self.i], rank[self.j]), maximum(rank[self.i], rank[self.j])
+        r = hi - lo + 1
+        p = _range_p_values(q, r, self.df)
+        # significance in the ordered (lo, hi) layout, then closure over enclosing pairs
+        sig = ones((self.k, self.k), dtype=bool)
+        sig[lo, hi] = p <= significance_level
+        sig = logical_and.accumulate(sig, axis=0)
+        sig = logical_and.accumulate(sig[:, ::-1], axis=1)[:, ::-1]
+        return (q, p, sig[lo, hi])
+
+    def scheffe(self):
+        ''' Test 21e: Scheffé test
+
+        Returns
+        -------
+        (F, p) : Scheffé F statistics (on k-1 and df degrees-of-freedom) and p-values
+        '''
+        F = (self.difference / self.se)**2 / (self.k - 1.)
+        return (F, f.sf(F, self.k - 1, self.df))
+
+    def dunnett(self, control=0):
+        ''' Test 21f: Dunnett test (comparisons of every group with a control group)
+
+        The p-values are single-step adjusted, P(max |T_i| >= |t|), with the multivariate
+        t distribution of the k-1 comparisons. Its correlations (n_i n_j / ((n_i+n_c)(n_j+n_c)))^(1/2)
+        have a one-factor structure, so that the probability reduces to integrals over one
+        normal variable and the error scale. The integrand only depends on |t| through the
+        product u = |t| s: the product over the comparisons is tabulated once on a grid of u
+        and interpolated by cubic splines for every |t| and scale node. The correlation
+        factors are binned over _lambda_nodes values beyond that many distinct group sizes.
+        The p-values agree with the direct integration to about 1e-5 (500 groups of unequal
+        sizes take about 0.1 s).
+
+        Returns
+        -------
+        (groups, t, p) : indices of the compared groups, t statistics and p-values
+        '''
+        groups = delete(arange(self.k), control)
+        nc, ni = self.counts[control], self.counts[groups]
+        t = (self.means[groups] - self.means[control]) / sqrt(self.mse * (1./ni + 1./nc))
+        # groups of equal size share the same factor of the product over the comparisons
+        lam, multiplicity = unique(sqrt(ni / (ni + nc)), return_counts=True)
+        lam, multiplicity = _binned_factors(lam, multiplicity.astype(float), _lambda_nodes)
+        sigma = sqrt(1. - lam**2)[:, None, None]
+        s, ws = _scale_nodes(self.df)
+        z = _z_grid
+        dz = z[1] - z[0]
+        phi = norm.pdf(z)
+        cs = abs(t)[:, None] * s                                       # (c, s)
+        u = linspace(0., max(cs.max(), 1e-8), _u_nodes)
+        shift = lam[:, None, None] * z[None, :, None]                 # (lambda, z, 1)
+        inside = ndtr((u - shift)/sigma) - ndtr((-u - shift)/sigma)   # (lambda, z, u)
+        product = exp(tensordot(multiplicity, log(clip(inside, 1e-300, 1.)), axes=(0, 0)))
+        prob = clip(CubicSpline(u, product, axis=1)(cs), 0., 1.)      # (z, c, s)
+        p = 1. - (phi @ prob.reshape(z.shape[0], -1)).reshape(cs.shape) * dz @ ws
+        return (groups, t, clip(p, 0., 1.))
@@ -0,0 +1,203 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Shared rank cache for rank-based tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from scipy.stats import norm
+from numpy import asarray, concatenate, cumsum, argsort, empty, repeat, flatnonzero, diff
+from numpy import r_, arange, maximum, minimum, take_along_axis, put_along_axis, where, ones
+from numpy import zeros, bincount, sqrt, sort
+from sample import Samples
+
+
+class PooledRanks:
+    ''' Average ranks of one or more pooled samples
+
+    The pooled data are sorted once; ranks (ties receive the average rank), tie
+    group sizes and the tie-correction term sum(t^3 - t) are derived from that
+    single sort. Instances are memoized per content of the samples (see
+    PooledRanks.get), so that the rank-based tests of InfTwoIndepSamp,
+    InfTwoOrMoreIndepSamp and Correlation share the ranks of the same data.
+
+    Parameters
+    ----------
+    samples : one or more samples of size (n_i,)
+    '''
+
+    cache_size = 64 # number of memoized rankings (class variable)
+    _cache = OrderedDict()
+    _lock = Lock()
+
+    def __init__(self, *samples):
+        samples = [asarray(s, dtype=float).ravel() for s in samples]
+        self.sizes = asarray([s.shape[0] for s in samples])
+        self.offsets = concatenate(([0], cumsum(self.sizes)))
+        values = concatenate(samples)
+        self.N = values.shape[0]
+        self.order = argsort(values, kind='mergesort')
+        self.sorted_values = values[self.order]
+        starts = flatnonzero(r_[True, self.sorted_values[1:] != self.sorted_values[:-1]])
+        self.tie_counts = diff(r_[starts, self.N])
+        self.ranks = empty(self.N)
+        self.ranks[self.order] = repeat(starts + (self.tie_counts+1)/2., self.tie_counts)
+        t = self.tie_counts.astype(float)
+        self.tie_term = (t**3 - t).sum()
+        self.has_ties = bool((self.tie_counts > 1).any())
+
+    @staticmethod
+    def get(*samples):
+        ''' Memoized PooledRanks of the samples '''
+        return _memoized(PooledRanks, samples)
+
+    def group(self, i):
+        ''' Ranks of the i-th sample within the pooled data '''
+        return self.ranks[self.offsets[i]:self.offsets[i+1]]
+
+    def rank_sums(self):
+        ''' Sum of the pooled ranks of each sample '''
+        c = concatenate(([0.], cumsum(self.ranks)))
+        return c[self.offsets[1:]] - c[self.offsets[:-1]]
+
+    def tie_average(self, scores_sorted):
+        ''' Average scores given by sorted position over tie groups, returned in the original order '''
+        groups = repeat(arange(self.tie_counts.shape[0]), self.tie_counts)
+        avg = bincount(groups, weights=scores_sorted) / self.tie_counts
+        scores = empty(self.N)
+        scores[self.order] = avg[groups]
+        return scores
+
+    def siegel_tukey_ranks(self):
+        ''' Siegel-Tukey ranks of the pooled data (average over ties)
+        
+        Rank 1 goes to the smallest value, ranks 2 and 3 to the two largest, ranks 4 and 5 to 
+        the next two smallest, and so on alternating between the extremes. The ranks of all 
+        sorted positions are assigned at once from the sort of the pooled data. '''
+        r = arange(1, self.N+1)
+        low = (r // 2) % 2 == 0
+        pos = where(low, cumsum(low) - 1, self.N - cumsum(~low))
+        scores_sorted = empty(self.N)
+        scores_sorted[pos] = r
+        return self.tie_average(scores_sorted)
+
+
+class RowRanks:
+    ''' Average ranks within the rows of an (n,k) matrix (e.g. n subjects x k conditions)
+
+    All rows are ranked with one sort along axis 1. Also provides the per-row
+    tie-correction term sum(t^3 - t). Memoized like PooledRanks (see RowRanks.get).
+
+    Parameters
+    ----------
+    matrix : data of size (n,k)
+    '''
+
+    def __init__(self, matrix):
+        matrix = asarray(matrix, dtype=float)
+        n, k = matrix.shape
+        order = argsort(matrix, axis=1, kind='mergesort')
+        s = take_along_axis(matrix, order, axis=1)
+        first = ones((n, k), dtype=bool)
+        first[:, 1:] = s[:, 1:] != s[:, :-1]
+        last = ones((n, k), dtype=bool)
+        last[:, :-1] = first[:, 1:]
+        pos = arange(k)
+        start = maximum.accumulate(where(first, pos, 0), axis=1)
+        end = minimum.accumulate(where(last, pos, k-1)[:, ::-1], axis=1)[:, ::-1]
+        self.ranks = empty((n, k))
+        put_along_axis(self.ranks, order, (start + end)/2. + 1., axis=1)
+        t = (end - start + 1).astype(float)
+        self.tie_terms = (t**2 - 1).sum(axis=1)  # sum over tie groups of t^3 - t
+        self.has_ties = bool((self.tie_terms > 0).any())
+
+    @staticmethod
+    def get(matrix):
+        ''' Memoized RowRanks of the matrix '''
+        return _memoized(RowRanks, (matrix,))
+
+
+def ranking_key(ranking, samples):
+    ''' Memoization key of the ranking class (PooledRanks or RowRanks) of the samples '''
+    return (ranking.__name__,) + tuple(Samples.sample_key(s) for s in samples)
+
+
+def _memoized(ranking, samples):
+    key = ranking_key(ranking, samples)
+    cache = PooledRanks._cache
+    with PooledRanks._lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    ranked = ranking(*samples)
+    with PooledRanks._lock:
+        cache[key] = ranked
+        if len(cache) > PooledRanks.cache_size:
+            cache.popitem(last=False)
+    return ranked
+
+
+@lru_cache(maxsize=256)
+def rank_sum_null_distribution(n1, n2):
+    ''' Exact null distribution of the Mann-Whitney U statistic (no ties)
+    
+    Computed with the recurrence p(m,n,u) = m/(m+n) p(m-1,n,u-n) + n/(m+n) p(m,n-1,u) 
+    as a dynamic-programming table over the sample sizes, cached per (n1, n2).
+    
+    Parameters
+    ----------
+    n1, n2 : sample sizes
+    
+    Returns
+    -------
+    probabilities of U = 0, ..., n1*n2
+    '''
+    size = n1*n2 + 1
+    delta = zeros(size)
+    delta[0] = 1.
+    prev = [delta]*(n1+1) # n = 0
+    for n in range(1, n2+1):
+        cur = [delta]
+        for m in range(1, n1+1):
+            p = n/(m+n) * prev[m]
+            p[n:] += m/(m+n) * cur[m-1][:size-n]
+            cur.append(p)
+        prev = cur
+    return prev[n1]
+
+
+def linear_rank_test(scores, n1, exact_threshold=50):
+    ''' Two-sided test of the sum of the first n1 scores of a pooled two-sample ranking
+    
+    When the scores are untied ranks and the combined sample size is at most exact_threshold, 
+    the p-value comes from the exact (cached) null distribution of the rank sum; otherwise 
+    from the normal approximation of a linear rank statistic (with continuity correction).
+    
+    Parameters
+    ----------
+    scores : pooled scores of size (N,), first n1 belong to the first sample
+    n1 : size of the first sample
+    exact_threshold : largest combined sample size using the exact null distribution
+    
+    Returns
+    -------
+    (W, p) : sum of the scores of the first sample and two-sided p-value
+    '''
+    scores = asarray(scores, dtype=float)
+    N = scores.shape[0]
+    n2 = N - n1
+    W = scores[:n1].sum()
+    if N <= exact_threshold and (sort(scores) == arange(1, N+1)).all():
+        pmf = rank_sum_null_distribution(n1, n2)
+        u = int(round(W - n1*(n1+1)/2.))
+        p = 2.*min(pmf[:u+1].sum(), pmf[u:].sum())
+    else:
+        mean = scores.mean()
+        var = n1*n2/(N*(N-1.)) * ((scores - mean)**2).sum()
+        z = max(abs(W - n1*mean) - 0.5, 0.) / sqrt(var)
+        p = 2.*norm.sf(z)
+    return (W, min(p, 1.))
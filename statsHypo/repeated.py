@@ -0,0 +1,88 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Repeated-measures (within-subjects) designs
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from scipy.stats import f, chi2
+from numpy import asarray, log, eye, ones, minimum, errstate, trace, einsum, swapaxes
+from numpy.linalg import qr, det
+
+
+def contrasts(k):
+    ''' Orthonormal contrasts of k conditions, matrix of size (k, k-1) '''
+    q, _ = qr(eye(k) - 1./k)
+    return q[:, :k-1]
+
+
+def within_subjects_anova(X):
+    ''' Single-factor within-subjects ANOVA of one or many repeated-measures matrices
+
+    The sums of squares are decomposed from the row (subject) and column (condition)
+    marginal sums of every matrix, in one pass over the data. Sphericity is assessed
+    with Mauchly's test on the covariance of orthonormal contrasts, which also gives
+    the Greenhouse-Geisser epsilon and corrected p-value.
+
+    Parameters
+    ----------
+    X : data of size (n,k) (n subjects x k conditions), or (m,n,k) for m outcomes
+
+    Returns
+    -------
+    dictionary of arrays of size () or (m,): 'F', 'p', 'dof' (k-1, (n-1)(k-1)), sums of
+    squares 'ss_conditions', 'ss_subjects', 'ss_error', 'mauchly_W', 'mauchly_chi2',
+    'mauchly_dof', 'mauchly_p', 'epsilon' (Greenhouse-Geisser) and 'p_gg'
+    '''
+    X = asarray(X, dtype=float)
+    n, k = X.shape[-2:]
+    Xc = X - X.mean(axis=(-2, -1), keepdims=True)   # centred on the grand mean
+    rows, cols = Xc.sum(axis=-1), Xc.sum(axis=-2)
+    ss_total = (Xc*Xc).sum(axis=(-2, -1))
+    ss_subjects = (rows*rows).sum(axis=-1) / k
+    ss_conditions = (cols*cols).sum(axis=-1) / n
+    ss_error = ss_total - ss_subjects - ss_conditions
+    df1, df2 = k - 1, (n - 1)*(k - 1)
+    with errstate(invalid='ignore', divide='ignore'):
+        F = (ss_conditions/df1) / (ss_error/df2)
+    p = f.sf(F, df1, df2)
+
+    # sphericity: covariance of the orthonormal contrasts of the conditions
+    D = (X - X.mean(axis=-2, keepdims=True)) @ contrasts(k)             # (..., n, k-1)
+    S = swapaxes(D, -2, -1) @ D / (n - 1.)                              # (..., k-1, k-1)
+    q = k - 1
+    tr = trace(S, axis1=-2, axis2=-1)
+    with errstate(invalid='ignore', divide='ignore'):
+        W = det(S) / (tr/q)**q
+        epsilon = minimum(tr**2 / (q * einsum('...ij,...ji->...', S, S)), 1.)
+        mauchly_chi2 = -(n - 1. - (2.*q*q + q + 2.)/(6.*q)) * log(W)
+    mauchly_dof = q*(q + 1)//2 - 1
+    return {'F': F, 'p': p, 'dof': (df1, df2), 'ss_conditions': ss_conditions,
+            'ss_subjects': ss_subjects, 'ss_error': ss_error, 'mauchly_W': W,
+            'mauchly_chi2': mauchly_chi2, 'mauchly_dof': mauchly_dof,
+            'mauchly_p': chi2.sf(mauchly_chi2, mauchly_dof) if mauchly_dof > 0 else ones(W.shape),
+            'epsilon': epsilon, 'p_gg': f.sf(F, epsilon*df1, epsilon*df2)}
+
+
+def cochran_q(X):
+    ''' Cochran Q test of one or many binary repeated-measures matrices
+
+    Q = (k-1) (k sum C_j^2 - T^2) / (k T - sum R_i^2), from the condition totals C_j,
+    subject totals R_i and grand total T; chi-square distributed with k-1 dof.
+
+    Parameters
+    ----------
+    X : binary data of size (n,k) (n subjects x k conditions), or (m,n,k)
+
+    Returns
+    -------
+    (Q, p) : statistics and p-values of size () or (m,)
+    '''
+    X = asarray(X, dtype=float)
+    k = X.shape[-1]
+    rows, cols = X.sum(axis=-1), X.sum(axis=-2)
+    T = cols.sum(axis=-1)
+    with errstate(invalid='ignore', divide='ignore'):
+        Q = (k - 1.) * (k*(cols*cols).sum(axis=-1) - T*T) / (k*T - (rows*rows).sum(axis=-1))
+    return (Q, chi2.sf(Q, k - 1))
@@ -0,0 +1,95 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Test results and reporting
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from numpy import ndim
+
+
+class TestResult:
+    ''' Outcome of a statistical hypothesis test
+
+    Lightweight result object returned by every test method. Iterating over a
+    result yields (statistic, p_value), so that results unpack like the tuples
+    returned previously. '''
+
+    __slots__ = ('test_title', 'statistic', 'p_value', 'dof', 'alpha', 'reject',
+                 'conclusion', 'timings', 'details')
+
+    def __init__(self, test_title, statistic=None, p_value=None, dof=None, alpha=None,
+                 reject=None, conclusion=None, timings=None, details=None):
+        self.test_title = test_title  # name of the test
+        self.statistic = statistic    # test statistic
+        self.p_value = p_value        # p-value of the test statistic
+        self.dof = dof                # degrees-of-freedom (if any)
+        self.alpha = alpha            # significance level
+        self.reject = reject          # True if H0 is rejected at significance level alpha
+        self.conclusion = conclusion  # decision stated in words
+        self.timings = {} if timings is None else timings  # elapsed times (in seconds)
+        self.details = {} if details is None else details  # additional test-specific outputs
+
+    def __iter__(self):
+        yield self.statistic
+        yield self.p_value
+
+    def __repr__(self):
+        return ('TestResult(test_title=%r, statistic=%r, p_value=%r, dof=%r, reject=%r)'
+                % (self.test_title, self.statistic, self.p_value, self.dof, self.reject))
+
+    def to_dict(self):
+        ''' Result as a dictionary (one entry per field) '''
+        return {name: getattr(self, name) for name in TestResult.__slots__}
+
+
+class Reporter:
+    ''' Console reporter for test results
+
+    Printing is opt-in: test methods only report when verbose is set on the test
+    object (or on the Samples class). '''
+
+    @staticmethod
+    def print_title(test_title):
+        print ('~'+str(test_title)+'~')
+
+    @staticmethod
+    def print_descriptives(summary):
+        ''' Print a DescriptiveSummary '''
+        print ('\t'+'|'+'-'*30+'|', end='\n')
+        print ('\t'+'  DESCRIPTIVE STATISTICS', end='\n')
+        print ('\t'+'|'+'-'*30+'|', end='\n')
+        print ('\t'+'  Size ..........: '+str(summary.size), end='\n')
+        print ('\t'+'  Min ...........: '+str(round(summary.min, 3)), end='\n')
+        print ('\t'+'  25%  ..........: '+str(round(summary.q25, 3)), end='\n')
+        print ('\t'+'  50%  ..........: '+str(round(summary.q50, 3)), end='\n')
+        print ('\t'+'  75%  ..........: '+str(round(summary.q75, 3)), end='\n')
+        print ('\t'+'  Max ...........: '+str(round(summary.max, 3)), end='\n')
+        print ('\t'+'  Mean ..........: '+str(round(summary.mean, 3)), end='\n')
+        print ('\t'+'  Std Dev .......: '+str(round(summary.std, 3)), end='\n')
+        print ('\t'+'  Skewness ......: '+str(round(summary.skewness, 3)), end='\n')
+        print ('\t'+'  Kurtosis ......: '+str(round(summary.kurtosis, 3)), end='\n')
+        print ('\t'+'|'+'-'*30+'|', end='\n')
+
+    @staticmethod
+    def print_result(result):
+        ''' Print the statistic, p-value and decision of a TestResult '''
+        if result.statistic is None:
+            return
+        if ndim(result.statistic) > 0 or ndim(result.p_value) > 0:
+            print ('stat='+str(result.statistic)+', p='+str(result.p_value))
+        elif result.p_value is None:
+            print ('stat=%.3f' % (result.statistic))
+        else:
+            print ('stat=%.3f, p=%.3f' % (result.statistic, result.p_value))
+        if result.conclusion is not None:
+            print (result.conclusion)
+
+    @staticmethod
+    def report(result, summaries=()):
+        ''' Print the title, descriptive statistics and outcome of a test '''
+        Reporter.print_title(result.test_title)
+        for summary in summaries:
+            Reporter.print_descriptives(summary)
+        Reporter.print_result(result)
@@ -5,9 +5,17 @@
 # Author: Ziad Ghauch
 # -------------------------------------------------------------
 
+from collections import OrderedDict
+from time import perf_counter
+from threading import Lock
+from hashlib import blake2b
 from scipy.stats import describe 
-from scipy.stats import gaussian_kde
-from numpy import sqrt, quantile, random, quantile, array
+from scipy.signal import fftconvolve
+from numpy import sqrt, quantile, quantile, asarray, empty, median, mean, std, var
+from numpy import sort, searchsorted, interp, arange, minimum, ascontiguousarray, uint8, ndim
+from numpy import linspace, bincount, floor, clip, exp, pi, ceil, zeros
+from numpy.random import Generator, SeedSequence, default_rng
+from result import TestResult, Reporter
 
 
 class Samples:
@@ -16,6 +24,17 @@ class Samples:
     Samples from one or two populations '''
     
     bootstrap_size = 10000 # boostrap resampling (class variable)
+    bootstrap_chunk_elements = 2**22 # max resampled values held in memory at once (class variable)
+    descriptive_cache_size = 256 # number of memoized descriptive summaries (class variable)
+    _descriptive_cache = OrderedDict()
+    _cache_lock = Lock() # memoization caches are shared by threads (e.g. TestBattery)
+    verbose = False # print test reports to stdout (class variable, opt-in)
+    _bootstrap_statistics = {
+        'mean': lambda x: mean(x, axis=1),
+        'median': lambda x: median(x, axis=1),
+        'std': lambda x: std(x, axis=1, ddof=1),
+        'var': lambda x: var(x, axis=1, ddof=1),
+    }
     
     def __init__(self, P, test_title):
         self.P=P  # sample P from population 
@@ -33,38 +52,215 @@ class Samples:
     def get_test_title(self):
         return self.test_title
 
+    def set_verbose(self, verbose):
+        self.verbose=verbose
+
+    def get_verbose(self):
+        return self.verbose
+
+    def _result(self, statistic, p_value, start, samples=(), dof=None, conclusions=None, details=None):
+        ''' Package the outcome of a test into a TestResult 
+        
+        Parameters
+        ----------
+        statistic : test statistic
+        p_value : p-value of the test statistic
+        start : perf_counter() value taken when the test started
+        samples : samples whose descriptive statistics are reported (verbose only), or grouped 
+            samples providing their own summaries (see GroupedSamples.summaries)
+        dof : degrees-of-freedom of the test statistic
+        conclusions : (decision when H0 is retained, decision when H0 is rejected)
+        details : dictionary of additional test-specific outputs
+        
+        Returns
+        -------
+        TestResult of the test, reported to stdout when verbose is set
+        '''
+        reject = None if p_value is None else p_value <= self.alpha
+        conclusion = None
+        if conclusions is not None and reject is not None and ndim(reject) == 0:
+            conclusion = conclusions[int(reject)]
+        result = TestResult(self.test_title, statistic, p_value, dof, self.alpha, reject, 
+                            conclusion, {'compute': perf_counter()-start}, details)
+        if self.verbose:
+            start = perf_counter()
+            if hasattr(samples, 'summaries'):
+                summaries = samples.summaries()
+            else:
+                summaries = [Samples.describe_sample(s) for s in samples]
+            Reporter.report(result, summaries)
+            result.timings['report'] = perf_counter()-start
+        return result
+
+
+    @staticmethod
+    def sample_key(_sample):
+        ''' Content key of a sample (shape, dtype and hash of the data) used for memoization '''
+        _sample = ascontiguousarray(_sample)
+        return (_sample.shape, _sample.dtype.str, blake2b(_sample.view(uint8).data, digest_size=16).digest())
+
+    @staticmethod
+    def describe_sample(_sample):
+        ''' Descriptive statistics of a sample, memoized per sample content 
+        
+        Parameters
+        ----------
+        _sample : data of size (N,)
+        
+        Returns
+        -------
+        DescriptiveSummary of the sample
+        '''
+        key = Samples.sample_key(_sample)
+        cache = Samples._descriptive_cache
+        with Samples._cache_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        summary = DescriptiveSummary(_sample)
+        with Samples._cache_lock:
+            cache[key] = summary
+            if len(cache) > Samples.descriptive_cache_size:
+                cache.popitem(last=False)
+        return summary
 
     @staticmethod
     def get_sample_desciptive_statistics(_sample):
         ''' Generate samples descriptive statistics '''
-        print ('\t'+'|'+'-'*30+'|', end='\n')
-        print ('\t'+'  DESCRIPTIVE STATISTICS', end='\n')
-        print ('\t'+'|'+'-'*30+'|', end='\n')
-        print ('\t'+'  Size ..........: '+str(_sample.shape[0]), end='\n')
-        print ('\t'+'  Min ...........: '+str(round(describe(_sample)[1][0], 3)), end='\n')
-        print ('\t'+'  25%  ..........: '+str(round(quantile(_sample,.25), 3)), end='\n')
-        print ('\t'+'  50%  ..........: '+str(round(quantile(_sample,.50), 3)), end='\n')
-        print ('\t'+'  75%  ..........: '+str(round(quantile(_sample,.75), 3)), end='\n')
-        print ('\t'+'  Max ...........: '+str(round(describe(_sample)[1][1], 3)), end='\n')
-        print ('\t'+'  Mean ..........: '+str(round(describe(_sample)[2], 3)), end='\n')
-        print ('\t'+'  Std Dev .......: '+str(round(sqrt(describe(_sample)[3]), 3)), end='\n')
-        print ('\t'+'  Skewness ......: '+str(round(describe(_sample)[4], 3)), end='\n')
-        print ('\t'+'  Kurtosis ......: '+str(round(describe(_sample)[5], 3)), end='\n')
-        print ('\t'+'|'+'-'*30+'|', end='\n')
+        summary = Samples.describe_sample(_sample)
+        Reporter.print_descriptives(summary)
+        return summary
 
 
+    density_exact_elements = 2**22 # largest n * grid size evaluated exactly in 'auto' mode (class variable)
+
+    @staticmethod
+    def bandwidth(_sample, rule='scott'):
+        ''' Bandwidth of the Gaussian kernel density estimate 
+        
+        Parameters
+        ----------
+        _sample : data of size (n,)
+        rule : 'scott' (std * n^(-1/5)), 'silverman' (std * (3n/4)^(-1/5)), as in 
+            scipy.stats.gaussian_kde, or a positive float (the bandwidth itself)
+        
+        Returns
+        -------
+        bandwidth (standard deviation of the kernel)
+        '''
+        if not isinstance(rule, str):
+            h = float(rule)
+        else:
+            n = _sample.shape[0]
+            if rule == 'scott':
+                h = std(_sample, ddof=1) * n**(-1./5)
+            elif rule == 'silverman':
+                h = std(_sample, ddof=1) * (n*3./4)**(-1./5)
+            else:
+                raise ValueError('Unknown bandwidth rule: '+str(rule))
+        if not h > 0:
+            raise ValueError('The bandwidth must be positive (constant sample?)')
+        return h
+
     @staticmethod 
-    def get_sample_density(_sample):
+    def get_sample_density(_sample, bandwidth='scott', grid=None, grid_size=512, mode='auto', cut=3.):
         ''' Density measure of samples using Gaussian Kernel Density Estimate 
+        
+        The density is evaluated on a grid, either exactly (sum of the n kernels at every 
+        grid point, O(n*g), computed in bounded chunks) or by linear binning of the data 
+        onto the grid followed by an FFT convolution with the sampled kernel, O(n + g log g), 
+        suited to very large samples (e.g. resampled null distributions).
+        
+        Parameters
+        ----------
+        _sample : data of size (n,)
+        bandwidth : 'scott', 'silverman' or bandwidth value (see Samples.bandwidth)
+        grid : evaluation points (equally spaced for the binned mode, which ignores data 
+            outside the grid); by default grid_size points spanning the data extended by 
+            cut bandwidths on each side
+        grid_size : number of grid points of the default grid
+        mode : 'exact', 'binned' or 'auto' (exact when n * g <= Samples.density_exact_elements)
+        cut : extension of the default grid beyond the data, in bandwidths
+        
+        Returns
+        -------
+        (grid, density) : evaluation points and density estimate, each of size (g,)
         '''
-        density = gaussian_kde(_sample)
-        density.covariance_factor = lambda:cov_factor
-        density._compute_covariance()
-        return density
+        if mode not in ('auto', 'exact', 'binned'):
+            raise ValueError('Unknown density mode: '+str(mode))
+        _sample = asarray(_sample, dtype=float).ravel()
+        n = _sample.shape[0]
+        h = Samples.bandwidth(_sample, bandwidth)
+        if grid is None:
+            grid = linspace(_sample.min() - cut*h, _sample.max() + cut*h, grid_size)
+        grid = asarray(grid, dtype=float)
+        g = grid.shape[0]
+        if mode == 'auto':
+            mode = 'exact' if n*g <= Samples.density_exact_elements else 'binned'
+        norm_const = 1. / (n * h * sqrt(2*pi))
+        
+        if mode == 'exact':
+            density = zeros(g)
+            rows = max(Samples.density_exact_elements // g, 1)
+            for start in range(0, n, rows):
+                z = (_sample[start:start+rows, None] - grid[None, :]) / h
+                density += exp(-0.5*z*z).sum(axis=0)
+            return (grid, density * norm_const)
+        
+        # linear binning: each point splits its unit weight between its two neighbouring grid points
+        delta = (grid[-1] - grid[0]) / (g - 1.)
+        pos = (_sample - grid[0]) / delta
+        inside = (pos >= 0) & (pos <= g-1)
+        pos = pos[inside]
+        left = clip(floor(pos).astype(int), 0, g-2)
+        frac = pos - left
+        counts = (bincount(left, weights=1.-frac, minlength=g) 
+                  + bincount(left+1, weights=frac, minlength=g))
+        L = int(min(g-1, ceil(5.*h/delta)))
+        offsets = arange(-L, L+1) * delta / h
+        density = fftconvolve(counts, exp(-0.5*offsets*offsets), mode='same')
+        return (grid, clip(density, 0., None) * norm_const)
+
 
+    @staticmethod
+    def rng(seed=None):
+        ''' Random generator of a resampling procedure 
+        
+        Parameters
+        ----------
+        seed : None (fresh entropy), int, SeedSequence or numpy.random.Generator (returned as is)
+        
+        Returns
+        -------
+        numpy.random.Generator
+        '''
+        return default_rng(seed)
 
     @staticmethod
-    def bootstrap_samples(_sample, sample_ratio=0.8):
+    def spawn_seeds(seed, n):
+        ''' Independent child seeds for n parallel tasks or workers
+        
+        The children are spawned from the SeedSequence of the seed (SeedSequence.spawn), so 
+        that their streams are statistically independent and reproducible from the seed, 
+        whichever process or thread consumes them.
+        
+        Parameters
+        ----------
+        seed : None, int, SeedSequence or numpy.random.Generator
+        n : number of child seeds
+        
+        Returns
+        -------
+        list of n SeedSequence
+        '''
+        if isinstance(seed, Generator):
+            return seed.bit_generator.seed_seq.spawn(n)
+        if not isinstance(seed, SeedSequence):
+            seed = SeedSequence(seed)
+        return seed.spawn(n)
+
+    @staticmethod
+    def bootstrap_samples(_sample, sample_ratio=0.8, seed=None):
         ''' Compute bootstrap samples of a statistic 
          
         Sample (with replacement) a subset of size (sample_ratio * N) the original data of size N.
@@ -73,6 +269,7 @@ class Samples:
         ----------
         _sample : original data of size (N,)
         sample_ratio : fraction of the original data to include in the resampling scheme
+        seed : None, int, SeedSequence or numpy.random.Generator (see Samples.rng)
         
         Returns
         -------
@@ -80,20 +277,190 @@ class Samples:
         '''
         
         N = _sample.shape[0]
-        return random.choice(_sample, size=int(sample_ratio*N), replace=True)
+        return Samples.rng(seed).choice(_sample, size=int(sample_ratio*N), replace=True)
+
+    @staticmethod
+    def bootstrap_indices(N, sample_ratio=0.8, size=None, chunk_elements=None, seed=None):
+        ''' Generate bootstrap resample indices in bounded (b, m) chunks
+        
+        All resamples are drawn as integer index matrices rather than one resample 
+        per call. Each chunk holds at most chunk_elements indices, so that memory 
+        stays bounded for large N.
+        
+        Parameters
+        ----------
+        N : size of the original data
+        sample_ratio : fraction of the original data to include in each resample
+        size : number of bootstrap resamples B (defaults to Samples.bootstrap_size)
+        chunk_elements : max number of indices per chunk (defaults to Samples.bootstrap_chunk_elements)
+        seed : None, int, SeedSequence or numpy.random.Generator (see Samples.rng)
+        
+        Returns
+        -------
+        generator of index matrices of size (b, m), with m = sample_ratio * N and sum(b) = B
+        '''
+        
+        size = Samples.bootstrap_size if size is None else int(size)
+        chunk_elements = Samples.bootstrap_chunk_elements if chunk_elements is None else int(chunk_elements)
+        m = max(int(sample_ratio*N), 1)
+        rows = max(chunk_elements // m, 1)
+        rng = Samples.rng(seed)
+        for start in range(0, size, rows):
+            b = min(rows, size-start)
+            yield rng.integers(0, N, size=(b, m))
+
+    @staticmethod
+    def bootstrap_statistic(_sample, statistic, sample_ratio=0.8, size=None, chunk_elements=None, seed=None):
+        ''' Compute the bootstrap distribution of a vectorized statistic
+        
+        Resample indices are generated in chunks of shape (b, m) and the statistic 
+        is evaluated over each chunk in a single NumPy pass (one row per resample).
+        
+        Parameters
+        ----------
+        _sample : original data of size (N,), or tuple of arrays of size (N,) resampled 
+            jointly (e.g. paired samples)
+        statistic : 'mean', 'median', 'std', 'var', or callable mapping (b, m) resampled 
+            array(s) to a statistic of size (b,); reductions must be taken along axis=1
+        sample_ratio : fraction of the original data to include in each resample
+        size : number of bootstrap resamples B (defaults to Samples.bootstrap_size)
+        chunk_elements : max number of indices per chunk (defaults to Samples.bootstrap_chunk_elements)
+        seed : None, int, SeedSequence or numpy.random.Generator (see Samples.rng)
+        
+        Returns
+        -------
+        bootstrap distribution of the statistic, of size (B,)
+        '''
+        
+        paired = isinstance(_sample, tuple)
+        samples = tuple(asarray(s) for s in _sample) if paired else (asarray(_sample),)
+        if isinstance(statistic, str):
+            statistic = Samples._bootstrap_statistics[statistic]
+        
+        size = Samples.bootstrap_size if size is None else int(size)
+        dist = empty(size)
+        start = 0
+        for idx in Samples.bootstrap_indices(samples[0].shape[0], sample_ratio, size, chunk_elements, seed):
+            resampled = [s[idx] for s in samples]
+            dist[start:start+idx.shape[0]] = statistic(*resampled)
+            start += idx.shape[0]
+        return dist
     
     @staticmethod
-    def compute_p_value(_statistic, significance_level, type):
-        ''' Compute p-value from statistic distribution (given significance level) '''
-        _statistic = array(_statistic)
-        if type == 'one-tail':
-            cutoff = quantile(_statistic, 1.0-significance_level)
-            pval = float(len(_statistic[_statistic>=cutoff])) / float(len(_statistic))
-            return (cutoff, pval)
-        elif type == 'two-tail':
-            cutoff = quantile(_statistic, 1.0-significance_level/2.)
-            pval = len(_statistic[_statistic>=cutoff])/len(_statistic)
-            return (cutoff, pval)            
+    def compute_p_value(_statistic, significance_level, type, observed=None):
+        ''' Compute p-value from statistic distribution (given significance level) 
         
+        Parameters
+        ----------
+        _statistic : resampled statistic distribution of size (B,), or NullDistribution
+        significance_level : significance level used for the critical value (cutoff)
+        type : 'one-tail' (right), 'one-tail-left' or 'two-tail'
+        observed : observed statistic(s); when omitted the p-value of the cutoff is returned
         
+        Returns
+        -------
+        (cutoff, pval) : critical value of the distribution and p-value of the observed statistic
+        '''
+        if type not in NullDistribution.tails:
+            raise ValueError('Unknown test type: '+str(type))
+        null = _statistic if isinstance(_statistic, NullDistribution) else NullDistribution(_statistic)
+        cutoff = null.critical_value(significance_level, type)
+        pval = null.p_value(cutoff if observed is None else observed, type)
+        return (cutoff, pval)
+
+
+class DescriptiveSummary:
+    ''' Descriptive statistics of a sample
+    
+    Computed in a single pass: one describe() call and one multi-quantile call. '''
+    
+    def __init__(self, _sample):
+        d = describe(_sample)
+        self.size = int(d.nobs)
+        self.min, self.max = d.minmax
+        self.mean = d.mean
+        self.variance = d.variance
+        self.std = sqrt(d.variance)
+        self.skewness = d.skewness
+        self.kurtosis = d.kurtosis
+        self.q25, self.q50, self.q75 = quantile(_sample, [.25, .50, .75])
+    
+    @staticmethod
+    def from_fields(size, min, max, mean, variance, skewness, kurtosis, q25, q50, q75):
+        ''' DescriptiveSummary of precomputed statistics (e.g. from grouped reductions) '''
+        summary = DescriptiveSummary.__new__(DescriptiveSummary)
+        summary.size, summary.min, summary.max = size, min, max
+        summary.mean, summary.variance, summary.std = mean, variance, sqrt(variance)
+        summary.skewness, summary.kurtosis = skewness, kurtosis
+        summary.q25, summary.q50, summary.q75 = q25, q50, q75
+        return summary
+    
+    def __repr__(self):
+        return ('DescriptiveSummary(size=%d, mean=%.3f, std=%.3f, min=%.3f, max=%.3f)' 
+                % (self.size, self.mean, self.std, self.min, self.max))
+
 
+class NullDistribution:
+    ''' Null distribution of a resampled statistic
+    
+    The resampled statistics are sorted once, so that any number of observed statistics 
+    can be evaluated against the distribution in O(log B) each via binary search. '''
+    
+    tails = {'one-tail': 'right', 'one-tail-right': 'right', 'right': 'right',
+             'one-tail-left': 'left', 'left': 'left',
+             'two-tail': 'two', 'two': 'two'}
+    
+    def __init__(self, _statistic):
+        self.values = sort(asarray(_statistic, dtype=float).ravel())
+        self.size = self.values.shape[0]
+    
+    def get_values(self):
+        return self.values
+    
+    def get_size(self):
+        return self.size
+    
+    def counts(self, observed):
+        ''' Number of resampled statistics strictly below and strictly above the observed statistic(s) '''
+        observed = asarray(observed, dtype=float)
+        below = searchsorted(self.values, observed, side='left')
+        above = self.size - searchsorted(self.values, observed, side='right')
+        return (below, above)
+    
+    def p_value(self, observed, tail='right', mid_p=False):
+        ''' p-value of the observed statistic(s) against the null distribution 
+        
+        Parameters
+        ----------
+        observed : observed statistic, scalar or array of any shape
+        tail : 'right', 'left' or 'two' (also accepts the compute_p_value test types)
+        mid_p : count ties with the observed statistic with weight 1/2 (mid-p value)
+        
+        Returns
+        -------
+        p-value(s) with the same shape as observed
+        '''
+        tail = NullDistribution.tails[tail]
+        below, above = self.counts(observed)
+        ties = self.size - below - above
+        weight = 0.5 if mid_p else 1.0
+        right = (above + weight*ties) / self.size
+        left = (below + weight*ties) / self.size
+        if tail == 'right':
+            return right
+        elif tail == 'left':
+            return left
+        return minimum(2.*minimum(left, right), 1.)
+    
+    def quantile(self, q):
+        ''' Quantile(s) of the null distribution (linear interpolation on the sorted values) '''
+        return interp(asarray(q, dtype=float)*(self.size-1), arange(self.size), self.values)
+    
+    def critical_value(self, significance_level, tail='right'):
+        ''' Critical value(s) of the null distribution at the given significance level '''
+        tail = NullDistribution.tails[tail]
+        if tail == 'right':
+            return self.quantile(1.0-significance_level)
+        elif tail == 'left':
+            return self.quantile(significance_level)
+        return self.quantile(1.0-significance_level/2.)
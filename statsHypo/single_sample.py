@@ -15,8 +15,12 @@ from scipy.stats import jarque_bera
 from scipy.stats import shapiro
 from scipy.stats import anderson
 from scipy.stats import anderson_ksamp
+from scipy.stats import norm, chi2
+from scipy.stats import t as t_dist
 from sample import Samples
-from numpy import sqrt, mean, log, abs
+from moments import MomentAccumulator
+from numpy import sqrt, log, abs, minimum, ndim, cbrt
+from time import perf_counter
 
 
 
@@ -50,6 +54,11 @@ class InfOneSamp(Samples):
     Test 43: Shapiro-Wilk test
     Test 46: Anderson-Darling test
     Test 47: Anderson-Darling test for k-samples
+    
+    Tests 1-5 also accept an (N,K) matrix P (K samples stored column-wise; NaN 
+    or masked entries allowed for ragged columns) and evaluate all K statistics 
+    and p-values in a single vectorized pass. For samples that do not fit in 
+    memory, P may be a MomentAccumulator fed chunk by chunk.
     '''
     
     def __init__(self, P, alpha, inf_parameters=[], test_title=''):
@@ -69,6 +78,31 @@ class InfOneSamp(Samples):
     def get_alpha(self):
         return self.alpha
 
+    def _moments(self, order=2):
+        ''' Column-wise sample size, mean and sums of central powers of P 
+        
+        NaN and masked entries are excluded, so that columns of an (N,K) matrix 
+        may have different sizes. When P is a MomentAccumulator the moments are 
+        taken from the accumulator without the sample being held in memory.
+        
+        Parameters
+        ----------
+        order : highest central power to compute (2 to 4)
+        
+        Returns
+        -------
+        (n, mean, S2, ..., S_order) : each a scalar for P of size (N,) or of size (K,) for P of size (N,K)
+        '''
+        if isinstance(self.P, MomentAccumulator):
+            return self.P.moments(order)
+        return MomentAccumulator().update(self.P).moments(order)
+
+    def _samples(self):
+        ''' Samples whose descriptive statistics are reported (single samples only) '''
+        if isinstance(self.P, MomentAccumulator):
+            return ()
+        return (self.P,) if ndim(self.P) == 1 else ()
+
 
     def z_test(self):
         ''' Test 1: Single-Sample Z-test 
@@ -90,21 +124,24 @@ class InfOneSamp(Samples):
         
         Parameters
         ----------
-        P : sample of size (N,1) from the population (mu, sigma)
+        P : sample of size (N,1) from the population (mu, sigma), or (N,K) matrix of K samples
         
         Return
         ------
-        zstat : single-sample Z-test statistic
+        TestResult : single-sample Z-test statistic and two-tailed p-value
         '''
         
         self.test_title='Single-Sample Z-test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
         pop_mean, pop_std = self.inf_parameters[0], self.inf_parameters[1]
         
-        zstat = (mean(self.P) - pop_mean) / (pop_std/sqrt(len(self.P))) 
-        print ('stat=%.3f' % (zstat))
+        n, m = self._moments(order=2)[:2]
+        zstat = (m - pop_mean) / (pop_std/sqrt(n)) 
+        p = 2.*norm.sf(abs(zstat))
+        return self._result(zstat, p, start, samples=self._samples(),
+                            conclusions=('Mean of the sample probably equals the population mean',
+                                         'Mean of the sample probably does not equal the population mean'))
         
 
     def t_test(self):
@@ -127,32 +164,25 @@ class InfOneSamp(Samples):
         
         Parameters
         ----------
-        P : sample of size (N,1) from the population (mean mu)
+        P : sample of size (N,1) from the population (mean mu), or (N,K) matrix of K samples
         
         Return
         ------
-        tstat : single-sample T-test statistic        
+        TestResult : single-sample T-test statistic and two-tailed p-value (dof N-1)
         '''
         
         self.test_title='Single-Sample T-test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         pop_mean = self.inf_parameters[0]
-        #from scipy.stats import ttest_1samp
-        #stat, p = ttest_1samp(self.P, popmean=pop_mean)
-        #print ('stat=%.3f, p=%.3f' % (stat,p))
         
-        n = len(self.P)
-        sx = sqrt((sum(self.P**2) - (sum(self.P))**2 / n) / (n-1)) / sqrt(n)
-        tstat = (mean(self.P) - pop_mean) / sx
-        print ('stat=%.3f' % (tstat))
-
-        #if p > self.alpha:
-        #    print ('Mean of population the sample represents equals mu_target')
-        #else:
-        #    print ('Mean of population sample represents is not equal to mu_target.')
+        n, m, S2 = self._moments(order=2)
+        sx = sqrt(S2 / (n-1)) / sqrt(n)
+        tstat = (m - pop_mean) / sx
+        p = 2.*t_dist.sf(abs(tstat), n-1)
+        return self._result(tstat, p, start, samples=self._samples(), dof=n-1,
+                            conclusions=('Mean of population the sample represents equals mu_target',
+                                         'Mean of population sample represents is not equal to mu_target.'))
 
 
     def chi_square_test_population_variance(self):
@@ -176,25 +206,25 @@ class InfOneSamp(Samples):
         
         Parameters
         ----------
-        P : sample of size (N,1) from the population (variance sigma^2)
+        P : sample of size (N,1) from the population (variance sigma^2), or (N,K) matrix of K samples
         
         Return
         ------
-        chisquarestat : single-sample chi-square test statistic          
+        TestResult : single-sample chi-square test statistic and two-tailed p-value (dof N-1)
         '''
         
         self.test_title='Single-Sample Chi-Square Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
  
         pop_var = (self.inf_parameters[0])**2    
         
-        Samples.get_sample_desciptive_statistics(self.P) 
-        
-        n = len(self.P)   
-        s2 = (sum(self.P**2) - (sum(self.P)**2) / n) / (n-1)
+        n, m, S2 = self._moments(order=2)
+        s2 = S2 / (n-1)
         chisquarestat = (n-1)*s2/pop_var
-        
-        print ('stat=%.3f' % (chisquarestat))
+        p = minimum(2.*minimum(chi2.cdf(chisquarestat, n-1), chi2.sf(chisquarestat, n-1)), 1.)
+        return self._result(chisquarestat, p, start, samples=self._samples(), dof=n-1,
+                            conclusions=('Variance of the sample probably equals the population variance',
+                                         'Variance of the sample probably does not equal the population variance'))
 
 
     def test_population_skewness(self):
@@ -215,21 +245,20 @@ class InfOneSamp(Samples):
         
         Parameters
         ----------
-        P : sample of size (N,1) from the population
+        P : sample of size (N,1) from the population, or (N,K) matrix of K samples
         
         Return
         ------
-        skewstat : single-sample skew test statistic         
+        TestResult : single-sample skew test statistic and two-tailed p-value
         '''
 
         self.test_title='Single-Sample Test for Evaluating Population Skewness'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
-        n = len(self.P)
-        m3 = (n*sum((self.P - mean(self.P))**3)) / ((n-1)*(n-2))
-        st = sqrt((sum((self.P - mean(self.P))**2)) / (n-1))
+        n, m, S2, S3 = self._moments(order=3)
+        n = n*1. # float sample size avoids integer overflow in the powers of n below
+        m3 = (n*S3) / ((n-1)*(n-2))
+        st = sqrt(S2 / (n-1))
         g1 = m3 / st**3
         sb1 = (n-2)*g1/(sqrt(n*(n-1)))
         A = sb1 * sqrt((n+1)*(n+3)/(6*(n-2)))
@@ -239,15 +268,10 @@ class InfOneSamp(Samples):
         E = 1./sqrt(log(D))
         F = A / (sqrt(2./(C-1)))
         stewstat = E * log(F + sqrt(F**2+1))
-        print ('stat=%.3f' % (stewstat))
-        
-		#from scipy.stats import skewtest
-        #stat, p = skewtest(self.P)
-        #print ('stat=%.3f, p=%.3f' % (stat,p))
-        #if p > self.alpha:
-        #    print ('Skewness of the population that the sample was drawn from is the same as that of a corresponding normal distribution')
-        #else:
-        #    print ('Skewness of the population that the sample was drawn from is not the same as that of a corresponding normal distribution')
+        p = 2.*norm.sf(abs(stewstat))
+        return self._result(stewstat, p, start, samples=self._samples(),
+                            conclusions=('Skewness of the population that the sample was drawn from is the same as that of a corresponding normal distribution',
+                                         'Skewness of the population that the sample was drawn from is not the same as that of a corresponding normal distribution'))
         
 
     def test_population_kurtosis(self):
@@ -268,39 +292,31 @@ class InfOneSamp(Samples):
         
         Parameters
         ----------
-        P : sample of size (N,1) from the population
+        P : sample of size (N,1) from the population, or (N,K) matrix of K samples
         
         Return
         ------
-        kurtosisstat : single-sample kurtosis test statistic           
+        TestResult : single-sample kurtosis test statistic and two-tailed p-value
         '''
 
         self.test_title='Single-Sample Test for Evaluating Population Kurtosis'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
-        
-        n = len(self.P)
-        m4 = ((sum((self.P-mean(self.P))**4)*n*(n+1)/(n-1))-3*(sum((self.P-mean(self.P))**2))**2)/((n-2)*(n-3))
-        st = sqrt((sum((self.P - mean(self.P))**2)) / (n-1))
+        n, m, S2, S3, S4 = self._moments(order=4)
+        n = n*1. # float sample size avoids integer overflow in the powers of n below
+        m4 = ((S4*n*(n+1)/(n-1))-3*S2**2)/((n-2)*(n-3))
+        st = sqrt(S2 / (n-1))
         g2 = m4 / st**4
         G = 24*n*(n-2)*(n-3)/((n+1)**2*(n+3)*(n+5))
-        H = (n-2)*(n-3)*abs(g2)/((n+1)*(n-1)*sqrt(G))
+        H = (n-2)*(n-3)*g2/((n+1)*(n-1)*sqrt(G)) # signed: negative for platykurtic samples
         J = (6*(n**2-5*n+2)/((n+7)*(n+9))) * sqrt((6*(n+3)*(n+5))/(n*(n-2)*(n-3)))
         K = 6 + 8./J *(2./J + sqrt(1+4./(J**2)))
         L = (1-2./K)/(1+H*sqrt(2./(K-4)))
-        kurtosisstat = (1-2./(9*K)-L**(1./3)) / (sqrt(2./(9*K)))
-        print ('stat=%.3f' % (kurtosisstat))
-        
-
-        from scipy.stats import kurtosistest
-        stat, p = kurtosistest(self.P) 
-        print ('stat=%.3f, p=%.3f' % (stat,p))
-
-        #if p > self.alpha:
-        #    print ('Kurtosis of the population that the sample was drawn from is the same as that of a corresponding normal distribution')
-        #else:
-        #    print ('Kurtosis of the population that the sample was drawn from is not the same as that of a corresponding normal distribution')
+        kurtosisstat = (1-2./(9*K)-cbrt(L)) / (sqrt(2./(9*K)))
+        p = 2.*norm.sf(abs(kurtosisstat))
+        return self._result(kurtosisstat, p, start, samples=self._samples(),
+                            conclusions=('Kurtosis of the population that the sample was drawn from is the same as that of a corresponding normal distribution',
+                                         'Kurtosis of the population that the sample was drawn from is not the same as that of a corresponding normal distribution'))
         
         
     def dagostino_pearson_test_normality(self):
@@ -313,184 +329,147 @@ class InfOneSamp(Samples):
         '''
 
         self.test_title='D’Agostino–Pearson Test of Normality'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         stat, p = normaltest(self.P)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample is probably derived from a normally distributed population.')
-        else:
-            print('The sample is probably not derived from a normally distributed population.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample is probably derived from a normally distributed population.',
+                                         'The sample is probably not derived from a normally distributed population.'))
 
 
     def  wilcoxon_signed_ranks_test(self):
         '''  Test 6: Wilcoxon Signed-Ranks Test '''
         self.test_title='Wilcoxon Signed-Ranks Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        return self._result(None, None, start)
 
 
     def kolmogorov_smirnov_goodness_of_fit_test(self):
         ''' Test 7: Kolmogorov–Smirnov Goodness-of-fit Test '''
 
         self.test_title='Kolmogorov–Smirnov Goodness-of-fit Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
         _cdf = self.inf_parameters[0]
         
         stat, p = ks_1samp(self.P, cdf=_cdf)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample fits with the expected distribution.')
-        else:
-            print('The sample does not fit with the expected distribution.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample fits with the expected distribution.',
+                                         'The sample does not fit with the expected distribution.'))
 
 
     def chi_square_goodness_of_fit_test(self):
         ''' Test 8: Chi-Square Goodness-of-Fit Test '''
 
         self.test_title='Chi-Square Goodness-of-Fit Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
         fexp = self.inf_parameters[0]
         
         stat, p = chisquare(self.P, f_exp=fexp)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample fits with the expected distribution.')
-        else:
-            print('The sample does not fit with the expected distribution.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample fits with the expected distribution.',
+                                         'The sample does not fit with the expected distribution.'))
 
 
     def binomial_sign_test_single_sample(self):
         ''' Test 9: Binomial Sign Test for a Single Sample '''
         self.test_title='Binomial Sign Test'
-        print ('~'+str(self.test_title)+'~') 
+        start = perf_counter()
+        return self._result(None, None, start)
 
 
     def single_sample_runs_test(self):
         ''' Test 10: Single-Sample Runs Test '''
         self.test_title='Single-Sample Runs Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        return self._result(None, None, start)
         
 
     def cramer_vonmises_test(self):
         ''' Test 35: Cramér-von Mises Test '''
 
         self.test_title='Cramér-von Mises Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
         _cdf = self.inf_parameters[0]
         
         stat, p = cramervonmises(self.P, cdf=_cdf)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample fits with the expected cumulative distribution.')
-        else:
-            print('The sample does not fit with the expected cumulative distribution.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample fits with the expected cumulative distribution.',
+                                         'The sample does not fit with the expected cumulative distribution.'))
 
 
     def cressie_read_power_divergence_test(self):
         ''' Test 37: Cressie-Read Power Divergence Statistic '''
 
         self.test_title='Cressie-Read Power Divergence Statistic'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
         fexp = self.inf_parameters[0]
         
         stat, p = power_divergence(self.P, f_exp=fexp)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample fits with the expected distribution.')
-        else:
-            print('The sample does not fit with the expected distribution.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample fits with the expected distribution.',
+                                         'The sample does not fit with the expected distribution.'))
  
 
     def jarque_bera_test(self):
         ''' Test 40: Jarque-Bera Goodness of Fit Test '''
 
         self.test_title='Jarque-Bera Goodness of Fit Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         stat, p = jarque_bera(self.P)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('sample data has the skewness and kurtosis matching a normal distribution.')
-        else:
-            print('sample data does not have the skewness and kurtosis matching a normal distribution.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('sample data has the skewness and kurtosis matching a normal distribution.',
+                                         'sample data does not have the skewness and kurtosis matching a normal distribution.'))
 
 
     def shapiro_wilk_test(self):
         ''' Test 43: Shapiro-Wilk Test '''
 
         self.test_title='Shapiro-Wilk Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         stat, p = shapiro(self.P)
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample was probably drawn from a normal distribution.')
-        else:
-            print('The sample was probably not drawn from a normal distribution.')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample was probably drawn from a normal distribution.',
+                                         'The sample was probably not drawn from a normal distribution.'))
  
 
     def anderson_darling_test(self):
         ''' Test 46: Anderson-Darling Test '''
 
         self.test_title='Anderson-Darling Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
         _dist = self.inf_parameters[0]
         
         stat, p = anderson(self.P, dist=_dist)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample is drawn from a population that follows target distribution')
-        else:
-            print('Sample is not drawn from a population that follows target distribution')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample is drawn from a population that follows target distribution',
+                                         'Sample is not drawn from a population that follows target distribution'))
 
 
     def anderson_darling_test_k_samples(self):
         ''' Test 47: Anderson-Darling Test for k-samples '''
 
         self.test_title='Anderson-Darling Test for k-samples'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         stat, p = anderson_ksamp(self.P)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('The sample is probably drawn from same distribution')
-        else:
-            print('Sample is probably not drawn from the same distribution')
-        return (stat, p)
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('The sample is probably drawn from same distribution',
+                                         'Sample is probably not drawn from the same distribution'))
         
 
 
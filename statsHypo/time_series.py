@@ -9,6 +9,7 @@
 from statsmodels.tsa.stattools import adfuller
 from statsmodels.tsa.stattools import kpss
 from sample import Samples
+from time import perf_counter
 
 
 
@@ -28,33 +29,24 @@ class TimeSeries(Samples):
         ''' Test 33: Augmented Dickey-Fuller Unit Root Test '''
 
         self.test_title='Augmented Dickey-Fuller Unit Root Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         stat, p, lags, obs, crit, t = adfuller(self.P)
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        
-        if p > self.alpha:
-            print('Probably not Stationary')
-        else:
-            print('Probably Stationary')
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('Probably not Stationary',
+                                         'Probably Stationary'))
 
 
     def kwiatkowski_phillips_schmidt_shin_test(self):
         ''' Test 34: Kwiatkowski-Phillips-Schmidt-Shin '''
 
         self.test_title='Kwiatkowski-Phillips-Schmidt-Shin'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
+        start = perf_counter()
         
         stat, p, lags, crit = kpss(self.P)
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably Stationary')
-        else:
-            print('Probably not Stationary')  
+        return self._result(stat, p, start, samples=(self.P,),
+                            conclusions=('Probably Stationary',
+                                         'Probably not Stationary'))
     
     
     
@@ -8,6 +8,7 @@
 
 
 from sample import Samples
+from time import perf_counter
 from scipy.stats import ttest_rel
 from scipy.stats import wilcoxon
 
@@ -37,48 +38,39 @@ class InfTwoDepSamp(Samples):
         ''' Test 17: T-test for Two Dependent Samples '''
 
         self.test_title='T-test for Two Dependent Samples'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
         stat, p = ttest_rel(self.P, self.Q)
-        print ('stat=%.3f, p=%.3f'  % (stat,p) )
-        
-        if p > self.alpha:
-            print ('Probably the same distribution')
-        else:
-            print ('Probably different distributions')
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
             
 
     def wilcoxon_matched_pairs_test(self):
         ''' Test 18: Wilcoxon Matched-Pairs Signed-Ranks Test '''
 
         self.test_title='Wilcoxon Matched-Pairs Signed-Ranks Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
         stat, p = wilcoxon(self.P, self.Q)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
 
 
     def binomial_sign_test_dependent(self):
         ''' Test 19: Binomial Sign Test for Two Dependent Samples '''
         
         self.test_title='Binomial Sign Test for Two Dependent Samples'
-        print ('~'+str(self.test_title)+str('~'))
+        start = perf_counter()
+        return self._result(None, None, start)
 
 
     def mcnemar_test(self):
         ''' Test 20: McNemar Test '''
         
         self.test_title='McNemar Test'
-        print ('~'+str(self.test_title)+str('~'))
+        start = perf_counter()
+        return self._result(None, None, start)
 
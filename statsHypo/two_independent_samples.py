@@ -6,16 +6,22 @@
 # -------------------------------------------------------------
 
 
-from scipy.stats import chi2_contingency
 from scipy.stats import ttest_ind
 from scipy.stats import mannwhitneyu
 from scipy.stats import cramervonmises_2samp
 from scipy.stats import ks_2samp
 from scipy.stats import epps_singleton_2samp
-from scipy.stats import brunnermunzel
 from scipy.stats import ansari
 from scipy.stats import mood
+from scipy.stats import norm
+from scipy.stats import t as t_dist
 from sample import Samples
+from ranks import PooledRanks, linear_rank_test
+from permutation import PermutationTest
+from jackknife import Jackknife
+from contingency import ContingencyTable
+from numpy import sqrt, minimum, asarray
+from time import perf_counter
 
 
 
@@ -59,198 +65,366 @@ class InfTwoIndepSamp(Samples):
         ''' Test 11: T-test for Two Independent Samples '''
 
         self.test_title='T-test for Two Independent Samples'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
         stat, p = ttest_ind(self.P, self.Q)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
             
             
     def mann_whitney_utest(self):
         ''' Test 12: The Mann–Whitney U Test '''
 
         self.test_title='Mann–Whitney U-test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        
+        n1, n2 = len(self.P), len(self.Q)
+        ranks = PooledRanks.get(self.P, self.Q)
+        if (n1 <= 8 or n2 <= 8) and not ranks.has_ties:
+            stat, p = mannwhitneyu(self.P, self.Q) # exact null distribution
+        else:
+            # normal approximation with tie and continuity corrections
+            N = n1 + n2
+            stat = ranks.rank_sums()[0] - n1*(n1+1)/2.
+            U = max(stat, n1*n2 - stat)
+            s = sqrt(n1*n2/12. * ((N+1) - ranks.tie_term/(N*(N-1))))
+            p = min(2.*norm.sf((U - n1*n2/2. - 0.5)/s), 1.)
+
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
+
+
+    def randomization_test(self, statistic='mean', max_permutations=100000, precision=0.001, seed=None):
+        ''' Test 12a: Randomization Test for Two Independent Samples 
         
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)   
+        Permutation test of whether two independent samples are derived from the same 
+        population. The null distribution of the statistic is obtained by relabelling the 
+        pooled data: exactly (all C(N, n1) relabellings) for small samples, or by Monte Carlo 
+        sampling in vectorized batches, stopping once the p-value is resolved to the 
+        requested precision.
         
-        stat, p = mannwhitneyu(self.P, self.Q)
+        H0 (null hypothesis): 
+        	-> the two samples are derived from the same population
+        H1 (alternate hypothesis): 
+        	-> the two samples are derived from different populations (nondirectional, 
+            	two-tailed test)
+        
+        Parameters
+        ----------
+        statistic : 'mean', 'median', 'U' or vectorized callable (see PermutationTest)
+        max_permutations : largest number of random relabellings
+        precision : half-width of the p-value confidence interval at which sampling stops
+        seed : None, int, SeedSequence or numpy.random.Generator of the random relabellings
+        
+        Return
+        ------
+        TestResult : observed statistic and two-tailed permutation p-value
+        '''
+        
+        self.test_title='Randomization Test for Two Independent Samples'
+        start = perf_counter()
+        
+        stat, p, permutations, exact = PermutationTest(self.P, self.Q, statistic, seed).test(
+            max_permutations, precision)
+        
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            details={'permutations': permutations, 'exact': exact},
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')            
+
+    def jackknife_test(self, statistic='logvar', d=1, seed=None):
+        ''' Test 12c: Jackknife 
+        
+        Compares a statistic of the two samples through its jackknife (bias-corrected) 
+        estimate and standard error in each sample. With the default statistic, the 
+        logarithm of the variance, this is Miller's jackknife test for equal variability.
+        The test statistic is the difference of the two estimates divided by its standard 
+        error, evaluated against the t distribution with n1+n2-2 degrees-of-freedom.
+        
+        H0 (null hypothesis): 
+        	-> the statistic is equal in the two populations 
+        H1 (alternate hypothesis): 
+        	-> the statistic differs between the two populations (nondirectional, 
+            	two-tailed test)
+        
+        Parameters
+        ----------
+        statistic : 'logvar', 'var', 'std', 'mean' or callable (see Jackknife)
+        d : number of observations deleted from each jackknife subsample
+        seed : None, int, SeedSequence or numpy.random.Generator of the random deletions (d > 1)
+        
+        Return
+        ------
+        TestResult : t statistic and two-tailed p-value
+        '''
+        
+        self.test_title='Jackknife Test for Two Independent Samples'
+        start = perf_counter()
+        
+        name = getattr(statistic, '__name__', statistic)
+        seed_p, seed_q = Samples.spawn_seeds(seed, 2)
+        jp = Jackknife(self.P, statistic, d, seed=seed_p).compute()
+        jq = Jackknife(self.Q, statistic, d, seed=seed_q).compute()
+        stat = (jp['estimate'] - jq['estimate']) / sqrt(jp['se']**2 + jq['se']**2)
+        dof = len(self.P) + len(self.Q) - 2
+        p = 2.*t_dist.sf(abs(stat), dof)
+        
+        return self._result(stat, p, start, samples=(self.P, self.Q), dof=dof,
+                            details={'estimates': (jp['estimate'], jq['estimate']),
+                                     'standard_errors': (jp['se'], jq['se'])},
+                            conclusions=('Probably the same '+name+' in both populations',
+                                         'Probably different '+name+' in the two populations'))
 
 
     def kolmogorov_smirnov_test(self):
         ''' Test 13: The Kolmogorov–Smirnov Test for Two Independent Samples '''
         
         self.test_title='Kolmogorov–Smirnov Test for Two Independent Samples'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
         stat, p = ks_2samp(self.P, self.Q)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')            
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
 
 
-    def siegel_tukey_test(self):
-        ''' Test 14: Siegel–Tukey Test for Equal Variability '''
+    def siegel_tukey_test(self, exact_threshold=50):
+        ''' Test 14: Siegel–Tukey Test for Equal Variability 
+        
+        Nonparametric test of whether two independent samples (with equal medians) are derived 
+        from populations with equal variability. The pooled data are sorted once and ranked 
+        alternately from both extremes (1 to the smallest, 2 and 3 to the two largest, 4 and 5 
+        to the next two smallest, ...); a small rank sum for P indicates that P is more variable.
+        
+        H0 (null hypothesis): 
+        	-> the two populations have equal variability
+        H1 (alternate hypothesis): 
+        	-> the two populations do not have equal variability (nondirectional, two-tailed test)
+        
+        Parameters
+        ----------
+        exact_threshold : largest combined sample size using the exact null distribution of 
+            the rank sum (without ties); larger samples use the normal approximation
+        
+        Return
+        ------
+        TestResult : sum of the Siegel–Tukey ranks of P and two-tailed p-value
+        '''
     
         self.test_title='Siegel–Tukey Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        
+        scores = PooledRanks.get(self.P, self.Q).siegel_tukey_ranks()
+        stat, p = linear_rank_test(scores, len(self.P), exact_threshold)
+        
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably equal variability',
+                                         'Probably different variability'))
     
 
-    def moses_test_variability(self):
-        ''' Test 15: Moses Test for Equal Variability '''
+    def moses_test_variability(self, subsample_size=None, exact_threshold=50, seed=None):
+        ''' Test 15: Moses Test for Equal Variability 
+        
+        Nonparametric test of whether two independent samples are derived from populations 
+        with equal variability (the medians need not be equal). Each sample is randomly 
+        divided into subsamples of size k (leftover observations are discarded), the sum of 
+        squared deviations of every subsample is computed in one vectorized pass, and the 
+        two sets of sums of squares are compared with the Mann–Whitney U test.
+        
+        H0 (null hypothesis): 
+        	-> the two populations have equal variability
+        H1 (alternate hypothesis): 
+        	-> the two populations do not have equal variability (nondirectional, two-tailed test)
+        
+        Parameters
+        ----------
+        subsample_size : size k of the subsamples (defaults to sqrt of the smaller sample size)
+        exact_threshold : largest total number of subsamples using the exact null distribution
+        seed : None, int, SeedSequence or numpy.random.Generator of the random subsamples
+        
+        Return
+        ------
+        TestResult : Mann–Whitney U statistic of the subsample sums of squares of P and 
+            two-tailed p-value
+        '''
 
         self.test_title='Moses Test for Variability'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        
+        k = subsample_size
+        if k is None:
+            k = max(int(sqrt(min(len(self.P), len(self.Q)))), 2)
+        
+        rng = Samples.rng(seed)
+        
+        def subsample_ss(x):
+            m = len(x) // k
+            sub = rng.permutation(x)[:m*k].reshape(m, k)
+            return ((sub - sub.mean(axis=1, keepdims=True))**2).sum(axis=1)
+        
+        ss_p, ss_q = subsample_ss(asarray(self.P)), subsample_ss(asarray(self.Q))
+        m1 = len(ss_p)
+        W, p = linear_rank_test(PooledRanks(ss_p, ss_q).ranks, m1, exact_threshold)
+        stat = W - m1*(m1+1)/2.
+        
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            details={'subsample_size': k, 'subsamples': (m1, len(ss_q))},
+                            conclusions=('Probably equal variability',
+                                         'Probably different variability'))
 
     
     def chi_square_test(self):
-        ''' Test 16: Chi square Test '''
+        ''' Test 16: Chi square Test 
+        
+        Chi-square test of independence of two categorical variables, P and Q holding the 
+        categories (codes or labels) of every observation. The r x c table is built from 
+        the raw codes in one pass (see ContingencyTable.from_codes; sparse for high 
+        cardinalities).
+        
+        H0 (null hypothesis): the two variables are independent
+        H1 (alternate hypothesis): the two variables are dependent
+        '''
     
         self.test_title='Chi square Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        
+        table = ContingencyTable.from_codes(self.P, self.Q)
+        stat, p = table.chi_square()
+        return self._result(stat, p, start, dof=table.dof(),
+                            details={'shape': table.shape, 'N': table.N},
+                            conclusions=('Probably independent',
+                                         'Probably dependent'))
 
     
 
     def chi_square_test_homogeneity(self):
-        ''' Test 16a: Chi-Square Test for Homogeneity '''
+        ''' Test 16a: Chi-Square Test for Homogeneity 
+        
+        P and Q hold the counts of the two samples in every category (the rows of a 2 x c 
+        table); Yates' correction is applied to 2 x 2 tables.
+        '''
 
         self.test_title='The Chi-Square Test for Homogeneity'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
-        
-        table = [self.P,self.Q]
-        stat, p, dof, expected = chi2_contingency(table)
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably independent')
-        else:
-            print('Probably dependent')
+        table = ContingencyTable([self.P, self.Q])
+        stat, p = table.chi_square(correction=True)
+        return self._result(stat, p, start, samples=(self.P, self.Q), dof=table.dof(),
+                            conclusions=('Probably independent',
+                                         'Probably dependent'))
 
 
     def single_factor_between_subjects_anova(self):
         ''' Test 21: Single-Factor Between-Subjects Analysis of Variance '''
 
         self.test_title='Single-Factor Between-Subjects Analysis of Variance'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        return self._result(None, None, start)
      
 
     def van_der_waerden_normal_scores(self):
         ''' Test 23: Van der Waerden Normal-Scores Test for k Independent Samples '''
     
         self.test_title='Van der Waerden Normal-Scores Test for k Independent Samples '
-        print ('~'+str(self.test_title)+'~')    
+        start = perf_counter()
+        return self._result(None, None, start)
         
             
     def cramer_von_mises_goodness_of_fit_test(self):
         ''' Test 36: Cramér-von Mises test for goodness of fit. '''
         
         self.test_title='Cramér-von Mises Test for Goodness of Fit'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
         stat, p = cramervonmises_2samp(self.P, self.Q, method='exact')
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')            
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
 
         
     def epps_singleton_test(self):
         ''' Test 37: Epps-Singleton (ES) Test Statistic '''
 
         self.test_title='Epps-Singleton (ES) Test Statistic'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
 
         stat, p = epps_singleton_2samp(self.P, self.Q)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')            
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
                      
 
     def brunner_munzel_test(self):
         ''' Test 38: Brunner-Munzel Test Statistic '''
 
         self.test_title='Brunner-Munzel Test Statistic'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
         
-        stat, p = brunnermunzel(self.P, self.Q)
-
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')            
+        nx, ny = len(self.P), len(self.Q)
+        ranks = PooledRanks.get(self.P, self.Q)
+        rankcx, rankcy = ranks.group(0), ranks.group(1)
+        rankx, ranky = PooledRanks.get(self.P).ranks, PooledRanks.get(self.Q).ranks
+        Sx = ((rankcx - rankx - rankcx.mean() + rankx.mean())**2).sum() / (nx-1)
+        Sy = ((rankcy - ranky - rankcy.mean() + ranky.mean())**2).sum() / (ny-1)
+        stat = nx*ny*(rankcy.mean() - rankcx.mean()) / ((nx+ny)*sqrt(nx*Sx + ny*Sy))
+        dof = (nx*Sx + ny*Sy)**2 / ((nx*Sx)**2/(nx-1) + (ny*Sy)**2/(ny-1))
+        p = min(2.*t_dist.sf(abs(stat), dof), 1.)
+
+        return self._result(stat, p, start, samples=(self.P, self.Q), dof=dof,
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
         
         
     def ansari_bradley_test(self):
         ''' Test 41: Ansari-Bradley Test '''
 
         self.test_title='Ansari-Bradley Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
 
-        stat, p = ansari(self.P, self.Q)
-        
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
+        n, m = len(self.P), len(self.Q)
+        N = n + m
+        ranks = PooledRanks.get(self.P, self.Q)
+        if n < 55 and m < 55 and not ranks.has_ties:
+            stat, p = ansari(self.P, self.Q) # exact null distribution
         else:
-            print('Probably different distributions')            
+            symrank = minimum(ranks.ranks, N - ranks.ranks + 1)
+            stat = symrank[:n].sum()
+            mnAB = (n * (N+1.)**2 / 4. / N) if N % 2 else (n * (N+2.) / 4.)
+            if ranks.has_ties:
+                fac = (symrank**2).sum()
+                if N % 2:
+                    varAB = m*n*(16*N*fac - (N+1)**4) / (16.*N**2*(N-1))
+                else:
+                    varAB = m*n*(16*fac - N*(N+2)**2) / (16.*N*(N-1))
+            elif N % 2:
+                varAB = n*m*(N+1.)*(3+N**2) / (48.*N**2)
+            else:
+                varAB = m*n*(N+2)*(N-2.) / 48 / (N-1.)
+            p = min(2.*norm.sf(abs(mnAB - stat)/sqrt(varAB)), 1.)
+        
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
                    
  
     def moods_test(self):
         ''' Test 42: Mood’s Test  ''' 
         
         self.test_title='Mood’s Test'
-        print ('~'+str(self.test_title)+'~')
-
-        Samples.get_sample_desciptive_statistics(self.P)
-        Samples.get_sample_desciptive_statistics(self.Q)
+        start = perf_counter()
 
         stat, p = mood(self.P, self.Q)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')            
+        return self._result(stat, p, start, samples=(self.P, self.Q),
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
  
     
  
@@ -7,7 +7,13 @@
 
 
 from sample import Samples
-from scipy.stats import friedmanchisquare
+from grouped import GroupedSamples
+from result import Reporter
+from ranks import RowRanks
+from time import perf_counter
+from scipy.stats import chi2
+from repeated import within_subjects_anova, cochran_q
+from numpy import asarray, ndim, unique, bincount
 
 
 
@@ -23,43 +29,147 @@ class InfTwoOrMoreDepSamp(Samples):
         Test 24f: Dunnett Test
     Test 25: Friedman Two-Way Analysis of Variance by Ranks
     Test 26: Cochran Q Test
+    
+    The samples are the k conditions measured on the same n subjects: k samples of size 
+    (n,), or one matrix of size (n,k). A stack of m matrices of size (m,n,k) (e.g. m 
+    outcomes) is tested in one batched evaluation, the tests then returning arrays of 
+    size (m,).
     '''
     
     def __init__(self, P, *listQ, alpha, inf_parameters=[], test_title=''):
+        self.matrix = None
+        if isinstance(P, GroupedSamples):
+            self.groups = P
+            P, listQ = P.group(0), [P.group(i) for i in range(1, P.k)]
+        elif not listQ and ndim(P) == 3:
+            self.groups = None
+            self.matrix = asarray(P, dtype=float)
+        elif not listQ and ndim(P) == 2:
+            P = asarray(P, dtype=float)
+            P, listQ = P[:, 0], [P[:, j] for j in range(1, P.shape[1])]
+            self.groups = GroupedSamples.from_groups((P,)+tuple(listQ))
+        else:
+            self.groups = GroupedSamples.from_groups((P,)+tuple(listQ))
+        if self.matrix is None:
+            if (self.groups.counts != self.groups.counts[0]).any():
+                raise ValueError('Every condition must be measured on the same subjects (equal sample sizes)')
+            self.matrix = self.groups.values.reshape(self.groups.k, -1).T
         super().__init__(P, test_title)
         self.Q=[] 
         self.Q.append([q for q in listQ])
         self.alpha=alpha
         self.inf_parameters=inf_parameters
 
+    @staticmethod
+    def from_long(values, labels, alpha, subjects=None, inf_parameters=[], test_title=''):
+        ''' Tests of long-format data (one value and one group label per observation) 
+        
+        Parameters
+        ----------
+        values : observations of size (N,)
+        labels : condition label of every observation, of size (N,)
+        subjects : subject of every observation, of size (N,); every subject must be observed 
+            once in every condition, and the rows of the conditions are aligned by subject 
+            (defaults to the order of the values)
+        alpha : significance level
+        '''
+        if subjects is not None:
+            _, conditions = unique(asarray(labels), return_inverse=True)
+            _, ids = unique(asarray(subjects), return_inverse=True)
+            k, n = int(conditions.max()) + 1, int(ids.max()) + 1
+            cells = bincount(conditions.ravel()*n + ids.ravel(), minlength=k*n)
+            if (cells != 1).any():
+                raise ValueError('Every subject must be observed exactly once in every condition')
+        groups = GroupedSamples.from_long(values, labels, subjects)
+        return InfTwoOrMoreDepSamp(groups, alpha=alpha, inf_parameters=inf_parameters, test_title=test_title)
+
+    def _samples(self):
+        return () if self.groups is None else self.groups
+
+    def get_groups_descriptive_statistics(self):
+        ''' Descriptive statistics of all samples, computed with grouped reductions '''
+        summaries = self.groups.summaries()
+        for summary in summaries:
+            Reporter.print_descriptives(summary)
+        return summaries
+
     
-    def single_factor_anova(self):
-        ''' Test 24: Single-Factor Within-Subjects Analysis of Variance '''
+    def single_factor_anova(self, correction=None):
+        ''' Test 24: Single-Factor Within-Subjects Analysis of Variance 
+        
+        Sums of squares from the subject and condition marginal sums of the (n,k) matrix; 
+        sphericity is assessed with Mauchly's test, reported in details with the 
+        Greenhouse–Geisser epsilon and corrected p-value.
+        
+        H0 (null hypothesis): 
+        	-> the k condition means are equal
+        H1 (alternate hypothesis): 
+        	-> at least two condition means differ
+        
+        Parameters
+        ----------
+        correction : None, or 'greenhouse-geisser' to report the p-value and degrees-of-freedom 
+            corrected for departures from sphericity
+        
+        Return
+        ------
+        TestResult : F statistic and p-value (arrays of size (m,) for a stack of matrices)
+        '''
         
         self.test_title='Single-Factor Within-Subjects ANOVA'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        
+        if correction not in (None, 'greenhouse-geisser'):
+            raise ValueError('Unknown sphericity correction: '+str(correction))
+        res = within_subjects_anova(self.matrix)
+        stat, p, dof = res['F'], res['p'], res['dof']
+        if correction is not None:
+            p = res['p_gg']
+            dof = (res['epsilon']*dof[0], res['epsilon']*dof[1])
+        details = {name: res[name] for name in ('ss_conditions', 'ss_subjects', 'ss_error', 'mauchly_W',
+                                                 'mauchly_chi2', 'mauchly_dof', 'mauchly_p', 'epsilon', 'p_gg')}
+        
+        return self._result(stat, p, start, samples=self._samples(), dof=dof, details=details,
+                            conclusions=('Probably equal means',
+                                         'Probably different means'))
         
  
     def friedman_twoway_analysis_variance(self):
         ''' Test 25: Friedman Two-Way Analysis of Variance by Ranks'''
 
         self.test_title='Friedman Two-Way Analysis of Variance by Ranks'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]
+        n, k = self.matrix.shape[-2:]
+        ranks = RowRanks.get(self.matrix.reshape(-1, k))
+        batch = self.matrix.shape[:-2]
+        c = 1. - ranks.tie_terms.reshape(batch+(n,)).sum(axis=-1) / (k*(k*k-1)*n)
+        ssbn = (ranks.ranks.reshape(batch+(n, k)).sum(axis=-2)**2).sum(axis=-1)
+        stat = (12./(k*n*(k+1)) * ssbn - 3*n*(k+1)) / c
+        p = chi2.sf(stat, k-1)
         
-        stat, p = friedmanchisquare(self.P, *self.Q[0])
-        
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably same distribution')
-        else:
-            print('Probably different distributions')
+        return self._result(stat, p, start, samples=self._samples(), dof=k-1,
+                            conclusions=('Probably same distribution',
+                                         'Probably different distributions'))
         
 
     def cochran_q_test(self):
-        ''' Test 26: Cochran Q Test '''
+        ''' Test 26: Cochran Q Test 
+        
+        Test of equal proportions of a binary (0/1) outcome in k conditions measured on 
+        the same subjects, from the subject and condition totals
+        
+        H0 (null hypothesis): 
+        	-> the proportions are equal in the k conditions
+        H1 (alternate hypothesis): 
+        	-> at least two proportions differ
+        '''
 
         self.test_title='Cochran Q Test'
-        print ('~'+str(self.test_title)+'~')
\ No newline at end of file
+        start = perf_counter()
+        
+        stat, p = cochran_q(self.matrix)
+        
+        return self._result(stat, p, start, samples=self._samples(), dof=self.matrix.shape[-1]-1,
+                            conclusions=('Probably equal proportions',
+                                         'Probably different proportions'))
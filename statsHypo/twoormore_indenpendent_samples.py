@@ -7,13 +7,16 @@
 
 
 from sample import Samples
-from scipy.stats import kruskal
-from scipy.stats import f_oneway
-from scipy.stats import tukey_hsd
-from scipy.stats import levene
-from scipy.stats import bartlett
-from scipy.stats import fligner
+from grouped import GroupedSamples
+from result import Reporter
+from ranks import PooledRanks
+from posthoc import PostHoc
+from time import perf_counter
+from scipy.stats import chi2
+from scipy.stats import f
+from scipy.stats import norm
 from scipy.stats import median_test
+from numpy import abs, log
 
 
 
@@ -35,51 +38,195 @@ class InfTwoOrMoreIndepSamp(Samples):
     Test 45: Bartlett’s test
     Test 48: Fligner-Killeen
     Test 49: Mood’s median test
+    
+    The k samples are stored contiguously (GroupedSamples: one values array and the group 
+    offsets); the tests are computed with grouped reductions over that array, so that the 
+    number of groups can be large (e.g. thousands of cells).
     '''
     
     def __init__(self, P, *listQ, alpha, inf_parameters=[], test_title=''):
-        super().__init__(P,test_title)
-        self.Q=[] 
-        self.Q.append([q for q in listQ])
+        if isinstance(P, GroupedSamples):
+            self.groups = P
+            P = P.group(0)
+        else:
+            self.groups = GroupedSamples.from_groups((P,)+tuple(listQ))
+        super().__init__(P, test_title)
         self.alpha=alpha
         self.inf_parameters=inf_parameters
 
+    @property
+    def Q(self):
+        ''' Samples 2..k, as [list of views of the grouped values] '''
+        return [[self.groups.group(i) for i in range(1, self.groups.k)]]
+
+    @staticmethod
+    def from_groups(groups, alpha, inf_parameters=[], test_title=''):
+        ''' Tests of a list of samples (or of a GroupedSamples) '''
+        if not isinstance(groups, GroupedSamples):
+            groups = GroupedSamples.from_groups(groups)
+        return InfTwoOrMoreIndepSamp(groups, alpha=alpha, inf_parameters=inf_parameters, test_title=test_title)
+
+    @staticmethod
+    def from_long(values, labels, alpha, inf_parameters=[], test_title=''):
+        ''' Tests of long-format data (one value and one group label per observation) 
+        
+        Parameters
+        ----------
+        values : observations of size (N,)
+        labels : group label of every observation, of size (N,)
+        alpha : significance level
+        '''
+        groups = GroupedSamples.from_long(values, labels)
+        return InfTwoOrMoreIndepSamp(groups, alpha=alpha, inf_parameters=inf_parameters, test_title=test_title)
+
+    def get_groups_descriptive_statistics(self):
+        ''' Descriptive statistics of all samples, computed with grouped reductions '''
+        summaries = self.groups.summaries()
+        for summary in summaries:
+            Reporter.print_descriptives(summary)
+        return summaries
+
 
 
     def single_factor_anova(self):
-        ''' Test 21: Single-Factor Between-Subjects Analysis of Variance '''
+        ''' Test 21: Single-Factor Between-Subjects Analysis of Variance 
+        
+        F = MS_between / MS_within, from the group sizes, means and within-group sums of 
+        squares; dof = (k-1, N-k)
+        '''
 
         self.test_title='Single-Factor Between-Subjects Analysis of Variance'
-        print ('~'+str(self.test_title)+'~')
-            
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]
+        start = perf_counter()
         
-        stat, p = f_oneway(self.P, *self.Q[0])
+        g = self.groups
+        mean, ss_within = g.moments()[:2]
+        grand_mean = g.values.mean()
+        ss_between = (g.counts * (mean - grand_mean)**2).sum()
+        dof = (g.k - 1, g.N - g.k)
+        stat = (ss_between/dof[0]) / (ss_within.sum()/dof[1])
+        p = f.sf(stat, *dof)
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')    
+        return self._result(stat, p, start, samples=self.groups, dof=dof,
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
+
+
+    def posthoc(self):
+        ''' Pairwise comparisons of the group means (PostHoc), from one set of group statistics '''
+        if getattr(self, '_posthoc', None) is None:
+            self._posthoc = PostHoc.from_groups(self.groups)
+        return self._posthoc
+
+
+    def _pairwise_result(self, stat, p, start, posthoc):
+        return self._result(stat, p, start, samples=self.groups, dof=posthoc.df,
+                            details={'pairs': posthoc.pairs(), 'difference': posthoc.difference})
+
+
+    def fishers_lsd_test(self):
+        ''' Test 21a: Multiple T-tests/Fisher’s LSD Test 
+        
+        t tests of all pairs of groups with the error mean square of the ANOVA
+        
+        Return
+        ------
+        TestResult : t statistics and two-tailed p-values of the pairs (i, j), i < j, in 
+            details['pairs']
+        '''
+
+        self.test_title='Fisher’s LSD Test'
+        start = perf_counter()
+        
+        ph = self.posthoc()
+        stat, p = ph.fishers_lsd()
+        
+        return self._pairwise_result(stat, p, start, ph)
+
+
+    def bonferroni_dunn_test(self):
+        ''' Test 21b: Bonferroni–Dunn Test 
+        
+        Fisher’s LSD p-values adjusted for the k(k-1)/2 comparisons
+        '''
+
+        self.test_title='Bonferroni–Dunn Test'
+        start = perf_counter()
+        
+        ph = self.posthoc()
+        stat, p = ph.bonferroni_dunn()
+        
+        return self._pairwise_result(stat, p, start, ph)
 
 
     def tukeys_hsd_test(self):
-        ''' Test 21c: Tukey’s HSD Test '''
+        ''' Test 21c: Tukey’s HSD Test 
+        
+        Studentized range statistics of all pairs of groups (Tukey–Kramer for unequal 
+        group sizes), with p-values of the range of k means
+        '''
 
         self.test_title='Tukey’s HSD Test'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
         
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]  
+        ph = self.posthoc()
+        stat, p = ph.tukey_hsd()
+
+        return self._pairwise_result(stat, p, start, ph)
+
+
+    def newman_keuls_test(self):
+        ''' Test 21d: Newman–Keuls Test 
         
-        stat, p = tukey_hsd(self.P, *self.Q[0])
+        Step-down studentized range test: a pair spanning r ordered means is tested against 
+        the range of r means, and only when all the pairs enclosing it are significant 
+        (the step-down decisions are returned in reject)
+        '''
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')
+        self.test_title='Newman–Keuls Test'
+        start = perf_counter()
+        
+        ph = self.posthoc()
+        stat, p, reject = ph.newman_keuls(self.alpha)
+
+        result = self._pairwise_result(stat, p, start, ph)
+        result.reject = reject
+        return result
+
+
+    def scheffe_test(self):
+        ''' Test 21e: Scheffé Test 
+        
+        F statistics of all pairwise contrasts, on k-1 and N-k degrees-of-freedom
+        '''
+
+        self.test_title='Scheffé Test'
+        start = perf_counter()
+        
+        ph = self.posthoc()
+        stat, p = ph.scheffe()
+
+        return self._pairwise_result(stat, p, start, ph)
+
+
+    def dunnett_test(self, control=0):
+        ''' Test 21f: Dunnett Test 
+        
+        t statistics of every group against the control group, with single-step adjusted 
+        p-values
+        
+        Parameters
+        ----------
+        control : index of the control group
+        '''
+
+        self.test_title='Dunnett Test'
+        start = perf_counter()
+        
+        ph = self.posthoc()
+        groups, stat, p = ph.dunnett(control)
+
+        return self._result(stat, p, start, samples=self.groups, dof=ph.df,
+                            details={'groups': groups, 'control': control})
 
 
 
@@ -87,96 +234,116 @@ class InfTwoOrMoreIndepSamp(Samples):
         ''' Test 22: Kruskal–Wallis One-Way Analysis of Variance by Ranks '''
 
         self.test_title='Kruskal–Wallis One-Way Analysis of Variance Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]  
-
-        stat, p = kruskal(self.P, *self.Q[0])
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably the same distribution')
-        else:
-            print('Probably different distributions')
+        start = perf_counter()
+
+        g = self.groups
+        ranks = PooledRanks.get(g.values)
+        N, k = g.N, g.k
+        stat = 12./(N*(N+1)) * (g.sums(ranks.ranks)**2 / g.counts).sum() - 3*(N+1)
+        stat /= 1. - ranks.tie_term/(N**3 - N)
+        p = chi2.sf(stat, k-1)
+        return self._result(stat, p, start, samples=self.groups, dof=k-1,
+                            conclusions=('Probably the same distribution',
+                                         'Probably different distributions'))
 
     
     def van_der_waerden_normal_test_k_independent_samples(self):
         ''' Test 23: Van der Waerden Normal-Scores Test for k Independent Samples '''
 
         self.test_title='Van der Waerden Normal-Scores'
-        print ('~'+str(self.test_title)+'~')
+        start = perf_counter()
+        return self._result(None, None, start)
     
 
-    def levene_test(self):
-        ''' Test 44: Levene Test  '''
+    def _deviations(self, center):
+        ''' Grouped absolute deviations from the group medians (or means) '''
+        g = self.groups
+        if center == 'median':
+            c = g.quantiles([.5])[:, 0]
+        elif center == 'mean':
+            c = g.mean()
+        else:
+            raise ValueError('Unknown center: '+str(center))
+        return GroupedSamples(abs(g.values - c[g.codes]), g.offsets, g.labels)
+
+
+    def levene_test(self, center='median'):
+        ''' Test 44: Levene Test 
+        
+        One-way ANOVA of the absolute deviations from the group centers ('median': 
+        Brown–Forsythe variant, 'mean': original Levene test); dof = (k-1, N-k)
+        '''
 
         self.test_title='Levene Test'
-        print ('~'+str(self.test_title)+'~')
-                
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]  
+        start = perf_counter()
         
-        stat, p = levene(self.P, *self.Q[0])
+        z = self._deviations(center)
+        mean, ss_within = z.moments()[:2]
+        dof = (z.k - 1, z.N - z.k)
+        stat = dof[1]/dof[0] * (z.counts * (mean - z.values.mean())**2).sum() / ss_within.sum()
+        p = f.sf(stat, *dof)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably equal variance')
-        else:
-            print('Probably non equal variance')
+        return self._result(stat, p, start, samples=self.groups, dof=dof,
+                            conclusions=('Probably equal variance',
+                                         'Probably non equal variance'))
 
 
     def bartletts_test(self):
-        ''' Test 45: Bartlett’s Test '''
+        ''' Test 45: Bartlett’s Test 
+        
+        Test of equal variances from the pooled and group variances; dof = k-1
+        '''
 
         self.test_title='Bartlett’s Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]
+        start = perf_counter()
         
-        stat, p = bartlett(self.P, *self.Q[0])
+        g = self.groups
+        N, k = g.N, g.k
+        n1 = g.counts - 1.
+        var = g.var()
+        pooled = (n1*var).sum() / (N - k)
+        stat = ((N - k)*log(pooled) - (n1*log(var)).sum()) / (1. + ((1./n1).sum() - 1./(N-k))/(3.*(k-1)))
+        p = chi2.sf(stat, k-1)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably equal variance')
-        else:
-            print('Probably non equal variance')
+        return self._result(stat, p, start, samples=self.groups, dof=k-1,
+                            conclusions=('Probably equal variance',
+                                         'Probably non equal variance'))
 
 
-    def fligner_killeen_test(self):
-        ''' Test 48: Fligner-Killeen Test '''
+    def fligner_killeen_test(self, center='median'):
+        ''' Test 48: Fligner-Killeen Test 
+        
+        Ranks of the absolute deviations from the group centers are converted into normal 
+        scores, whose group means are compared with a chi-square statistic; dof = k-1
+        '''
 
         self.test_title='Fligner-Killeen Test'
-        print ('~'+str(self.test_title)+'~')
-                
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]
+        start = perf_counter()
         
-        stat, p = fligner(self.P, *self.Q[0])
+        z = self._deviations(center)
+        N, k = z.N, z.k
+        ranks = PooledRanks.get(z.values).ranks
+        a = norm.ppf(0.5 + ranks/(2.*(N + 1)))
+        stat = (z.sums(a)**2 / z.counts).sum() - N*a.mean()**2
+        stat /= a.var(ddof=1)
+        p = chi2.sf(stat, k-1)
 
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably equal variance')
-        else:
-            print('Probably non equal variance')
+        return self._result(stat, p, start, samples=self.groups, dof=k-1,
+                            conclusions=('Probably equal variance',
+                                         'Probably non equal variance'))
 
 
     def moods_median_test(self):
         ''' Test 49: Mood’s median Test '''
 
         self.test_title='Mood’s median Test'
-        print ('~'+str(self.test_title)+'~')
-        
-        Samples.get_sample_desciptive_statistics(self.P)
-        [Samples.get_sample_desciptive_statistics(q) for q in self.Q[0]]
+        start = perf_counter()
         
-        stat, p = median_test(self.P, *self.Q[0])
+        stat, p = median_test(*self.groups)[:2]
         
-        print('stat=%.3f, p=%.3f' % (stat, p))
-        if p > self.alpha:
-            print('Probably equal medians')
-        else:
-            print('Probably non equal medians')
+        return self._result(stat, p, start, samples=self.groups,
+                            conclusions=('Probably equal medians',
+                                         'Probably non equal medians'))
        
 
 
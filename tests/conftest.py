@@ -0,0 +1,12 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Test configuration (flat imports of the statsHypo modules)
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'statsHypo'))
@@ -0,0 +1,29 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Parallel test battery tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import numpy as np
+import battery
+from two_independent_samples import InfTwoIndepSamp
+from twoormore_indenpendent_samples import InfTwoOrMoreIndepSamp
+from twoormore_dependent_samples import InfTwoOrMoreDepSamp
+
+
+def test_executors_give_identical_rows():
+    rng = np.random.default_rng(0)
+    data = {name: rng.normal(size=30) + i*0.2 for i, name in enumerate('abc')}
+    specs = [(InfTwoIndepSamp, 'mann_whitney_utest', ('a', 'b')),
+             (InfTwoIndepSamp, 'randomization_test', ('a', 'c'), {}),
+             (InfTwoIndepSamp, 'randomization_test', ('b', 'c')),
+             (InfTwoOrMoreIndepSamp, 'kruskal_wallis_oneway_analysis_variance', ('a', 'b', 'c')),
+             (InfTwoOrMoreDepSamp, 'friedman_twoway_analysis_variance', ('a', 'b', 'c'))]
+    rows = []
+    for executor in ('serial', 'thread', 'process'):
+        results = battery.TestBattery(data, specs, executor=executor, max_workers=2, seed=7).run()
+        rows.append([{k: v for k, v in row.items() if k != 'elapsed'} for row in results])
+    assert all(row['error'] is None for row in rows[0])
+    assert rows[0] == rows[1] == rows[2]
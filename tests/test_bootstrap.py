@@ -0,0 +1,19 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Bootstrap confidence interval tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import numpy as np
+from bootstrap import BootstrapCI
+
+
+def test_studentized_interval_is_reproducible():
+    x = np.random.default_rng(0).normal(size=40)
+    ci = BootstrapCI(x, size=500, seed=1)
+    first = ci.interval('median', 'studentized')
+    ci.interval('std', 'studentized')
+    assert ci.interval('median', 'studentized') == first
+    assert BootstrapCI(x, size=500, seed=1).interval('median', 'studentized') == first
@@ -0,0 +1,69 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Factorial analysis of variance engine tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+from itertools import combinations
+import numpy as np
+import pytest
+from factorial import FactorialCells
+
+
+def _design(counts, seed):
+    ''' Observations of a 2 x 3 x 2 design with the given cell counts (of size (2,3,2)) '''
+    rng = np.random.default_rng(seed)
+    cells = np.repeat(np.arange(counts.size), counts.ravel())
+    codes = np.column_stack(np.unravel_index(cells, counts.shape))
+    values = rng.normal(size=cells.shape[0]) + 0.5*codes[:, 0] + 0.3*codes[:, 1]*codes[:, 2]
+    return values, codes
+
+
+def _ols_ss(values, codes, ss_type):
+    ''' Type II or III sums of squares by least squares on a dummy-coded model matrix '''
+    k = codes.shape[1]
+    main = []
+    for i in range(k):
+        L = codes[:, i].max() + 1
+        main.append(np.stack([(codes[:, i] == l)*1. - (codes[:, i] == L-1) for l in range(L-1)], axis=1))
+    effects = [e for r in range(1, k+1) for e in combinations(range(k), r)]
+    columns = {}
+    for e in effects:
+        X = np.ones((values.shape[0], 1))
+        for i in e:
+            X = (X[:, :, None] * main[i][:, None, :]).reshape(values.shape[0], -1)
+        columns[e] = X
+
+    def rss(terms):
+        X = np.column_stack([np.ones(values.shape[0])] + [columns[t] for t in terms])
+        coef = np.linalg.lstsq(X, values, rcond=None)[0]
+        return ((values - X @ coef)**2).sum()
+
+    ss = []
+    for e in effects:
+        if ss_type == 3:
+            ss.append(rss([t for t in effects if t != e]) - rss(effects))
+        else:
+            others = [t for t in effects if not set(e) <= set(t)]
+            ss.append(rss(others) - rss(others + [e]))
+    return np.asarray(ss)
+
+
+@pytest.mark.parametrize('ss_type', [2, 3])
+def test_unbalanced_sums_of_squares_match_least_squares(ss_type):
+    counts = np.array([[[3, 5], [4, 2], [6, 3]], [[2, 4], [5, 5], [3, 7]]])
+    values, codes = _design(counts, 0)
+    res = FactorialCells(values, codes).anova(ss_type)
+    assert np.allclose(res['ss'], _ols_ss(values, codes, ss_type))
+
+
+def test_balanced_sums_of_squares_match_least_squares():
+    values, codes = _design(np.full((2, 3, 2), 4), 1)
+    cells = FactorialCells(values, codes)
+    assert cells.balanced()
+    res = cells.anova()
+    assert np.allclose(res['ss'], _ols_ss(values, codes, 2))
+    assert np.allclose(res['ss'], _ols_ss(values, codes, 3))
+    assert np.isclose(res['ss'].sum() + res['ss_within'], ((values - values.mean())**2).sum())
@@ -0,0 +1,55 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Factorial design tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import numpy as np
+import pytest
+from factorial_designs import InferenceFactorialDesigns
+from repeated import within_subjects_anova
+
+
+def _rss(X, y):
+    coef = np.linalg.lstsq(X, y, rcond=None)[0]
+    return ((y - X @ coef)**2).sum()
+
+
+def _two_way_ss(a, b, y):
+    ''' Type II and III sums of squares of A, B and A:B by least squares (sum-to-zero coding) '''
+    one, A, B = np.ones(len(y)), 1. - 2.*a, 1. - 2.*b
+    full = _rss(np.column_stack([one, A, B, A*B]), y)
+    additive = _rss(np.column_stack([one, A, B]), y)
+    type2 = [_rss(np.column_stack([one, B]), y) - additive,
+             _rss(np.column_stack([one, A]), y) - additive, additive - full]
+    type3 = [_rss(np.column_stack([one, B, A*B]), y) - full,
+             _rss(np.column_stack([one, A, A*B]), y) - full, additive - full]
+    return {2: type2, 3: type3}
+
+
+@pytest.mark.parametrize('ss_type', [2, 3])
+def test_mixed_design_unbalanced_groups_match_subject_means(ss_type):
+    rng = np.random.default_rng(0)
+    a, b = np.repeat([0, 0, 1, 1], [13, 16, 16, 15]), np.repeat([0, 1, 0, 1], [13, 16, 16, 15])
+    subjects = np.repeat(np.arange(60), 3)
+    c = np.tile(np.arange(3), 60)
+    values = rng.normal(size=180) + 0.5*a[subjects] + 0.3*c*b[subjects] + rng.normal(size=60)[subjects]
+    test = InferenceFactorialDesigns(values, [a[subjects], b[subjects], c], 0.05)
+    res = test.mixed_design_factorial_anova(subjects, between=(0, 1), ss_type=ss_type)
+    ss = dict(zip(res.details['effects'], res.details['ss']))
+    expected = _two_way_ss(a, b, np.bincount(subjects, values) / 3.)[ss_type]
+    assert np.allclose([ss['A'], ss['B'], ss['A:B']], 3.*np.asarray(expected))
+
+
+def test_within_subjects_balanced_matches_one_factor_anova():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(12, 4)) + np.arange(4)*0.4 + rng.normal(size=(12, 1))
+    subjects = np.repeat(np.arange(12), 4)
+    conditions = np.tile(np.arange(4), 12)
+    res = InferenceFactorialDesigns(X.ravel(), [conditions], 0.05).within_subjects_factorial_anova(subjects)
+    expected = within_subjects_anova(X)
+    assert np.allclose(res.statistic, expected['F'])
+    assert np.allclose(res.p_value, expected['p'])
+    assert np.allclose(res.details['ss_error'], expected['ss_error'])
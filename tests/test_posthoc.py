@@ -0,0 +1,38 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Post-hoc pairwise comparison tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import numpy as np
+from scipy import stats
+from posthoc import PostHoc
+
+
+def _groups(sizes, seed):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(size=n) + 0.3*i for i, n in enumerate(sizes)]
+
+
+def _posthoc(groups):
+    df = sum(len(g) for g in groups) - len(groups)
+    ss = sum(((g - g.mean())**2).sum() for g in groups)
+    return PostHoc([len(g) for g in groups], [g.mean() for g in groups], ss/df, df)
+
+
+def test_dunnett_matches_scipy():
+    groups = _groups((10, 12, 15, 9, 14), 0)
+    _, t, p = _posthoc(groups).dunnett()
+    expected = stats.dunnett(*groups[1:], control=groups[0])
+    assert np.allclose(t, expected.statistic)
+    assert np.allclose(p, expected.pvalue, atol=1e-4)
+
+
+def test_tukey_hsd_matches_scipy():
+    groups = _groups((10, 12, 15, 9), 1)
+    ph = _posthoc(groups)
+    i, j = ph.pairs()
+    expected = stats.tukey_hsd(*groups).pvalue[i, j]
+    assert np.allclose(ph.tukey_hsd()[1], expected, atol=1e-5)
@@ -0,0 +1,35 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Single-sample tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import numpy as np
+import pytest
+from scipy.stats import kurtosistest
+from single_sample import InfOneSamp
+
+
+@pytest.mark.parametrize('sample', [
+    np.random.default_rng(0).uniform(size=100),          # platykurtic
+    np.random.default_rng(1).standard_t(3, size=100),    # leptokurtic
+    np.random.default_rng(2).normal(size=50),
+])
+def test_population_kurtosis_matches_kurtosistest(sample):
+    result = InfOneSamp(sample, 0.05).test_population_kurtosis()
+    expected = kurtosistest(sample)
+    assert np.isclose(result.statistic, expected.statistic, rtol=1e-10)
+    assert np.isclose(result.p_value, expected.pvalue, rtol=1e-8)
+
+
+
+def test_population_kurtosis_columns_match_kurtosistest():
+    rng = np.random.default_rng(3)
+    X = np.column_stack((rng.uniform(size=200), rng.laplace(size=200)))
+    result = InfOneSamp(X, 0.05).test_population_kurtosis()
+    expected = kurtosistest(X)
+    assert result.statistic[0] < 0 < result.statistic[1]
+    assert np.allclose(result.statistic, expected.statistic, rtol=1e-10)
+    assert np.allclose(result.p_value, expected.pvalue, rtol=1e-8)
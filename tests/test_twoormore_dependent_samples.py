@@ -0,0 +1,29 @@
+# -------------------------------------------------------------
+# Statistical Hypothesis Tests
+# Two or more dependent samples tests
+#
+# Author: Ziad Ghauch
+# -------------------------------------------------------------
+
+
+import numpy as np
+import pytest
+from twoormore_dependent_samples import InfTwoOrMoreDepSamp
+
+
+def test_unequal_conditions_are_rejected():
+    with pytest.raises(ValueError):
+        InfTwoOrMoreDepSamp.from_long(np.arange(15.), np.repeat([0, 1, 2], [4, 5, 6]), 0.05)
+
+
+def test_different_subject_sets_are_rejected():
+    subjects = np.array([1, 2, 3, 4, 5, 5, 4, 3, 2, 1, 2, 3, 4, 5, 6])
+    with pytest.raises(ValueError):
+        InfTwoOrMoreDepSamp.from_long(np.arange(15.), np.repeat([0, 1, 2], 5), 0.05, subjects=subjects)
+
+
+def test_rows_are_aligned_by_subject():
+    subjects = np.array([1, 2, 3, 4, 5, 5, 4, 3, 2, 1, 3, 1, 2, 5, 4])
+    values = 10.*subjects + np.repeat([0, 1, 2], 5)
+    test = InfTwoOrMoreDepSamp.from_long(values, np.repeat([0, 1, 2], 5), 0.05, subjects=subjects)
+    assert np.array_equal(test.matrix, 10.*np.arange(1, 6)[:, None] + np.arange(3))